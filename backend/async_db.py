@@ -0,0 +1,32 @@
+# backend/async_db.py
+# Client PostgREST async dengan pool koneksi keep-alive. Dipisah dari
+# database.py agar httpx/postgrest baru di-import saat client async dipakai.
+import httpx
+from postgrest import AsyncPostgrestClient
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """
+    Client PostgREST async dengan pool koneksi keep-alive (httpx). Query builder
+    sama dengan client sync: await client.table("x").select("*").eq(...).execute()
+    """
+
+    def __init__(self, base_url, *, headers, limits, timeout):
+        self._limits = limits   # create_session dipanggil dari __init__ parent
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(self, base_url, headers, timeout):
+        return httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=self._limits)
+
+
+def create_pooled_client(url, key, pool_size=20, keepalive=10, keepalive_expiry=30.0,
+                         timeout=10.0, connect_timeout=3.0):
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=min(pool_size, keepalive),
+        keepalive_expiry=keepalive_expiry,
+    )
+    headers = {"apiKey": key, "Authorization": f"Bearer {key}",
+               "Accept": "application/json", "Content-Type": "application/json"}
+    return PooledPostgrestClient(f"{url}/rest/v1", headers=headers, limits=limits,
+                                 timeout=httpx.Timeout(timeout, connect=connect_timeout))
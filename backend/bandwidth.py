@@ -0,0 +1,188 @@
+# backend/bandwidth.py
+# Hitung byte OCPP per charger: payload JSON per action (sebelum kompresi) dan
+# byte wire websocket (setelah permessage-deflate, termasuk header frame dan
+# ping/pong). Rasio wire/payload = efek kompresi untuk charger di link 4G.
+import threading
+
+from websockets.frames import Opcode
+from websockets.legacy.framing import Frame
+from websockets.legacy.server import WebSocketServerProtocol
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+
+def frame_info(text):
+    """(message_type, unique_id, action|None) dari frame OCPP-J tanpa json.loads."""
+    q1 = text.find('"')
+    q2 = text.find('"', q1 + 1)
+    if q1 < 0 or q2 < 0:
+        return None, None, None
+    mtype = text[:q1].strip('[ ,\t\r\n')
+    action = None
+    if mtype == "2":
+        q3 = text.find('"', q2 + 1)
+        q4 = text.find('"', q3 + 1)
+        if q3 >= 0 and q4 >= 0:
+            action = text[q3 + 1:q4]
+    return mtype, text[q1 + 1:q2], action
+
+
+def deflate_extensions(window_bits=None, mem_level=None, level=None, no_context_takeover=False):
+    """Extension permessage-deflate untuk websockets.serve(extensions=...)."""
+    settings = {}
+    if mem_level is not None:
+        settings["memLevel"] = mem_level
+    if level is not None:
+        settings["level"] = level
+    return [ServerPerMessageDeflateFactory(
+        server_no_context_takeover=no_context_takeover,
+        server_max_window_bits=window_bits,
+        compress_settings=settings or None,
+    )]
+
+
+class CountingServerProtocol(WebSocketServerProtocol):
+    """Protocol websocket server yang menghitung byte wire masuk/keluar per koneksi."""
+    wire_in = 0
+    wire_out = 0
+
+    def data_received(self, data):
+        self.wire_in += len(data)
+        super().data_received(data)
+
+    def _count_write(self, data):
+        self.wire_out += len(data)
+        self.transport.write(data)
+
+    def write_frame_sync(self, fin, opcode, data):
+        frame = Frame(fin, Opcode(opcode), data)
+        if self.debug:
+            self.logger.debug("> %s", frame)
+        frame.write(self._count_write, mask=self.is_client, extensions=self.extensions)
+
+
+def _compressed(ws):
+    return any(getattr(ext, "name", "") == "permessage-deflate" for ext in getattr(ws, "extensions", None) or [])
+
+
+class BandwidthMeter:
+    """
+    inbound/outbound dipanggil untuk tiap frame OCPP teks. Response (CALLRESULT/
+    CALLERROR) dihitung ke action CALL pasangannya lewat unique_id. Hitungan
+    tetap disimpan setelah disconnect agar total per charger bisa dibandingkan.
+    """
+
+    def __init__(self):
+        self._payload = {}      # charger_id -> {action: [bytes_in, bytes_out, frames_in, frames_out]}
+        self._wire = {}         # charger_id -> [bytes_in, bytes_out] dari koneksi yang sudah tutup
+        self._sockets = {}      # charger_id -> protocol websocket aktif
+        self._open = {}         # charger_id -> {unique_id: action} CALL yang belum dijawab
+        self._lock = threading.Lock()
+
+    def _fold(self, charger_id, ws):
+        w = self._wire.setdefault(charger_id, [0, 0])
+        w[0] += getattr(ws, "wire_in", 0)
+        w[1] += getattr(ws, "wire_out", 0)
+
+    def attach(self, charger_id, websocket):
+        with self._lock:
+            old = self._sockets.get(charger_id)
+            if old is not None and old is not websocket:
+                self._fold(charger_id, old)
+            self._sockets[charger_id] = websocket
+
+    def detach(self, charger_id, websocket=None):
+        with self._lock:
+            ws = self._sockets.get(charger_id)
+            if ws is None or (websocket is not None and ws is not websocket):
+                return  # sudah diganti koneksi baru (reconnect)
+            del self._sockets[charger_id]
+            self._open.pop(charger_id, None)
+            self._fold(charger_id, ws)
+
+    def _add(self, charger_id, text, outbound):
+        mtype, uid, action = frame_info(text)
+        n = len(text.encode())
+        with self._lock:
+            open_calls = self._open.setdefault(charger_id, {})
+            if mtype == "2":
+                open_calls[uid] = action
+            else:
+                action = open_calls.pop(uid, None) or "unknown"
+            row = self._payload.setdefault(charger_id, {}).setdefault(action, [0, 0, 0, 0])
+            row[outbound] += n
+            row[2 + outbound] += 1
+
+    def inbound(self, charger_id, text):
+        self._add(charger_id, text, 0)
+
+    def outbound(self, charger_id, text):
+        self._add(charger_id, text, 1)
+
+    def _wire_totals(self, charger_id):
+        w = self._wire.get(charger_id, (0, 0))
+        ws = self._sockets.get(charger_id)
+        if ws is None:
+            return w[0], w[1]
+        return w[0] + getattr(ws, "wire_in", 0), w[1] + getattr(ws, "wire_out", 0)
+
+    def _row(self, charger_id):
+        by_action = self._payload.get(charger_id, {})
+        p_in = sum(r[0] for r in by_action.values())
+        p_out = sum(r[1] for r in by_action.values())
+        w_in, w_out = self._wire_totals(charger_id)
+        ws = self._sockets.get(charger_id)
+        return {
+            "charger_id": charger_id,
+            "connected": ws is not None,
+            "compressed": _compressed(ws) if ws is not None else None,
+            "payload_in": p_in, "payload_out": p_out,
+            "wire_in": w_in, "wire_out": w_out,
+            "wire_ratio": round((w_in + w_out) / (p_in + p_out), 3) if p_in + p_out else None,
+            "by_action": {a: {"in": r[0], "out": r[1], "frames_in": r[2], "frames_out": r[3]}
+                          for a, r in by_action.items()},
+        }
+
+    def charger(self, charger_id):
+        with self._lock:
+            if charger_id not in self._payload and charger_id not in self._sockets:
+                return None
+            return self._row(charger_id)
+
+    def top(self, limit=20):
+        """Charger dengan byte wire terbanyak (masuk + keluar)."""
+        with self._lock:
+            ids = set(self._payload) | set(self._sockets)
+            ranked = sorted(ids, key=lambda c: sum(self._wire_totals(c)), reverse=True)[:limit]
+            return [self._row(c) for c in ranked]
+
+    def by_action(self):
+        """{(action, direction): bytes} payload semua charger, untuk metrik."""
+        out = {}
+        with self._lock:
+            for per in self._payload.values():
+                for action, r in per.items():
+                    out[(action, "in")] = out.get((action, "in"), 0) + r[0]
+                    out[(action, "out")] = out.get((action, "out"), 0) + r[1]
+        return out
+
+    def totals(self):
+        with self._lock:
+            p_in = p_out = 0
+            for per in self._payload.values():
+                for r in per.values():
+                    p_in += r[0]
+                    p_out += r[1]
+            w_in = w_out = 0
+            for cid in set(self._wire) | set(self._sockets):
+                i, o = self._wire_totals(cid)
+                w_in += i
+                w_out += o
+            compressed = sum(1 for ws in self._sockets.values() if _compressed(ws))
+            connected = len(self._sockets)
+        return {
+            "payload_in": p_in, "payload_out": p_out,
+            "wire_in": w_in, "wire_out": w_out,
+            "wire_ratio": round((w_in + w_out) / (p_in + p_out), 3) if p_in + p_out else None,
+            "connected": connected,
+            "compressed_connections": compressed,
+        }
@@ -2,6 +2,11 @@
 import logging
 from datetime import datetime
 
+try:
+    from backend.database import query_cache
+except ImportError:
+    query_cache = None
+
 # Konstanta Emisi (kg CO2 per kWh). Mobil Bensin ~0.2 kg/km. EV ~0.
 # Asumsi penghematan per kWh.
 CARBON_SAVING_FACTOR = 0.85 
@@ -9,8 +14,15 @@ CARBON_SAVING_FACTOR = 0.85
 logger = logging.getLogger("BILLING")
 
 class BillingCalculator:
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, cache=query_cache):
         self.db = supabase_client
+        self.cache = cache   # tarif jarang berubah: baca lewat cache (invalidasi saat tabel chargers/tariffs ditulis)
+
+    def _charger_tariff(self, charger_id):
+        load = lambda: self.db.table("chargers").select("tariff_id, tariffs(*)").eq("charger_id", charger_id).execute().data
+        if self.cache is None:
+            return load()
+        return self.cache.fetch(("tariffs", "chargers"), ("charger_tariff", charger_id), load)
 
     def calculate_final_bill(self, charger_id, kwh_usage, duration_minutes):
         bill_details = {
@@ -23,11 +35,11 @@ class BillingCalculator:
 
         try:
             # 1. Ambil Tarif
-            charger_data = self.db.table("chargers").select("tariff_id, tariffs(*)").eq("charger_id", charger_id).execute()
-            if not charger_data.data or not charger_data.data[0].get('tariffs'):
+            charger_data = self._charger_tariff(charger_id)
+            if not charger_data or not charger_data[0].get('tariffs'):
                 return bill_details # Return kosong/default
 
-            tariff = charger_data.data[0]['tariffs']
+            tariff = charger_data[0]['tariffs']
             bill_details["tariff_name"] = tariff['name']
             
             # --- [NEW] DYNAMIC PEAK HOUR LOGIC (Module 2.2) ---
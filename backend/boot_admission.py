@@ -0,0 +1,53 @@
+# backend/boot_admission.py
+# Admission BootNotification saat reconnect storm (mis. setelah restart server).
+# - Interval heartbeat di-jitter per charger agar heartbeat armada tidak serempak.
+# - Bila backlog penulisan boot terlalu dalam, charger dijawab Pending dengan
+#   interval retry acak; charger mengulang BootNotification setelah interval itu.
+import random
+
+ACCEPTED = "Accepted"
+PENDING = "Pending"
+
+
+class BootAdmission:
+    def __init__(self, heartbeat_interval=30, jitter=0.2, max_backlog=2000, retry_interval=15,
+                 backlog_fn=None, rng=None):
+        self.heartbeat_interval = heartbeat_interval
+        self.jitter = jitter
+        self.max_backlog = max_backlog
+        self.retry_interval = retry_interval
+        self._backlog_fn = backlog_fn or (lambda: 0)
+        self._rng = rng or random.Random()
+        self.accepted = 0
+        self.pending = 0
+
+    @property
+    def max_interval(self):
+        """Interval heartbeat terpanjang yang mungkin diberikan (untuk deteksi offline)."""
+        return int(round(self.heartbeat_interval * (1 + self.jitter)))
+
+    def heartbeat_interval_for(self):
+        lo = self.heartbeat_interval * (1 - self.jitter)
+        hi = self.heartbeat_interval * (1 + self.jitter)
+        return max(1, int(round(self._rng.uniform(lo, hi))))
+
+    def admit(self):
+        """Return (status, interval). Pending: interval = detik sebelum charger boleh boot ulang."""
+        backlog = self._backlog_fn()
+        if self.max_backlog and backlog >= self.max_backlog:
+            self.pending += 1
+            # Makin dalam backlog makin panjang retry-nya, disebar acak agar tidak datang serempak lagi
+            scale = min(4.0, backlog / self.max_backlog)
+            return PENDING, max(1, int(self.retry_interval * scale * self._rng.uniform(0.5, 1.5)))
+        self.accepted += 1
+        return ACCEPTED, self.heartbeat_interval_for()
+
+    def stats(self):
+        return {
+            "accepted": self.accepted,
+            "pending": self.pending,
+            "backlog": self._backlog_fn(),
+            "max_backlog": self.max_backlog,
+            "heartbeat_interval": self.heartbeat_interval,
+            "jitter": self.jitter,
+        }
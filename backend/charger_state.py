@@ -0,0 +1,243 @@
+# backend/charger_state.py
+# State live tiap charger yang terhubung ke OCPP server, disimpan di memori.
+# Ini sumber kebenaran untuk status/meter/heartbeat selama charger online;
+# tabel chargers hanya menerima snapshot berkala lewat LiveMeterBuffer.
+import time
+import threading
+from datetime import datetime, timezone
+
+from backend.timer_wheel import TimerWheel
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+class ChargerState:
+    __slots__ = (
+        "charger_id", "connected", "connected_at", "disconnected_at", "last_seen", "last_heartbeat",
+        "status", "error_code", "vendor", "model", "current_power_kw", "current_session_kwh",
+        "current_soc", "active_transaction_id", "worker_id", "reported_offline",
+    )
+
+    def __init__(self, charger_id, worker_id=None):
+        self.charger_id = charger_id
+        self.worker_id = worker_id
+        self.connected = False
+        self.connected_at = None
+        self.disconnected_at = None
+        self.last_seen = None
+        self.last_heartbeat = None
+        self.status = None
+        self.error_code = None
+        self.vendor = None
+        self.model = None
+        self.current_power_kw = None
+        self.current_session_kwh = None
+        self.current_soc = None
+        self.active_transaction_id = None
+        self.reported_offline = False   # tabel chargers sedang berisi "Offline"
+
+    def to_dict(self):
+        return {
+            "charger_id": self.charger_id,
+            "connected": self.connected,
+            "status": "Offline" if self.reported_offline or not self.connected else self.status,
+            "last_status": self.status,
+            "error_code": self.error_code,
+            "vendor": self.vendor,
+            "model": self.model,
+            "current_power_kw": self.current_power_kw,
+            "current_session_kwh": self.current_session_kwh,
+            "current_soc": self.current_soc,
+            "active_transaction_id": self.active_transaction_id,
+            "connected_at": _iso(self.connected_at),
+            "disconnected_at": _iso(self.disconnected_at),
+            "last_heartbeat": _iso(self.last_heartbeat),
+            "last_seen": _iso(self.last_seen),
+            "worker_id": self.worker_id,
+        }
+
+
+class ChargerStateRegistry:
+    """
+    Diupdate dari handler OCPP (event loop), dibaca oleh Control Server.
+
+    Kolom yang berubah diteruskan ke `sink` (LiveMeterBuffer.put_fields) yang
+    meng-upsert bulk ke tabel chargers secara berkala (last-write-wins).
+    last_heartbeat (= kontak terakhir) hanya ikut snapshot tiap
+    `heartbeat_persist_seconds` agar heartbeat tidak menghasilkan satu write
+    per charger per interval.
+
+    Deteksi offline: tiap charger terhubung punya deadline last_seen +
+    offline_after di TimerWheel. Pesan masuk hanya mengupdate last_seen;
+    sweep() memeriksa deadline yang jatuh tempo dan menjadwal ulang bila
+    charger ternyata masih aktif (lazy), jadi biayanya tidak per heartbeat.
+    """
+
+    def __init__(self, sink=None, worker_id=None, heartbeat_persist_seconds=60, offline_retention_seconds=3600,
+                 offline_after=90):
+        self._sink = sink
+        self.worker_id = worker_id
+        self.heartbeat_persist_seconds = heartbeat_persist_seconds
+        self.offline_retention_seconds = offline_retention_seconds
+        self.offline_after = offline_after
+        self._states = {}
+        self._hb_persisted = {}
+        self._wheel = TimerWheel(tick=1.0)
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.went_offline = {"silent": 0, "disconnect": 0}
+
+    def _get(self, charger_id):
+        st = self._states.get(charger_id)
+        if st is None:
+            st = self._states[charger_id] = ChargerState(charger_id, self.worker_id)
+        return st
+
+    def _mark(self, charger_id, **fields):
+        self.updates += 1
+        if self._sink is not None:
+            self._sink.put_fields(charger_id, fields)
+
+    def _touch(self, st, now):
+        # Dipanggil dengan lock. Kontak dari charger: update last_seen, pulihkan
+        # status bila sebelumnya ditandai Offline, persist last_heartbeat berkala.
+        st.last_seen = now
+        if st.reported_offline and st.connected:
+            st.reported_offline = False
+            self._wheel.schedule(st.charger_id, now + self.offline_after)
+            if st.status:
+                self._mark(st.charger_id, status=st.status)
+        if now - self._hb_persisted.get(st.charger_id, 0) >= self.heartbeat_persist_seconds:
+            self._hb_persisted[st.charger_id] = now
+            self._mark(st.charger_id, last_heartbeat=_iso(now))
+
+    # --- Event dari handler ---
+    def connected(self, charger_id):
+        now = time.time()
+        with self._lock:
+            st = self._get(charger_id)
+            st.connected = True
+            st.connected_at = now
+            st.disconnected_at = None
+            st.worker_id = self.worker_id
+            self._wheel.schedule(charger_id, now + self.offline_after)
+            self._touch(st, now)
+
+    def disconnected(self, charger_id):
+        with self._lock:
+            st = self._states.get(charger_id)
+            if st is not None:
+                st.connected = False
+                st.disconnected_at = time.time()
+                self._wheel.cancel(charger_id)
+                if not st.reported_offline:
+                    st.reported_offline = True
+                    self.went_offline["disconnect"] += 1
+                    self._mark(charger_id, status="Offline", current_power_kw=0)
+
+    def seen(self, charger_id):
+        with self._lock:
+            st = self._states.get(charger_id)
+            if st is not None:
+                self._touch(st, time.time())
+
+    def boot(self, charger_id, vendor, model):
+        with self._lock:
+            st = self._get(charger_id)
+            st.vendor, st.model = vendor, model
+            st.status = "Available"
+            st.current_power_kw = st.current_session_kwh = 0
+            st.last_heartbeat = st.last_seen = time.time()
+            st.reported_offline = False
+            self._hb_persisted[charger_id] = st.last_heartbeat
+            # Boot juga ditulis langsung ke DB; ini mencegah snapshot lama menimpanya
+            self._mark(charger_id, status="Available", current_power_kw=0, current_session_kwh=0)
+
+    def heartbeat(self, charger_id):
+        now = time.time()
+        with self._lock:
+            st = self._get(charger_id)
+            st.last_heartbeat = now
+            self._touch(st, now)
+
+    def status(self, charger_id, status, error_code=None):
+        with self._lock:
+            st = self._get(charger_id)
+            if error_code is not None:
+                st.error_code = error_code
+            if st.status != status:
+                st.status = status
+                self._mark(charger_id, status=status)
+
+    def meter(self, charger_id, kwh=None, kw=None, soc=None):
+        fields = {}
+        if kwh is not None: fields["current_session_kwh"] = kwh
+        if kw is not None: fields["current_power_kw"] = kw
+        if soc is not None: fields["current_soc"] = soc
+        if not fields:
+            return
+        with self._lock:
+            st = self._get(charger_id)
+            for k, v in fields.items():
+                setattr(st, k, v)
+            self._mark(charger_id, **fields)
+
+    def transaction(self, charger_id, transaction_id):
+        with self._lock:
+            self._get(charger_id).active_transaction_id = transaction_id
+
+    def sweep(self, now=None):
+        """Tandai Offline charger terhubung yang diam > offline_after detik. Return [charger_id]."""
+        now = now or time.time()
+        gone = []
+        with self._lock:
+            for cid, _ in self._wheel.advance(now):
+                st = self._states.get(cid)
+                if st is None or not st.connected or st.reported_offline:
+                    continue
+                deadline = (st.last_seen or 0) + self.offline_after
+                if deadline > now:
+                    self._wheel.schedule(cid, deadline)
+                    continue
+                st.reported_offline = True
+                self.went_offline["silent"] += 1
+                self._mark(cid, status="Offline", current_power_kw=0)
+                gone.append(cid)
+        return gone
+
+    # --- Baca ---
+    def get(self, charger_id):
+        with self._lock:
+            st = self._states.get(charger_id)
+            return st.to_dict() if st else None
+
+    def all(self, charger_ids=None):
+        with self._lock:
+            if charger_ids is None:
+                return [st.to_dict() for st in self._states.values()]
+            return [self._states[c].to_dict() for c in charger_ids if c in self._states]
+
+    def prune(self):
+        """Lupakan charger yang sudah offline lebih lama dari offline_retention_seconds."""
+        cutoff = time.time() - self.offline_retention_seconds
+        with self._lock:
+            stale = [cid for cid, st in self._states.items()
+                     if not st.connected and st.disconnected_at and st.disconnected_at < cutoff]
+            for cid in stale:
+                del self._states[cid]
+                self._hb_persisted.pop(cid, None)
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            connected = sum(1 for st in self._states.values() if st.connected)
+            return {
+                "tracked": len(self._states),
+                "connected": connected,
+                "silent": sum(1 for st in self._states.values() if st.connected and st.reported_offline),
+                "scheduled": len(self._wheel),
+                "went_offline": dict(self.went_offline),
+                "updates": self.updates,
+            }
@@ -0,0 +1,146 @@
+# backend/cluster.py
+# Registry kepemilikan charger (charger_id -> worker) untuk mode multi-worker
+# OCPP server. Tiap worker memegang socket charger-nya sendiri; perintah dan
+# query diarahkan ke Control Server milik worker pemegang socket.
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+try:
+    from backend import config
+except ImportError:
+    try:
+        import config
+    except Exception:
+        config = None
+
+logger = logging.getLogger("OCPP")
+
+
+class OwnershipRegistry:
+    """Interface registry. Semua method sinkron (panggil lewat executor dari event loop)."""
+
+    def register_worker(self, worker_id, control_url): raise NotImplementedError
+    def unregister_worker(self, worker_id): raise NotImplementedError
+    def workers(self): raise NotImplementedError
+    def claim(self, charger_id, worker_id): raise NotImplementedError
+    def release(self, charger_id, worker_id): raise NotImplementedError
+    def owner(self, charger_id): raise NotImplementedError
+
+    def owner_url(self, charger_id):
+        """Control URL worker pemilik charger, atau None bila charger tidak terhubung ke worker manapun."""
+        wid = self.owner(charger_id)
+        return self.workers().get(wid) if wid else None
+
+
+class SQLiteRegistry(OwnershipRegistry):
+    """
+    Stand-in lokal untuk satu mesin: file SQLite (mode WAL) yang dibagi semua
+    proses worker dan main_api.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as c:
+            c.execute("create table if not exists ocpp_workers (worker_id text primary key, control_url text, pid integer, heartbeat_at real)")
+            c.execute("create table if not exists charger_ownership (charger_id text primary key, worker_id text, claimed_at real)")
+            c.execute("create index if not exists idx_ownership_worker on charger_ownership(worker_id)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    def register_worker(self, worker_id, control_url):
+        self._conn().execute(
+            "insert or replace into ocpp_workers values (?, ?, ?, ?)",
+            (worker_id, control_url, os.getpid(), time.time()),
+        )
+
+    def unregister_worker(self, worker_id):
+        c = self._conn()
+        c.execute("delete from charger_ownership where worker_id = ?", (worker_id,))
+        c.execute("delete from ocpp_workers where worker_id = ?", (worker_id,))
+
+    def workers(self):
+        return dict(self._conn().execute("select worker_id, control_url from ocpp_workers").fetchall())
+
+    def claim(self, charger_id, worker_id):
+        self._conn().execute(
+            "insert or replace into charger_ownership values (?, ?, ?)",
+            (charger_id, worker_id, time.time()),
+        )
+
+    def release(self, charger_id, worker_id):
+        # Hanya lepas bila masih milik worker ini (charger bisa sudah reconnect ke worker lain)
+        self._conn().execute(
+            "delete from charger_ownership where charger_id = ? and worker_id = ?",
+            (charger_id, worker_id),
+        )
+
+    def owner(self, charger_id):
+        row = self._conn().execute(
+            "select worker_id from charger_ownership where charger_id = ?", (charger_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+
+class SupabaseRegistry(OwnershipRegistry):
+    """Registry lintas host memakai tabel ocpp_workers dan charger_ownership di Supabase."""
+
+    def __init__(self, client):
+        self.db = client
+
+    def register_worker(self, worker_id, control_url):
+        self.db.table("ocpp_workers").upsert({
+            "worker_id": worker_id, "control_url": control_url,
+            "pid": os.getpid(), "heartbeat_at": time.time(),
+        }).execute()
+
+    def unregister_worker(self, worker_id):
+        self.db.table("charger_ownership").delete().eq("worker_id", worker_id).execute()
+        self.db.table("ocpp_workers").delete().eq("worker_id", worker_id).execute()
+
+    def workers(self):
+        rows = self.db.table("ocpp_workers").select("worker_id, control_url").execute().data
+        return {r["worker_id"]: r["control_url"] for r in rows}
+
+    def claim(self, charger_id, worker_id):
+        self.db.table("charger_ownership").upsert({
+            "charger_id": charger_id, "worker_id": worker_id, "claimed_at": time.time(),
+        }).execute()
+
+    def release(self, charger_id, worker_id):
+        self.db.table("charger_ownership").delete().eq("charger_id", charger_id).eq("worker_id", worker_id).execute()
+
+    def owner(self, charger_id):
+        rows = self.db.table("charger_ownership").select("worker_id").eq("charger_id", charger_id).limit(1).execute().data
+        return rows[0]["worker_id"] if rows else None
+
+
+_registry = None
+
+def get_registry():
+    """
+    Registry sesuai config CLUSTER_REGISTRY: "none" (default, single process),
+    "sqlite" (satu mesin) atau "supabase" (multi host).
+    """
+    global _registry
+    if _registry is not None:
+        return _registry
+    kind = (os.getenv("UNIEV_CLUSTER_REGISTRY") or (getattr(config, "CLUSTER_REGISTRY", "none") if config else "none")).lower()
+    if kind == "sqlite":
+        path = os.getenv("UNIEV_CLUSTER_REGISTRY_PATH") or (getattr(config, "CLUSTER_REGISTRY_PATH", None) if config else None) or "cluster_registry.db"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _registry = SQLiteRegistry(path)
+    elif kind == "supabase":
+        from backend.database import supabase
+        _registry = SupabaseRegistry(supabase)
+    return _registry
@@ -0,0 +1,44 @@
+# backend/cold_start.py
+# Ukur waktu cold start tiap entry point (OCPP server, API, Streamlit): dari
+# proses dibuat sampai titik "siap" yang ditandai entry point lewat mark().
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger("UNIEV")
+
+_IMPORTED_AT = time.time()
+_marks = {}     # (entry, phase) -> ms sejak proses dibuat
+_lock = threading.Lock()
+
+
+def process_start_time():
+    """Epoch waktu proses dibuat (Linux /proc); fallback: saat modul ini di-import."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/stat") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return btime + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return _IMPORTED_AT
+
+
+PROCESS_START = process_start_time()
+
+
+def mark(entry, phase="ready"):
+    """Catat (sekali per entry/phase) berapa ms sejak proses dibuat. Return ms."""
+    key = (entry, phase)
+    with _lock:
+        if key in _marks:
+            return _marks[key]
+        ms = _marks[key] = round((time.time() - PROCESS_START) * 1000, 1)
+    logger.info(f"⏱️ COLD START {entry} {phase} in {ms:.0f} ms")
+    return ms
+
+
+def report():
+    with _lock:
+        return {f"{entry}.{phase}": ms for (entry, phase), ms in _marks.items()}
@@ -0,0 +1,123 @@
+# backend/command_executor.py
+import asyncio
+import time
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger("OCPP")
+
+ACCEPTED = "ACCEPTED"
+REJECTED = "REJECTED"
+TIMEOUT = "TIMEOUT"
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, int(round(pct / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+class CommandExecutor:
+    """
+    Menjalankan OCPP call dari server ke charger (RemoteStart/Stop) dan
+    menunggu response atau timeout.
+
+    - Batas in-flight global dan per charger (charger lambat tidak dibanjiri;
+      perintah berikutnya menunggu giliran).
+    - Hasil (ACCEPTED/REJECTED/TIMEOUT + rtt_ms) dikumpulkan dan diambil
+      secara batch lewat drain_results() untuk ditulis ke DB.
+    """
+
+    def __init__(self, max_inflight=500, max_per_charger=1, timeout=30, latency_window=2000, on_record=None):
+        self.timeout = timeout
+        self.on_record = on_record  # callback(cmd, status, rtt_ms), mis. untuk metrik
+        self.max_per_charger = max_per_charger
+        self._global = asyncio.Semaphore(max_inflight)
+        self._per_charger = {}
+        self._results = []
+        self._latencies = deque(maxlen=latency_window)
+        self.inflight = 0
+        self.waiting = 0
+        self.counts = {ACCEPTED: 0, REJECTED: 0, TIMEOUT: 0}
+
+    def _charger_sem(self, charger_id):
+        sem = self._per_charger.get(charger_id)
+        if sem is None:
+            sem = self._per_charger[charger_id] = asyncio.Semaphore(self.max_per_charger)
+        return sem
+
+    def forget(self, charger_id):
+        """Buang semaphore charger yang disconnect (hanya bila tidak ada yang menunggu)."""
+        sem = self._per_charger.get(charger_id)
+        if sem is not None and not sem.locked():
+            del self._per_charger[charger_id]
+
+    def record(self, cmd, status, rtt_ms=None):
+        self.counts[status] = self.counts.get(status, 0) + 1
+        if rtt_ms is not None:
+            self._latencies.append(rtt_ms)
+        if self.on_record:
+            self.on_record(cmd, status, rtt_ms)
+        if cmd.get('id') is not None:
+            row = {
+                "id": cmd['id'], "charger_id": cmd.get('charger_id'), "action": cmd.get('action'),
+                "status": status, "rtt_ms": rtt_ms, "responded_at": datetime.utcnow().isoformat(),
+            }
+            self._results.append(row)
+
+    async def run(self, cmd, call_factory):
+        """call_factory() -> coroutine OCPP call. Return status hasil."""
+        charger_id = cmd.get('charger_id')
+        self.waiting += 1
+        try:
+            await self._global.acquire()
+            sem = self._charger_sem(charger_id)
+            try:
+                await sem.acquire()
+            except BaseException:
+                self._global.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        self.inflight += 1
+        start = time.perf_counter()
+        try:
+            try:
+                response = await asyncio.wait_for(call_factory(), self.timeout)
+                raw = getattr(response, 'status', None)
+                status = ACCEPTED if str(getattr(raw, 'value', raw)).lower() == "accepted" else REJECTED
+            except asyncio.TimeoutError:
+                status = TIMEOUT
+            except Exception as e:
+                logger.warning(f"⚠️ COMMAND {cmd.get('action')} -> {charger_id} failed: {e}")
+                status = REJECTED
+            rtt_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.record(cmd, status, rtt_ms)
+            logger.info(f"📨 RESULT {cmd.get('action')} -> {charger_id}: {status} ({rtt_ms} ms)")
+            return status
+        finally:
+            self.inflight -= 1
+            sem.release()
+            self._global.release()
+
+    def drain_results(self):
+        results, self._results = self._results, []
+        return results
+
+    def stats(self):
+        lat = sorted(self._latencies)
+        return {
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "counts": dict(self.counts),
+            "rtt_ms": {
+                "samples": len(lat),
+                "p50": _percentile(lat, 50),
+                "p95": _percentile(lat, 95),
+                "p99": _percentile(lat, 99),
+                "max": lat[-1] if lat else None,
+            },
+        }
@@ -0,0 +1,112 @@
+# backend/command_queue.py
+import heapq
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def command_dedupe_key(cmd):
+    """Key dedupe: pakai 'dedupe_key' eksplisit bila ada, selain itu action + user + payload."""
+    payload = cmd.get('payload') if isinstance(cmd.get('payload'), dict) else {}
+    explicit = cmd.get('dedupe_key') or payload.get('dedupe_key')
+    if explicit:
+        return str(explicit)
+    body = json.dumps(payload, sort_keys=True, default=str) if payload else ""
+    return f"{cmd.get('action')}:{cmd.get('user_id') or ''}:{body}"
+
+
+def _created_epoch(cmd, default):
+    raw = cmd.get('created_at') or cmd.get('ts')
+    if not raw:
+        return default
+    try:
+        dt = datetime.fromisoformat(str(raw).replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except ValueError:
+        return default
+
+
+class PendingCommandIndex:
+    """
+    Index in-memory perintah PENDING per charger_id.
+
+    - add(): perintah untuk charger offline disimpan sampai charger connect.
+    - pop_for(): diambil saat on_connect mendaftarkan charger.
+    - pop_expired(): perintah yang melewati TTL dikeluarkan via heap, sehingga
+      biaya per tick tidak bergantung pada jumlah backlog lama.
+    """
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl = ttl_seconds
+        self._by_charger = {}
+        self._ids = set()
+        self._expiry = []
+        self._seq = 0
+
+    def __len__(self):
+        return sum(len(q) for q in self._by_charger.values())
+
+    def __contains__(self, cmd_id):
+        return cmd_id in self._ids
+
+    def has_pending(self, charger_id):
+        return charger_id in self._by_charger
+
+    def add(self, cmd, now=None):
+        """
+        Return None bila perintah masuk index, atau baris perintah lain yang
+        tersingkir (duplikat) supaya bisa ditandai terminal oleh pemanggil.
+        """
+        now = time.time() if now is None else now
+        cid = cmd.get('charger_id')
+        cmd_id = cmd.get('id')
+        if cmd_id is not None and cmd_id in self._ids:
+            return None
+
+        key = command_dedupe_key(cmd)
+        queue = self._by_charger.setdefault(cid, OrderedDict())
+        if key in queue:
+            # Perintah lama dengan key sama sudah menunggu; yang baru jadi duplikat
+            return cmd
+
+        expires_at = _created_epoch(cmd, now) + self.ttl
+        queue[key] = (expires_at, cmd)
+        if cmd_id is not None:
+            self._ids.add(cmd_id)
+        self._seq += 1
+        heapq.heappush(self._expiry, (expires_at, self._seq, cid, key))
+        return None
+
+    def pop_for(self, charger_id, now=None):
+        now = time.time() if now is None else now
+        queue = self._by_charger.pop(charger_id, None)
+        if not queue:
+            return [], []
+        live, expired = [], []
+        for expires_at, cmd in queue.values():
+            self._ids.discard(cmd.get('id'))
+            (live if expires_at > now else expired).append(cmd)
+        return live, expired
+
+    def pop_expired(self, now=None):
+        now = time.time() if now is None else now
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, _, cid, key = heapq.heappop(self._expiry)
+            queue = self._by_charger.get(cid)
+            entry = queue.get(key) if queue else None
+            # Entry bisa sudah dikirim (pop_for) atau diganti; abaikan heap lama
+            if entry is None or entry[0] != expires_at:
+                continue
+            del queue[key]
+            if not queue:
+                del self._by_charger[cid]
+            self._ids.discard(entry[1].get('id'))
+            expired.append(entry[1])
+        return expired
+
+    def stats(self):
+        return {"pending": len(self), "chargers": len(self._by_charger), "heap": len(self._expiry)}
@@ -0,0 +1,134 @@
+# backend/control_server.py
+import asyncio
+import hmac
+import json
+import logging
+import ipaddress
+from urllib.parse import urlsplit, parse_qsl
+
+logger = logging.getLogger("OCPP")
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+# Header shared secret antar proses (main_api, worker lain); lihat OCPP_CONTROL_TOKEN di config
+TOKEN_HEADER = "X-UNIEV-Control-Token"
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ControlServer:
+    """
+    HTTP server internal (asyncio murni, tanpa dependency) yang berjalan di
+    event loop OCPP server. Dipakai main_api untuk push perintah ke charger
+    yang sedang terhubung tanpa menunggu polling database.
+
+    Handler menerima (params, query, body) dan mengembalikan dict/list (JSON),
+    str (text/plain), atau tuple (status_code, payload).
+
+    Bila token diisi, setiap request wajib membawa header TOKEN_HEADER yang
+    sama (401 bila tidak). Bind ke alamat non-loopback tanpa token ditolak:
+    siapa pun yang bisa menjangkau port ini bisa remote-stop/reset charger.
+    """
+
+    def __init__(self, host="127.0.0.1", port=9100, token=None):
+        self.host = host
+        self.port = int(port)
+        self.token = token or None
+        self._routes = []
+        self._server = None
+
+    def route(self, method, path):
+        parts = [p for p in path.strip('/').split('/') if p]
+        def decorator(fn):
+            self._routes.append((method.upper(), parts, fn))
+            return fn
+        return decorator
+
+    def _match(self, method, path):
+        segs = [p for p in path.strip('/').split('/') if p]
+        allowed = False
+        for m, parts, fn in self._routes:
+            if len(parts) != len(segs):
+                continue
+            params = {}
+            for p, s in zip(parts, segs):
+                if p.startswith('{') and p.endswith('}'):
+                    params[p[1:-1]] = s
+                elif p != s:
+                    break
+            else:
+                if m == method:
+                    return fn, params, True
+                allowed = True
+        return None, None, allowed
+
+    async def start(self):
+        if not self.token and not is_loopback(self.host):
+            raise RuntimeError(f"refusing to bind {self.host}:{self.port} without OCPP_CONTROL_TOKEN")
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"🛰️ Control Server listening on {self.host}:{self.port}")
+        return self._server
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                k, _, v = line.decode('latin-1').partition(':')
+                headers[k.strip().lower()] = v.strip()
+            length = int(headers.get('content-length') or 0)
+            raw = await reader.readexactly(length) if length else b''
+
+            url = urlsplit(target)
+            fn, params, allowed = self._match(method.upper(), url.path)
+            if self.token and not hmac.compare_digest(headers.get(TOKEN_HEADER.lower(), "").encode(), self.token.encode()):
+                status, payload = 401, {"error": "unauthorized"}
+            elif fn is None:
+                status, payload = (405, {"error": "method not allowed"}) if allowed else (404, {"error": "not found"})
+            else:
+                try:
+                    body = json.loads(raw) if raw else None
+                    result = fn(params, dict(parse_qsl(url.query)), body)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    status, payload = result if isinstance(result, tuple) else (200, result)
+                except ValueError as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    logger.error(f"🔥 CONTROL ERROR {method} {url.path}: {e}")
+                    status, payload = 500, {"error": str(e)}
+            await self._respond(writer, status, payload)
+        except Exception:
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _respond(self, writer, status, payload):
+        if isinstance(payload, (bytes, str)):
+            body = payload.encode() if isinstance(payload, str) else payload
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, default=str).encode()
+            ctype = "application/json"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: {ctype}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
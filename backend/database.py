@@ -1,7 +1,13 @@
 # backend/database.py
 import os
+import sys
+import time
+import atexit
+import asyncio
 import logging
-from supabase import create_client, Client
+import weakref
+import threading
+from collections import OrderedDict
 
 logger = logging.getLogger("UNIEV")
 
@@ -13,57 +19,441 @@ except Exception:
     except Exception:
         config = None
 
-_supabase: Client | None = None
+try:
+    from backend.local_db import LocalClient
+    from backend.query_stats import QueryStats, InstrumentedClient
+except ImportError:
+    from local_db import LocalClient
+    from query_stats import QueryStats, InstrumentedClient
 
-def get_client() -> Client | None:
-    global _supabase
+# Client dibuat saat pertama dipakai (bukan saat import) dan tanpa query jaringan;
+# konektivitas dicek HealthProbe di thread background.
+_supabase = None
+_init_lock = threading.RLock()
+_init_ms = None
+
+
+def _cfg(name, default):
+    return getattr(config, name, default) if config else default
+
+
+def get_local_client():
+    """Backend SQLite lokal (query builder sama dengan supabase)."""
+    path = os.getenv("UNIEV_LOCAL_DB") or _cfg("LOCAL_DB_PATH", None) or os.path.join("data", "uniev_local.db")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return LocalClient(path)
+
+
+def get_client():
+    global _supabase, _init_ms
     if _supabase is not None:
         return _supabase
+    with _init_lock:
+        if _supabase is not None:
+            return _supabase
+        start = time.perf_counter()
+        client = _create_client()
+        _init_ms = round((time.perf_counter() - start) * 1000, 1)
+        if client is not None:
+            health.start()
+        return client
+
+
+def _create_client():
+    global _supabase
+    backend = (os.getenv("UNIEV_DB_BACKEND") or _cfg("DB_BACKEND", "auto")).lower()
     try:
+        if backend == "sqlite":
+            _supabase = get_local_client()
+            logger.info(f"🗄️ Using local SQLite database: {_supabase.path}")
+            return _supabase
         url = os.getenv("SUPABASE_URL") or getattr(config, "SUPABASE_URL", None)
         key = os.getenv("SUPABASE_KEY") or getattr(config, "SUPABASE_KEY", None)
         if not url or not key:
             raise RuntimeError("Supabase credentials missing")
+        from supabase import create_client
         _supabase = create_client(url, key)
-        try:
-            _supabase.table("chargers").select("count").execute()
-            logger.info("✅ Database connection established")
-        except Exception:
-            logger.warning("⚠️ Supabase connected but test query failed; continuing")
         return _supabase
     except Exception as e:
-        logger.warning(f"⚠️ Using mock database client: {e}")
-        class MockClient:
-            def table(self, name):
-                return MockTable()
-        class MockTable:
-            def select(self, *args, **kwargs): return self
-            def insert(self, data): return self
-            def update(self, data): return self
-            def upsert(self, data): return self
-            def eq(self, *args, **kwargs): return self
-            def execute(self):
-                class MockResult:
-                    data = []
-                return MockResult()
-        return MockClient()
-
-supabase = get_client()
+        if backend == "supabase":
+            logger.error(f"❌ Supabase unavailable and DB_BACKEND='supabase': {e}")
+            return None
+        try:
+            _supabase = get_local_client()
+        except Exception as local_err:
+            logger.error(f"❌ Local database unavailable: {local_err}")
+            return None
+        logger.warning(f"⚠️ Using local SQLite database {_supabase.path}: {e}")
+        return _supabase
+
+query_stats = QueryStats(slow_ms=_cfg("DB_SLOW_QUERY_MS", 500))
+_instrument = bool(_cfg("DB_QUERY_STATS", True))
+
+
+def _instrumented(client, is_async=False):
+    if client is None or not _instrument:
+        return client
+    return InstrumentedClient(client, query_stats, is_async)
+
+
+def _dump_query_stats():
+    directory = _cfg("DB_QUERY_STATS_DUMP_DIR", None)
+    if not directory or not query_stats.summary(0)["queries"]:
+        return
+    name = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+    try:
+        query_stats.dump(os.path.join(directory, f"{name}-{os.getpid()}.json"))
+    except OSError as e:
+        logger.warning(f"⚠️ Query stats dump failed: {e}")
+
+
+atexit.register(_dump_query_stats)
+
+
+class HealthProbe:
+    """
+    Query kecil ke chargers tiap interval detik di thread daemon. Dimulai saat
+    client pertama kali dibuat; entry point tidak pernah menunggu hasilnya.
+    """
+
+    def __init__(self, interval=30.0):
+        self.interval = interval
+        self.ok = None              # None = belum pernah dicek
+        self.latency_ms = None
+        self.last_error = None
+        self.checked_at = None
+        self.failures = 0           # gagal berturut-turut
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None or not self.interval:
+                return
+            self._thread = threading.Thread(target=self._run, name="db-health", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self.interval)
+
+    def check(self):
+        client = _supabase
+        if client is None:
+            return self.ok
+        start = time.perf_counter()
+        try:
+            client.table("chargers").select("charger_id").limit(1).execute()
+            ok, err = True, None
+        except Exception as e:
+            ok, err = False, f"{type(e).__name__}: {e}"
+        self.latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.checked_at = time.time()
+        if ok and self.ok is not True:
+            logger.info(f"✅ Database connection established ({self.latency_ms} ms)")
+        elif not ok and self.ok is not False:
+            logger.warning(f"⚠️ Database health check failed; continuing: {err}")
+        self.ok, self.last_error = ok, err
+        self.failures = 0 if ok else self.failures + 1
+        return ok
+
+    def status(self):
+        return {
+            "backend": None if _supabase is None else ("sqlite" if isinstance(_supabase, LocalClient) else "supabase"),
+            "initialized": _supabase is not None,
+            "init_ms": _init_ms,
+            "ok": self.ok,
+            "latency_ms": self.latency_ms,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "checked_age_s": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+        }
+
+
+health = HealthProbe(_cfg("DB_HEALTH_INTERVAL", 30.0))
+
+
+class LazyClient:
+    """
+    Pengganti objek client di level modul: client (ter-instrumentasi) baru dibuat
+    saat atribut pertama diakses atau saat dicek truthiness-nya (`if not supabase`).
+    """
+
+    def __init__(self):
+        self._client = None
+        self._resolved = False
+
+    def _resolve(self):
+        if not self._resolved:
+            with _init_lock:
+                if not self._resolved:
+                    self._client = _instrumented(get_client())
+                    self._resolved = True
+        return self._client
+
+    def __getattr__(self, name):
+        client = self._resolve()
+        if client is None:
+            raise AttributeError(f"database client unavailable ({name})")
+        return getattr(client, name)
+
+    def __bool__(self):
+        return self._resolve() is not None
+
+
+supabase = LazyClient()
+
+
+class _AsyncQuery:
+    """Builder client lokal (SQLite) dengan execute() yang bisa di-await (tanpa I/O jaringan)."""
+
+    def __init__(self, query):
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+        def chain(*args, **kwargs):
+            return _AsyncQuery(attr(*args, **kwargs))
+        return chain
+
+    async def execute(self):
+        return self._query.execute()
+
+
+class _AsyncLocalClient:
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _AsyncQuery(self._client.table(name))
+
+    from_ = table
+
+    async def aclose(self):
+        pass
+
+
+# Pool httpx terikat ke event loop pembuatnya: satu client per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _create_async_client():
+    url = os.getenv("SUPABASE_URL") or _cfg("SUPABASE_URL", None)
+    key = os.getenv("SUPABASE_KEY") or _cfg("SUPABASE_KEY", None)
+    client = get_client()
+    if not url or not key or client is None or isinstance(client, LocalClient):
+        return _instrumented(_AsyncLocalClient(client), is_async=True)
+    try:
+        from backend.async_db import create_pooled_client
+    except ImportError:
+        from async_db import create_pooled_client
+    pool = _cfg("DB_POOL_SIZE", 20)
+    logger.info(f"🔌 Async DB pool: max {pool} conn, keep-alive {min(pool, _cfg('DB_POOL_KEEPALIVE', 10))}")
+    return _instrumented(create_pooled_client(
+        url, key, pool_size=pool,
+        keepalive=_cfg("DB_POOL_KEEPALIVE", 10),
+        keepalive_expiry=_cfg("DB_KEEPALIVE_EXPIRY", 30.0),
+        timeout=_cfg("DB_TIMEOUT", 10.0),
+        connect_timeout=_cfg("DB_CONNECT_TIMEOUT", 3.0),
+    ), is_async=True)
+
+
+def get_async_client():
+    """Client async untuk event loop yang sedang berjalan (dibuat saat pertama dipakai)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = _create_async_client()
+    return client
+
+
+async def close_async_client():
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class QueryCache:
+    """
+    Cache read-through untuk tabel referensi yang jarang berubah. Entry =
+    (tabel, key) -> data, kedaluwarsa per TTL tabel, dibatasi max_entries (LRU).
+    Tabel tanpa TTL tidak di-cache. Cache per proses: invalidasi dari main_api
+    tidak sampai ke proses lain (Streamlit, OCPP server), di sana TTL yang berlaku.
+    """
+
+    def __init__(self, ttls=None, max_entries=1000):
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # (tables, key) -> (expires_at, data)
+        self._by_table = {}             # tabel -> {entry key}
+        self._gen = {}                  # tabel -> nomor invalidasi (hasil load yang mendahului invalidasi dibuang)
+        self._gen_all = 0
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl(self, tables):
+        # TTL mengikuti tabel utama (pertama); tabel lain hanya untuk invalidasi
+        return self.ttls.get(tables[0])
+
+    @staticmethod
+    def _copy(data):
+        # Pemanggil sering mengubah baris (mis. masking api_key); jangan ubah isi cache
+        if isinstance(data, list):
+            return [dict(r) if isinstance(r, dict) else r for r in data]
+        return dict(data) if isinstance(data, dict) else data
+
+    def _lookup(self, tables, key):
+        k = (tables, key)
+        with self._lock:
+            entry = self._entries.get(k)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(k)
+                self.hits[tables[0]] = self.hits.get(tables[0], 0) + 1
+                return True, entry[1]
+            self.misses[tables[0]] = self.misses.get(tables[0], 0) + 1
+            return False, self._generation(tables)
+
+    def _generation(self, tables):
+        return (self._gen_all,) + tuple(self._gen.get(t, 0) for t in tables)
+
+    def _store(self, tables, key, data, ttl, gen):
+        k = (tables, key)
+        with self._lock:
+            if gen != self._generation(tables):
+                return
+            self._entries[k] = (time.monotonic() + ttl, data)
+            self._entries.move_to_end(k)
+            for t in tables:
+                self._by_table.setdefault(t, set()).add(k)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._unindex(old)
+                self.evictions += 1
+
+    def _unindex(self, k):
+        for t in k[0]:
+            keys = self._by_table.get(t)
+            if keys is not None:
+                keys.discard(k)
+
+    def fetch(self, table, key, loader):
+        """data untuk (table, key); loader() dipanggil bila miss. table boleh tuple (query join)."""
+        tables = (table,) if isinstance(table, str) else tuple(table)
+        ttl = self.ttl(tables)
+        if not ttl:
+            return loader()
+        hit, data = self._lookup(tables, key)
+        if not hit:
+            gen, data = data, loader()
+            self._store(tables, key, data, ttl, gen)
+        return self._copy(data)
+
+    async def afetch(self, table, key, loader):
+        """Seperti fetch, loader() mengembalikan awaitable (client async)."""
+        tables = (table,) if isinstance(table, str) else tuple(table)
+        ttl = self.ttl(tables)
+        if not ttl:
+            return await loader()
+        hit, data = self._lookup(tables, key)
+        if not hit:
+            gen, data = data, await loader()
+            self._store(tables, key, data, ttl, gen)
+        return self._copy(data)
+
+    def invalidate(self, *tables):
+        """Buang entry yang membaca tabel ini (tanpa argumen: semua). Dipanggil setelah menulis."""
+        with self._lock:
+            if not tables:
+                n = len(self._entries)
+                self._entries.clear()
+                self._by_table.clear()
+                self._gen_all += 1
+            else:
+                n = 0
+                for t in tables:
+                    self._gen[t] = self._gen.get(t, 0) + 1
+                    for k in self._by_table.pop(t, ()):
+                        if self._entries.pop(k, None) is not None:
+                            self._unindex(k)
+                            n += 1
+            self.invalidations += n
+        return n
+
+    def stats(self):
+        with self._lock:
+            per_table = {}
+            for t in set(self.hits) | set(self.misses) | set(self._by_table):
+                h, m = self.hits.get(t, 0), self.misses.get(t, 0)
+                per_table[t] = {"hits": h, "misses": m, "hit_ratio": round(h / (h + m), 3) if h + m else None,
+                                "entries": len(self._by_table.get(t, ())), "ttl_s": self.ttls.get(t)}
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                "entries": len(self._entries), "max_entries": self.max_entries,
+                "hits": hits, "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+                "evictions": self.evictions, "invalidations": self.invalidations,
+                "tables": per_table,
+            }
+
+
+query_cache = QueryCache(_cfg("DB_CACHE_TTLS", {}), _cfg("DB_CACHE_MAX_ENTRIES", 1000))
+
 
 class Database:
     @staticmethod
     def get_client():
         return supabase
 
+    @staticmethod
+    def get_async_client():
+        return get_async_client()
+
+    @staticmethod
+    def cache():
+        return query_cache
+
+    @staticmethod
+    def query_stats(limit=20, by="total_ms"):
+        return query_stats.summary(limit, by)
+
+    @staticmethod
+    def health():
+        return health.status()
+
+    @staticmethod
+    def warm_up():
+        """Buat client di thread background agar request pertama tidak menanggung init."""
+        threading.Thread(target=supabase._resolve, name="db-init", daemon=True).start()
+
+    @staticmethod
+    async def aclose():
+        await close_async_client()
+
+    @staticmethod
+    async def get_latency_async():
+        import time
+        start = time.time()
+        try:
+            await get_async_client().table("chargers").select("charger_id").limit(1).execute()
+            return round((time.time() - start) * 1000, 1)
+        except Exception:
+            return -1
+
     @staticmethod
     def get_latency():
         import time
         client = supabase
-        if client is None:
+        if not client:
             return -1
         start = time.time()
         try:
             client.table("chargers").select("charger_id").limit(1).execute()
             return round((time.time() - start) * 1000, 1)
         except Exception:
-            return -1
\ No newline at end of file
+            return -1
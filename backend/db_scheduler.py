@@ -0,0 +1,232 @@
+# backend/db_scheduler.py
+# Executor DB dengan kelas prioritas dan antrian terbatas untuk OCPP server.
+# Billing/stop selalu didahulukan; live meter yang menumpuk boleh dibuang atau
+# digabung (key sama) supaya tidak pernah menahan penulisan transaksi.
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+
+CRITICAL = "critical"   # billing, StopTransaction
+STATUS = "status"       # Boot/Status, registry, hasil perintah
+BULK = "bulk"           # live meter, rekonsiliasi
+PRIORITIES = (CRITICAL, STATUS, BULK)
+
+
+class TaskDropped(RuntimeError):
+    """Task kelas rendah dibuang karena antriannya penuh."""
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args", "kwargs", "priority", "key", "name", "enqueued")
+
+    def __init__(self, priority, fn, args, kwargs, key):
+        self.future = Future()
+        self.priority = priority
+        self.key = key
+        self.enqueued = time.perf_counter()
+        self.replace(fn, args, kwargs)
+
+    def replace(self, fn, args, kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.name = getattr(fn, "__qualname__", None) or type(fn).__name__
+
+
+class PriorityExecutor(Executor):
+    """
+    Pengganti ThreadPoolExecutor untuk db_executor.
+
+    - submit() (dipakai loop.run_in_executor) masuk kelas default; pakai
+      submit_task(priority, fn, *args, key=...) untuk memilih kelas.
+    - Worker mengambil task dari kelas tertinggi yang tidak kosong.
+      `reserved_critical` thread hanya mengerjakan CRITICAL, jadi billing tetap
+      jalan walau thread lain tertahan query live meter yang lambat.
+    - key: task dengan key sama yang masih antri diganti argumennya (merge),
+      future yang sama dikembalikan ke kedua pemanggil.
+    - limits {kelas: max antrian}, 0 = tanpa batas. Bila penuh, task tertua
+      kelas itu dibuang (future -> TaskDropped).
+    """
+
+    def __init__(self, workers=3, reserved_critical=1, limits=None, default=STATUS,
+                 wait_hist=None, run_hist=None, error_counter=None, drop_counter=None, merge_counter=None,
+                 thread_name_prefix="db"):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.max_workers = workers
+        self.reserved_critical = max(0, min(reserved_critical, workers - 1))
+        self.limits = {p: 0 for p in PRIORITIES}
+        self.limits.update(limits or {})
+        self.default = default
+        self._wait_hist = wait_hist
+        self._run_hist = run_hist
+        self._error_counter = error_counter
+        self._drop_counter = drop_counter
+        self._merge_counter = merge_counter
+
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._queues = {p: deque() for p in PRIORITIES}
+        self._keyed = {}
+        self._shutdown = False
+        self.busy = 0
+        self.submitted = {p: 0 for p in PRIORITIES}
+        self.completed = {p: 0 for p in PRIORITIES}
+        self.dropped = {p: 0 for p in PRIORITIES}
+        self.merged = {p: 0 for p in PRIORITIES}
+
+        # Thread dibuat saat submit pertama, bukan saat import: ocpp_server --workers
+        # mem-fork worker dan proses hasil fork tidak mewarisi thread parent.
+        self._thread_name_prefix = thread_name_prefix
+        self._threads = []
+        self._pid = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._start_lock = threading.Lock()
+        self._cond = threading.Condition()
+
+    def _ensure_threads(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Hasil fork: thread, lock dan antrian milik parent tidak berlaku lagi
+                self._cond = threading.Condition()
+                self._queues = {p: deque() for p in PRIORITIES}
+                self._keyed = {}
+                self.busy = 0
+            self._threads = []
+            for i in range(self.max_workers):
+                critical_only = i < self.reserved_critical
+                t = threading.Thread(
+                    target=self._worker, args=(critical_only,), daemon=True,
+                    name=f"{self._thread_name_prefix}-{'critical' if critical_only else 'any'}-{i}",
+                )
+                t.start()
+                self._threads.append(t)
+            self._pid = os.getpid()
+
+    # --- Submit ---
+    def submit(self, fn, /, *args, **kwargs):
+        return self.submit_task(self.default, fn, *args, **kwargs)
+
+    def submit_task(self, priority, fn, /, *args, key=None, **kwargs):
+        if priority not in self._queues:
+            raise ValueError(f"unknown priority {priority!r}")
+        self._ensure_threads()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if key is not None:
+                queued = self._keyed.get(key)
+                if queued is not None:
+                    queued.replace(fn, args, kwargs)
+                    self.merged[queued.priority] += 1
+                    if self._merge_counter is not None:
+                        self._merge_counter.inc(priority=queued.priority)
+                    return queued.future
+            queue = self._queues[priority]
+            limit = self.limits.get(priority) or 0
+            if limit and len(queue) >= limit:
+                self._drop(queue.popleft())
+            task = _Task(priority, fn, args, kwargs, key)
+            queue.append(task)
+            if key is not None:
+                self._keyed[key] = task
+            self.submitted[priority] += 1
+            self._cond.notify_all()  # worker critical-only tidak boleh "menelan" notifikasi
+            return task.future
+
+    def _drop(self, task):
+        if task.key is not None and self._keyed.get(task.key) is task:
+            del self._keyed[task.key]
+        self.dropped[task.priority] += 1
+        if self._drop_counter is not None:
+            self._drop_counter.inc(priority=task.priority)
+        task.future.set_exception(TaskDropped(f"{task.name} dropped ({task.priority} queue full)"))
+
+    # --- Worker ---
+    def _take(self, critical_only):
+        for p in (PRIORITIES[:1] if critical_only else PRIORITIES):
+            queue = self._queues[p]
+            if queue:
+                task = queue.popleft()
+                if task.key is not None and self._keyed.get(task.key) is task:
+                    del self._keyed[task.key]
+                return task
+        return None
+
+    def _worker(self, critical_only):
+        while True:
+            with self._cond:
+                task = self._take(critical_only)
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    task = self._take(critical_only)
+                self.busy += 1
+            try:
+                self._run(task)
+            finally:
+                with self._cond:
+                    self.busy -= 1
+                    self.completed[task.priority] += 1
+
+    def _run(self, task):
+        if not task.future.set_running_or_notify_cancel():
+            return
+        start = time.perf_counter()
+        if self._wait_hist is not None:
+            self._wait_hist.observe(start - task.enqueued, priority=task.priority, task=task.name)
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except BaseException as e:
+            if self._error_counter is not None:
+                self._error_counter.inc(priority=task.priority, task=task.name)
+            task.future.set_exception(e)
+        else:
+            task.future.set_result(result)
+        finally:
+            if self._run_hist is not None:
+                self._run_hist.observe(time.perf_counter() - start, priority=task.priority, task=task.name)
+
+    # --- Lifecycle & stats ---
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    while queue:
+                        queue.popleft().future.cancel()
+                self._keyed.clear()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def queue_depth(self, priority=None):
+        if priority is not None:
+            return len(self._queues[priority])
+        return sum(len(q) for q in self._queues.values())
+
+    def depths(self):
+        return {p: len(q) for p, q in self._queues.items()}
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "reserved_critical": self.reserved_critical,
+                "busy": self.busy,
+                "queued": self.depths(),
+                "limits": dict(self.limits),
+                "submitted": dict(self.submitted),
+                "completed": dict(self.completed),
+                "dropped": dict(self.dropped),
+                "merged": dict(self.merged),
+            }
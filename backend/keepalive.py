@@ -0,0 +1,73 @@
+# backend/keepalive.py
+# Interval heartbeat OCPP yang menyesuaikan beban server.
+# Mode "websocket": liveness dicek lewat ping websocket (control frame, tanpa
+# JSON/handler), sehingga Heartbeat OCPP cukup jarang dan makin jarang saat
+# charger terhubung banyak atau event loop tertinggal.
+import threading
+
+
+class AdaptiveHeartbeat:
+    """
+    interval = clamp(connected / target_rate, min_interval, max_interval),
+    digandakan bila lag event loop > lag_high. Mode "heartbeat" (enabled=False)
+    selalu memakai base_interval seperti perilaku lama.
+    """
+
+    def __init__(self, enabled=True, base_interval=30, min_interval=120, max_interval=900,
+                 target_rate=20.0, lag_high=0.1, ping_interval=30):
+        self.enabled = enabled
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_rate = target_rate
+        self.lag_high = lag_high
+        self.ping_interval = ping_interval
+        self.interval = min_interval if enabled else base_interval
+        self.loop_lag = 0.0
+        self._assigned = {}     # charger_id -> interval yang diberikan saat boot
+        self._lock = threading.Lock()
+
+    @property
+    def longest_interval(self):
+        return self.max_interval if self.enabled else self.base_interval
+
+    def update(self, connected, loop_lag=0.0):
+        self.loop_lag = loop_lag
+        if not self.enabled:
+            return self.interval
+        interval = max(self.min_interval, connected / self.target_rate if self.target_rate else 0)
+        if loop_lag > self.lag_high:
+            interval *= 2
+        self.interval = int(min(self.max_interval, interval))
+        return self.interval
+
+    def assign(self, charger_id, interval):
+        with self._lock:
+            self._assigned[charger_id] = interval
+
+    def release(self, charger_id):
+        with self._lock:
+            self._assigned.pop(charger_id, None)
+
+    def report(self):
+        """Perkiraan pesan/detik: Heartbeat sekarang vs interval tetap base_interval."""
+        with self._lock:
+            intervals = list(self._assigned.values())
+        n = len(intervals)
+        heartbeat_rate = sum(1.0 / i for i in intervals if i)
+        baseline_rate = n / self.base_interval if self.base_interval else 0.0
+        ping_rate = n / self.ping_interval if self.enabled and self.ping_interval else 0.0
+        saved = baseline_rate - heartbeat_rate
+        return {
+            "mode": "websocket" if self.enabled else "heartbeat",
+            "interval": self.interval,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "chargers": n,
+            "heartbeat_per_s": round(heartbeat_rate, 2),
+            "baseline_heartbeat_per_s": round(baseline_rate, 2),
+            "ws_ping_per_s": round(ping_rate, 2),
+            "ocpp_msgs_saved_per_s": round(saved, 2),
+            # Heartbeat = CALL + CALLRESULT (dua frame JSON) per pesan
+            "ocpp_frames_saved_per_day": int(saved * 2 * 86400),
+            "saved_pct": round(100.0 * saved / baseline_rate, 1) if baseline_rate else 0.0,
+        }
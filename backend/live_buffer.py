@@ -0,0 +1,119 @@
+# backend/live_buffer.py
+import threading
+import time
+import logging
+
+logger = logging.getLogger("OCPP")
+
+# Kolom live di tabel chargers yang diisi dari MeterValues
+LIVE_FIELDS = ("current_session_kwh", "current_power_kw", "current_soc")
+
+
+class LiveMeterBuffer:
+    """
+    Write-behind buffer untuk update live meter (kWh/kW/SoC) dan kolom
+    snapshot lain dari ChargerStateRegistry (status, last_heartbeat).
+
+    Setiap charger hanya punya satu entry pending (last-write-wins per kolom),
+    sehingga jumlah baris yang di-flush dibatasi jumlah charger, bukan jumlah
+    frame MeterValues yang masuk.
+    """
+
+    def __init__(self, flush_fn, max_batch=500):
+        self._flush_fn = flush_fn
+        self._max_batch = max_batch
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        # Statistik (dibaca oleh stats())
+        self.updates_total = 0
+        self.updates_merged = 0
+        self.rows_flushed = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.consecutive_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def put(self, charger_id, kwh=None, kw=None, soc=None):
+        data = {}
+        if kwh is not None: data['current_session_kwh'] = kwh
+        if kw is not None: data['current_power_kw'] = kw
+        if soc is not None: data['current_soc'] = soc
+        self.put_fields(charger_id, data)
+
+    def put_fields(self, charger_id, data):
+        """Kolom bebas tabel chargers (mis. status, last_heartbeat dari ChargerStateRegistry)."""
+        if not data:
+            return
+        with self._lock:
+            self.updates_total += 1
+            entry = self._pending.get(charger_id)
+            if entry is None:
+                self._pending[charger_id] = dict(data)
+            else:
+                entry.update(data)
+                self.updates_merged += 1
+
+    def depth(self):
+        return len(self._pending)
+
+    def _drain(self):
+        with self._lock:
+            if len(self._pending) <= self._max_batch:
+                batch, self._pending = self._pending, {}
+                return batch
+            batch = {}
+            for cid in list(self._pending)[:self._max_batch]:
+                batch[cid] = self._pending.pop(cid)
+            return batch
+
+    def flush(self):
+        """Dipanggil dari thread DB. Mengirim semua entry pending secara bulk."""
+        with self._flush_lock:
+            batch = self._drain()
+            if not batch:
+                return 0
+            rows = [dict(charger_id=cid, **data) for cid, data in batch.items()]
+            start = time.perf_counter()
+            try:
+                self._flush_fn(rows)
+            except Exception as e:
+                self.flush_errors += 1
+                self.consecutive_errors += 1
+                logger.warning(f"⚠️ LIVE FLUSH ERROR ({len(rows)} rows): {e}")
+                # Kembalikan ke buffer tanpa menimpa update yang lebih baru
+                with self._lock:
+                    for cid, data in batch.items():
+                        newer = self._pending.get(cid)
+                        self._pending[cid] = {**data, **newer} if newer else data
+                return 0
+            elapsed = (time.perf_counter() - start) * 1000
+            self.flush_count += 1
+            self.consecutive_errors = 0
+            self.rows_flushed += len(rows)
+            self.last_flush_ms = round(elapsed, 1)
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            return len(rows)
+
+    def stats(self):
+        return {
+            "pending": self.depth(),
+            "updates_total": self.updates_total,
+            "updates_merged": self.updates_merged,
+            "rows_flushed": self.rows_flushed,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "consecutive_errors": self.consecutive_errors,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+def group_by_columns(rows):
+    """PostgREST bulk upsert butuh key yang seragam, jadi kelompokkan per set kolom."""
+    groups = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+    return list(groups.values())
@@ -0,0 +1,418 @@
+# backend/local_db.py
+# Backend database lokal (SQLite, mode WAL) dengan permukaan query builder yang
+# sama dengan client supabase: table().select().eq().order().limit().execute().
+# Dipakai saat Supabase tidak dikonfigurasi (site edge offline, benchmark, tes)
+# menggantikan mock client yang dulu membuang semua tulisan.
+#
+# Skema dinamis: tabel dibuat saat pertama dipakai, kolom ditambah saat pertama
+# ditulis. Nilai dict/list disimpan sebagai JSON, bool sebagai 0/1 dan
+# dikembalikan ke tipe asalnya saat dibaca.
+import json
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("UNIEV")
+
+# Kolom kunci (target conflict upsert). Tabel lain memakai "id" autoincrement.
+PRIMARY_KEYS = {
+    "chargers": "charger_id",
+    "transactions": "transaction_id",
+    "cpos": "cpo_id",
+    "tariff_templates": "template_id",
+    "tickets": "ticket_id",
+    "payments": "payment_id",
+    "api_keys": "key",
+    "ev_users": "user_id",
+    "user_profiles": "user_id",
+    "ocpp_workers": "worker_id",
+    "charger_ownership": "charger_id",
+}
+# Kolom yang di-index di tabel manapun yang memilikinya
+INDEXED_COLUMNS = ("charger_id", "status", "cpo_id", "stop_time")
+
+_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "like"}
+
+
+def _q(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _split_columns(columns):
+    """Pisah daftar kolom select di koma level atas: "id, tariffs(name,price)" -> ["id", "tariffs(name,price)"]."""
+    out, depth, cur = [], 0, ""
+    for ch in columns:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            out.append(cur.strip())
+            cur = ""
+        else:
+            cur += ch
+    if cur.strip():
+        out.append(cur.strip())
+    return [c for c in out if c]
+
+
+def _parse_embed(spec):
+    """
+    "tariffs(*)" / "tarif:tariffs!fk(name,price_kwh)" -> (key hasil, tabel, kolom).
+    Hanya relasi many-to-one satu level; bentuk lain NotImplementedError.
+    """
+    head, _, inner = spec.partition("(")
+    if not inner.endswith(")") or "(" in inner:
+        raise NotImplementedError(f"local backend: unsupported embedded select {spec!r} (only one level)")
+    alias, _, table = head.partition(":") if ":" in head else (head, "", head)
+    table = table.split("!")[0].strip()
+    return alias.strip(), table, inner[:-1]
+
+
+class LocalResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class LocalQuery:
+    """Satu query; method filter/modifier mengembalikan self seperti request builder postgrest."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.count = None
+        self.values = None
+        self.on_conflict = None
+        self.filters = []       # (kolom, operator sql, nilai)
+        self.orders = []        # (kolom, desc)
+        self.limit_n = None
+        self.offset_n = None
+
+    # --- operasi ---
+    def select(self, *columns, count=None):
+        self.op = "select"
+        self.columns = ",".join(columns) if columns else "*"
+        self.count = count
+        return self
+
+    def insert(self, data, count=None, upsert=False):
+        self.op, self.values, self.count = ("upsert" if upsert else "insert"), data, count
+        return self
+
+    def upsert(self, data, count=None, on_conflict=None, ignore_duplicates=False):
+        self.op, self.values, self.count, self.on_conflict = "upsert", data, count, on_conflict
+        return self
+
+    def update(self, data, count=None):
+        self.op, self.values, self.count = "update", data, count
+        return self
+
+    def delete(self, count=None):
+        self.op, self.count = "delete", count
+        return self
+
+    # --- filter ---
+    def _filter(self, op, column, value):
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value): return self._filter("=", column, value)
+    def neq(self, column, value): return self._filter("!=", column, value)
+    def gt(self, column, value): return self._filter(">", column, value)
+    def gte(self, column, value): return self._filter(">=", column, value)
+    def lt(self, column, value): return self._filter("<", column, value)
+    def lte(self, column, value): return self._filter("<=", column, value)
+    def like(self, column, pattern): return self._filter("like", column, pattern.replace("*", "%"))
+    def ilike(self, column, pattern): return self._filter("like", column, pattern.replace("*", "%"))
+    def in_(self, column, values): return self._filter("in", column, list(values))
+    def is_(self, column, value): return self._filter("is", column, value)
+
+    def match(self, query):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def filter(self, column, operator, criteria):
+        return self._filter(_OPS[operator], column, criteria)
+
+    # --- modifier ---
+    def order(self, column, desc=False, nullsfirst=False, foreign_table=None):
+        for col in column.split(","):
+            if col.strip():
+                self.orders.append((col.strip(), desc))
+        return self
+
+    def limit(self, size, foreign_table=None):
+        self.limit_n = int(size)
+        return self
+
+    def range(self, start, end):
+        self.offset_n, self.limit_n = int(start), int(end) - int(start) + 1
+        return self
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+class LocalClient:
+    """Client SQLite; koneksi per thread (executor OCPP server, threadpool API)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._columns = {}      # tabel -> {kolom: kind}; kind "" / "json" / "bool"
+        self._version = None    # (schema_version, user_version) saat _columns diisi
+        with self._conn() as c:
+            c.execute("create table if not exists _uniev_columns (tbl text, col text, kind text, primary key (tbl, col))")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    from_ = table
+
+    # --- skema ---
+    def _fresh(self, conn):
+        """Kosongkan cache kolom bila proses/thread lain mengubah skema.
+
+        schema_version naik pada alter/create table; user_version dinaikkan
+        _ensure saat kind kolom (json/bool) berubah. Satu pragma per query.
+        """
+        version = conn.execute("select * from pragma_schema_version, pragma_user_version").fetchone()
+        if version != self._version:
+            with self._lock:
+                self._columns.clear()
+                self._version = version
+
+    def _load(self, conn, table):
+        cols = {r[1]: "" for r in conn.execute(f"pragma table_info({_q(table)})")}
+        for col, kind in conn.execute("select col, kind from _uniev_columns where tbl = ?", (table,)):
+            if col in cols:
+                cols[col] = kind
+        self._columns[table] = cols
+        return cols
+
+    def _schema(self, conn, table, refresh=False):
+        cols = self._columns.get(table)
+        if cols is None or refresh:
+            cols = self._load(conn, table)
+        return cols
+
+    def _ensure(self, conn, table, rows):
+        """Buat tabel / tambah kolom yang belum ada (proses lain bisa sudah menambahkannya)."""
+        needed = {}
+        for row in rows:
+            for col, val in row.items():
+                kind = "json" if isinstance(val, (dict, list)) else "bool" if isinstance(val, bool) else ""
+                if kind or col not in needed:
+                    needed[col] = kind or needed.get(col, "")
+        with self._lock:
+            cols = self._schema(conn, table)
+            if all(c in cols and (not k or cols[c] == k) for c, k in needed.items()):
+                return cols
+            cols = self._schema(conn, table, refresh=True)
+            if not cols:
+                pk = PRIMARY_KEYS.get(table)
+                pk_sql = f"{_q(pk)} primary key" if pk else "id integer primary key autoincrement"
+                conn.execute(f"create table if not exists {_q(table)} ({pk_sql})")
+                cols = self._load(conn, table)
+            kinds_changed = False
+            for col, kind in needed.items():
+                if col not in cols:
+                    try:
+                        conn.execute(f"alter table {_q(table)} add column {_q(col)}")
+                    except sqlite3.OperationalError as e:
+                        if "duplicate column" not in str(e):
+                            raise
+                    if col in INDEXED_COLUMNS:
+                        conn.execute(f"create index if not exists {_q(f'idx_{table}_{col}')} on {_q(table)}({_q(col)})")
+                    cols[col] = ""
+                if kind and cols[col] != kind:
+                    conn.execute("insert or replace into _uniev_columns values (?, ?, ?)", (table, col, kind))
+                    cols[col] = kind
+                    kinds_changed = True
+            if kinds_changed:
+                # _uniev_columns bukan perubahan skema; beri tahu cache proses lain lewat user_version
+                version = conn.execute("pragma user_version").fetchone()[0]
+                conn.execute(f"pragma user_version = {version + 1}")
+            return cols
+
+    # --- konversi nilai ---
+    @staticmethod
+    def _encode(val):
+        if isinstance(val, (dict, list)):
+            return json.dumps(val, default=str)
+        if isinstance(val, bool):
+            return int(val)
+        if val is not None and not isinstance(val, (int, float, str, bytes)):
+            return str(val)
+        return val
+
+    @staticmethod
+    def _decode(cols, names, row):
+        out = {}
+        for name, val in zip(names, row):
+            kind = cols.get(name, "")
+            if val is not None and kind == "json":
+                val = json.loads(val)
+            elif val is not None and kind == "bool":
+                val = bool(val)
+            out[name] = val
+        return out
+
+    def _where(self, query, cols):
+        parts, args = [], []
+        for col, op, val in query.filters:
+            if col not in cols:
+                # kolom belum pernah ditulis: setara NULL untuk semua baris
+                if (op == "is" and val in (None, "null")) or (op == "!=" and val is not None):
+                    continue
+                parts.append("0")
+                continue
+            if op == "in":
+                if not val:
+                    parts.append("0")
+                    continue
+                parts.append(f"{_q(col)} in ({','.join('?' * len(val))})")
+                args.extend(self._encode(v) for v in val)
+            elif op == "is" or (op == "=" and val is None):
+                parts.append(f"{_q(col)} is null" if val in (None, "null") else f"{_q(col)} is ?")
+                if val not in (None, "null"):
+                    args.append(self._encode(val))
+            elif op == "!=":
+                # postgrest neq tidak mengembalikan baris NULL, sama dengan SQL
+                parts.append(f"{_q(col)} != ?")
+                args.append(self._encode(val))
+            else:
+                parts.append(f"{_q(col)} {op} ?")
+                args.append(self._encode(val))
+        return (" where " + " and ".join(parts)) if parts else "", args
+
+    def _returning(self, conn, query, sql, args):
+        cur = conn.execute(sql + " returning *", args)
+        names = [d[0] for d in cur.description]
+        cols = self._schema(conn, query.table)
+        return [self._decode(cols, names, r) for r in cur.fetchall()]
+
+    def execute(self, query):
+        conn = self._conn()
+        self._fresh(conn)
+        if query.op == "select":
+            return self._select(conn, query)
+        if query.op in ("insert", "upsert"):
+            rows = query.values if isinstance(query.values, list) else [query.values]
+            return self._write(conn, query, rows)
+        cols = self._schema(conn, query.table)
+        if not cols:
+            return LocalResult([], 0 if query.count else None)
+        if query.op == "update":
+            cols = self._ensure(conn, query.table, [query.values])
+            where, args = self._where(query, cols)
+            sets = ", ".join(f"{_q(c)} = ?" for c in query.values)
+            data = self._returning(conn, query, f"update {_q(query.table)} set {sets}{where}",
+                                   [self._encode(v) for v in query.values.values()] + args)
+        else:
+            where, args = self._where(query, cols)
+            data = self._returning(conn, query, f"delete from {_q(query.table)}{where}", args)
+        return LocalResult(data, len(data) if query.count else None)
+
+    def _select(self, conn, query):
+        cols = self._schema(conn, query.table)
+        if not cols:
+            cols = self._schema(conn, query.table, refresh=True)
+        if not cols:
+            return LocalResult([], 0 if query.count else None)
+        where, args = self._where(query, cols)
+        count = None
+        if query.count:
+            count = conn.execute(f"select count(*) from {_q(query.table)}{where}", args).fetchone()[0]
+        wanted = _split_columns(query.columns)
+        embeds = [_parse_embed(c) for c in wanted if "(" in c]
+        wanted = [c for c in wanted if "(" not in c]
+        if "*" in wanted:
+            names = list(cols)
+        else:
+            names = wanted
+        present = [n for n in names if n in cols]
+        # Kolom foreign key embed ikut dibaca walau tidak diminta
+        fetch = present + [f for f in (self._fk_column(t) for _, t, _ in embeds) if f in cols and f not in present]
+        sql = f"select {', '.join(_q(n) for n in fetch) or 'null'} from {_q(query.table)}{where}"
+        orders = [(c, d) for c, d in query.orders if c in cols]
+        if orders:
+            sql += " order by " + ", ".join(f"{_q(c)} {'desc' if d else 'asc'}" for c, d in orders)
+        if query.limit_n is not None or query.offset_n:
+            sql += f" limit {query.limit_n if query.limit_n is not None else -1}"
+            if query.offset_n:
+                sql += f" offset {query.offset_n}"
+        data = []
+        for r in conn.execute(sql, args):
+            row = self._decode(cols, fetch, r)
+            out = {n: row.get(n) for n in names}
+            for alias, table, columns in embeds:
+                out[alias] = self._embed(conn, table, columns, row.get(self._fk_column(table)))
+            data.append(out)
+        return LocalResult(data, count)
+
+    # --- embed many-to-one (select("tariff_id, tariffs(*)")) ---
+    @staticmethod
+    def _fk_column(table):
+        """Konvensi skema Supabase: chargers.tariff_id -> tariffs."""
+        return (table[:-1] if table.endswith("s") else table) + "_id"
+
+    def _embed(self, conn, table, columns, fk_value):
+        """Baris induk sebagai dict (bentuk postgrest many-to-one); None bila FK kosong/tidak ketemu."""
+        if fk_value is None:
+            return None
+        cols = self._schema(conn, table) or self._schema(conn, table, refresh=True)
+        fk = self._fk_column(table)
+        key = PRIMARY_KEYS.get(table) or (fk if fk in cols else "id")
+        if key not in cols:
+            return None
+        child = LocalQuery(self, table).select(columns).eq(key, fk_value).limit(1)
+        rows = self._select(conn, child).data
+        return rows[0] if rows else None
+
+    def _write(self, conn, query, rows):
+        if not rows:
+            return LocalResult([], 0 if query.count else None)
+        self._ensure(conn, query.table, rows)
+        target = query.on_conflict or PRIMARY_KEYS.get(query.table, "id")
+        out = []
+        conn.execute("begin")
+        try:
+            for row in rows:
+                names = list(row)
+                sql = (f"insert into {_q(query.table)} ({', '.join(_q(n) for n in names)}) "
+                       f"values ({', '.join('?' * len(names))})")
+                if query.op == "upsert" and target and target in row:
+                    updates = [n for n in names if n != target]
+                    if updates:
+                        sql += f" on conflict({_q(target)}) do update set " + \
+                               ", ".join(f"{_q(n)} = excluded.{_q(n)}" for n in updates)
+                    else:
+                        sql += f" on conflict({_q(target)}) do nothing"
+                out.extend(self._returning(conn, query, sql, [self._encode(row[n]) for n in names]))
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return LocalResult(out, len(out) if query.count else None)
+
+    def stats(self):
+        conn = self._conn()
+        tables = [r[0] for r in conn.execute(
+            "select name from sqlite_master where type = 'table' and name not like 'sqlite_%' and name != '_uniev_columns'")]
+        return {"path": self.path,
+                "tables": {t: conn.execute(f"select count(*) from {_q(t)}").fetchone()[0] for t in tables}}
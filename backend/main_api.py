@@ -1,7 +1,8 @@
 # backend/main_api.py
 from fastapi import FastAPI, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Literal, Optional
 import uvicorn
 import traceback
 import sys
@@ -10,15 +11,31 @@ from datetime import datetime, timedelta
 # --- UNIVERSAL IMPORT (Config & Database) ---
 try:
     from backend import config
-    from backend.database import supabase
+    from backend.database import supabase, Database, query_cache
+    from backend import cold_start
 except ImportError:
     try:
         import config
-        from database import supabase
+        from database import supabase, Database, query_cache
+        import cold_start
     except Exception as e:
         print(f"CRITICAL API IMPORT ERROR: {e}", file=sys.stderr)
         config = None
         supabase = None
+        Database = None
+        query_cache = None
+
+try:
+    from backend.ocpp_bridge import notify_command, fetch_charger_states, merge_live_state, fetch_session_series, fetch_charger_sessions
+except ImportError:
+    try:
+        from ocpp_bridge import notify_command, fetch_charger_states, merge_live_state, fetch_session_series, fetch_charger_sessions
+    except Exception:
+        def notify_command(cmd): return False
+        def fetch_charger_states(charger_ids=None): return {}
+        def merge_live_state(rows, states=None): return rows
+        def fetch_session_series(transaction_id, start=None, end=None, max_points=None, charger_id=None): return None
+        def fetch_charger_sessions(charger_id): return []
 
 # --- CONFIGURATION RESOLUTION (Pastikan port 8088 atau 8000) ---
 API_HOST = getattr(config, "HOST", "0.0.0.0") if config else "0.0.0.0"
@@ -97,23 +114,90 @@ app = FastAPI(
     version="1.0.0"
 )
 
+def db():
+    """Client DB async (pool keep-alive) milik event loop API; query di-await tanpa threadpool."""
+    return Database.get_async_client()
+
+async def _data(query):
+    return (await query.execute()).data
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Hit/miss cache baca tabel referensi (untuk sizing DB_CACHE_TTLS / DB_CACHE_MAX_ENTRIES)."""
+    return query_cache.stats()
+
+@app.get("/api/db/queries")
+def db_queries(limit: int = 20, by: str = "total_ms"):
+    """Top query DB proses API per (tabel, operasi, call site); by = total_ms | avg_ms | max_ms | count | rows | bytes_in | bytes_out | errors | slow"""
+    return Database.query_stats(limit, by)
+
+@app.post("/api/cache/invalidate")
+def cache_invalidate(table: str | None = None):
+    n = query_cache.invalidate(table) if table else query_cache.invalidate()
+    return {"invalidated": n}
+
+@app.get("/api/db/health")
+def db_health():
+    """Status health probe DB (background) dan waktu cold start proses API."""
+    return {"db": Database.health(), "cold_start": cold_start.report()}
+
+@app.on_event("startup")
+async def mark_ready():
+    if Database:
+        Database.warm_up()
+    cold_start.mark("main_api")
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    if Database:
+        await Database.aclose()
+
 # --- 3. CORE ENDPOINTS (Module 1.2 & 2.1) ---
 
 @app.get("/")
 def root():
-    db_status = "Connected" if supabase else "Offline (CRASHED)"
+    # Tanpa query jaringan: status dari health probe background
+    ok = Database.health()["ok"] if Database else False
+    db_status = "Connected" if ok else ("Checking" if ok is None and supabase else "Offline (CRASHED)")
     return {"status": "Online", "service": "UNIEV Core Backend", "db_status": db_status, "docs_url": f"http://localhost:{API_PORT}/docs"}
 
 @app.get("/api/chargers")
-def get_all_chargers():
+async def get_all_chargers():
     """Melihat semua charger yang terdaftar (Untuk Map/List)"""
     if not supabase:
         return {"error": "Database not connected"}
-    res = supabase.table("chargers").select("*").order("charger_id").execute()
-    return res.data
+    rows = await query_cache.afetch("chargers", ("list",), lambda: _data(db().table("chargers").select("*").order("charger_id")))
+    return await run_in_threadpool(merge_live_state, rows or [])
+
+@app.get("/api/chargers/live")
+def get_live_chargers():
+    """State live charger langsung dari memori OCPP server (tanpa query DB)"""
+    states = fetch_charger_states()
+    return sorted(states.values(), key=lambda s: s["charger_id"])
+
+@app.get("/api/chargers/{charger_id}/live")
+def get_live_charger(charger_id: str):
+    state = fetch_charger_states([charger_id]).get(charger_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Charger not connected to OCPP server")
+    return state
+
+@app.get("/api/sessions/{transaction_id}/curve")
+def get_session_curve(transaction_id: int, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                      max_points: int = 500, charger_id: Optional[str] = None):
+    """Kurva sesi (energi Wh, daya W, SoC) dari time-series OCPP server; start_ms/end_ms dan ts_ms epoch ms."""
+    curve = fetch_session_series(transaction_id, start_ms, end_ms, max_points or None, charger_id)
+    if curve is None:
+        raise HTTPException(status_code=404, detail="No meter series for this session")
+    return curve
+
+@app.get("/api/chargers/{charger_id}/sessions")
+def get_charger_sessions(charger_id: str):
+    """Sesi charger yang punya kurva meter (terbaru dulu)."""
+    return fetch_charger_sessions(charger_id)
 
 @app.post("/api/chargers")
-def register_charger(charger: ChargerCreate):
+async def register_charger(charger: ChargerCreate):
     """(Admin) Mendaftarkan Charger Baru secara Manual"""
     if not supabase:
         raise HTTPException(status_code=503, detail="Database Offline")
@@ -127,13 +211,14 @@ def register_charger(charger: ChargerCreate):
         "last_heartbeat": datetime.utcnow().isoformat()
     }
     try:
-        supabase.table("chargers").upsert(data).execute()
+        await db().table("chargers").upsert(data).execute()
+        query_cache.invalidate("chargers")
         return {"message": "Charger Registered", "data": data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.put("/api/chargers/{charger_id}/status")
-def force_status_change(charger_id: str, state: StatusUpdate):
+async def force_status_change(charger_id: str, state: StatusUpdate):
     """(Simulation) Memaksa ubah status charger (digunakan untuk reset)"""
     if not supabase:
         raise HTTPException(status_code=503, detail="Database Offline")
@@ -143,7 +228,8 @@ def force_status_change(charger_id: str, state: StatusUpdate):
         raise HTTPException(status_code=400, detail=f"Status harus salah satu dari: {valid_status}")
 
     try:
-        supabase.table("chargers").update({"status": state.status}).eq("charger_id", charger_id).execute()
+        await db().table("chargers").update({"status": state.status}).eq("charger_id", charger_id).execute()
+        query_cache.invalidate("chargers")
         return {"message": f"Charger {charger_id} status changed to {state.status}"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -152,7 +238,7 @@ def force_status_change(charger_id: str, state: StatusUpdate):
 # --- 4. COMMAND & USER INTERACTION ENDPOINTS (Module 2.1) ---
 
 @app.post("/api/client/remote-start")
-def user_remote_start(charger_id: str, user_id: str = Body(..., embed=True, example="USR-8821")):
+async def user_remote_start(charger_id: str, user_id: str = Body(..., embed=True, example="USR-8821")):
     """
     (Frontend User App) Menerima permintaan START CHARGING dari pengguna.
     Menyimpan ke tabel command queue untuk dibaca oleh OCPP Server.
@@ -166,13 +252,14 @@ def user_remote_start(charger_id: str, user_id: str = Body(..., embed=True, exam
             "action": "REMOTE_START", 
             "status": "PENDING"
         }
-        supabase.table("charging_commands").insert(data).execute()
-        return {"status": "Accepted", "message": "Command queued. Waiting for charger response."}
+        res = await db().table("charging_commands").insert(data).execute()
+        delivery = await run_in_threadpool(notify_command, res.data[0] if res.data else data)
+        return {"status": "Accepted", "message": "Command queued. Waiting for charger response.", "delivery": delivery}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to queue command: {str(e)}")
 
 @app.post("/api/client/remote-stop")
-def user_remote_stop(charger_id: str, user_id: str = Body(..., embed=True, example="USR-8821")):
+async def user_remote_stop(charger_id: str, user_id: str = Body(..., embed=True, example="USR-8821")):
     """(Frontend User App) Menerima permintaan STOP CHARGING."""
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     
@@ -183,8 +270,9 @@ def user_remote_stop(charger_id: str, user_id: str = Body(..., embed=True, examp
             "action": "REMOTE_STOP", 
             "status": "PENDING"
         }
-        supabase.table("charging_commands").insert(data).execute()
-        return {"status": "Accepted", "message": "Stop command queued."}
+        res = await db().table("charging_commands").insert(data).execute()
+        delivery = await run_in_threadpool(notify_command, res.data[0] if res.data else data)
+        return {"status": "Accepted", "message": "Stop command queued.", "delivery": delivery}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to queue command: {str(e)}")
 
@@ -192,7 +280,7 @@ def user_remote_stop(charger_id: str, user_id: str = Body(..., embed=True, examp
 # --- 5. FINANCIAL & MAINTENANCE ENDPOINTS (Module 2.3 & 2.1) ---
 
 @app.post("/api/billing/manual-invoice")
-def create_manual_invoice(inv: ManualInvoice):
+async def create_manual_invoice(inv: ManualInvoice):
     """(Admin) Membuat tagihan manual (misal: denda, biaya tambahan)"""
     if not supabase: return {"error": "DB Offline"}
     
@@ -204,43 +292,45 @@ def create_manual_invoice(inv: ManualInvoice):
         "stop_time": datetime.utcnow().isoformat() 
     }
     try:
-        supabase.table("invoices").insert(data).execute() # Gunakan tabel 'invoices' atau 'transactions' tergantung skema Anda
+        await db().table("invoices").insert(data).execute() # Gunakan tabel 'invoices' atau 'transactions' tergantung skema Anda
         return {"status": "Success", "msg": f"Manual Invoice Rp {inv.amount} Created"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/operations/fault-logs")
-def get_fault_logs():
+async def get_fault_logs():
     """(Dashboard) Melihat daftar tiket kerusakan yang masih terbuka"""
     if not supabase: return []
-    res = supabase.table("maintenance_tickets").select("*").eq("status", "OPEN").execute()
+    res = await db().table("maintenance_tickets").select("*").eq("status", "OPEN").execute()
     return res.data
 
 @app.post("/api/cpo/register")
-def cpo_register(cpo: CPOCreate):
+async def cpo_register(cpo: CPOCreate):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     data = cpo.dict()
     data.update({"status": "Pending", "created_at": datetime.utcnow().isoformat()})
     try:
-        supabase.table("cpos").upsert(data).execute()
+        await db().table("cpos").upsert(data).execute()
+        query_cache.invalidate("cpos")
         return {"message": "CPO Registered", "data": data}
     except Exception:
         return {"message": "CPO Registered (soft)", "data": data}
 
 @app.post("/api/cpo/{cpo_id}/verify")
-def cpo_verify(cpo_id: str):
+async def cpo_verify(cpo_id: str):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     try:
-        supabase.table("cpos").update({"status": "Verified", "verified_at": datetime.utcnow().isoformat()}).eq("cpo_id", cpo_id).execute()
+        await db().table("cpos").update({"status": "Verified", "verified_at": datetime.utcnow().isoformat()}).eq("cpo_id", cpo_id).execute()
+        query_cache.invalidate("cpos")
         return {"message": "CPO Verified", "cpo_id": cpo_id}
     except Exception:
         return {"message": "CPO Verified (soft)", "cpo_id": cpo_id}
 
 @app.get("/api/cpo/{cpo_id}/wallet")
-def cpo_wallet(cpo_id: str):
+async def cpo_wallet(cpo_id: str):
     if not supabase: return {"balance": 0, "breakdown": {"gross": 0, "platform_fee": 0, "pg_fee": 0, "net": 0}}
     try:
-        tx = supabase.table("transactions").select("total_amount, platform_fee, pg_fee").eq("cpo_id", cpo_id).execute().data
+        tx = (await db().table("transactions").select("total_amount, platform_fee, pg_fee").eq("cpo_id", cpo_id).execute()).data
         gross = sum([t.get("total_amount", 0) or 0 for t in tx])
         platform_fee = sum([t.get("platform_fee", 0) or 0 for t in tx])
         pg_fee = sum([t.get("pg_fee", 0) or 0 for t in tx])
@@ -250,65 +340,67 @@ def cpo_wallet(cpo_id: str):
         return {"balance": 0, "breakdown": {"gross": 0, "platform_fee": 0, "pg_fee": 0, "net": 0}}
 
 @app.post("/api/cpo/{cpo_id}/settlements/request")
-def cpo_settlement_request(cpo_id: str, req: SettlementRequest):
+async def cpo_settlement_request(cpo_id: str, req: SettlementRequest):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     data = {"cpo_id": cpo_id, "amount": req.amount, "method": req.method, "notes": req.notes, "status": "PENDING", "requested_at": datetime.utcnow().isoformat()}
     try:
-        supabase.table("settlements").insert(data).execute()
+        await db().table("settlements").insert(data).execute()
         return {"message": "Settlement Requested", "data": data}
     except Exception:
         return {"message": "Settlement Requested (soft)", "data": data}
 
 @app.get("/api/noc/evse")
-def noc_evse():
+async def noc_evse():
     if not supabase: return {"evse": []}
     try:
-        chargers = supabase.table("chargers").select("*").execute().data
-        return {"evse": chargers}
+        chargers = await query_cache.afetch("chargers", ("all",), lambda: _data(db().table("chargers").select("*")))
+        return {"evse": await run_in_threadpool(merge_live_state, chargers or [])}
     except Exception:
         return {"evse": []}
 
 @app.post("/api/tariffs/templates")
-def create_tariff_template(t: TariffTemplateCreate):
+async def create_tariff_template(t: TariffTemplateCreate):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     try:
-        supabase.table("tariff_templates").upsert(t.dict()).execute()
+        await db().table("tariff_templates").upsert(t.dict()).execute()
+        query_cache.invalidate("tariff_templates")
         return {"message": "Tariff Template Saved"}
     except Exception:
         return {"message": "Tariff Template Saved (soft)"}
 
 @app.get("/api/tariffs/templates")
-def list_tariff_templates(cpo_id: str | None = None):
+async def list_tariff_templates(cpo_id: str | None = None):
     if not supabase: return []
-    q = supabase.table("tariff_templates").select("*")
+    q = db().table("tariff_templates").select("*")
     if cpo_id: q = q.eq("cpo_id", cpo_id)
-    return q.execute().data
+    return await query_cache.afetch("tariff_templates", ("list", cpo_id), lambda: _data(q))
 
 @app.post("/api/tariffs/assign")
-def assign_tariff(charger_id: str, template_id: str):
+async def assign_tariff(charger_id: str, template_id: str):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     try:
-        supabase.table("chargers").update({"tariff_template_id": template_id}).eq("charger_id", charger_id).execute()
+        await db().table("chargers").update({"tariff_template_id": template_id}).eq("charger_id", charger_id).execute()
+        query_cache.invalidate("chargers")
         return {"message": "Tariff assigned", "charger_id": charger_id, "template_id": template_id}
     except Exception:
         return {"message": "Tariff assigned (soft)", "charger_id": charger_id, "template_id": template_id}
 
 @app.post("/api/tickets")
-def create_ticket(t: TicketCreate):
+async def create_ticket(t: TicketCreate):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     data = t.dict()
     data.update({"created_at": datetime.utcnow().isoformat()})
     try:
-        supabase.table("tickets").insert(data).execute()
+        await db().table("tickets").insert(data).execute()
         return {"message": "Ticket Created"}
     except Exception:
         return {"message": "Ticket Created (soft)"}
 
 @app.put("/api/tickets/{ticket_id}")
-def update_ticket(ticket_id: str, status: str, assignee: str | None = None):
+async def update_ticket(ticket_id: str, status: str, assignee: str | None = None):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     try:
-        supabase.table("tickets").update({"status": status, "assignee": assignee}).eq("ticket_id", ticket_id).execute()
+        await db().table("tickets").update({"status": status, "assignee": assignee}).eq("ticket_id", ticket_id).execute()
         return {"message": "Ticket Updated"}
     except Exception:
         return {"message": "Ticket Updated (soft)"}
@@ -318,23 +410,24 @@ def _mask_key(k: str) -> str:
     return k[:4] + "****" + k[-4:]
 
 @app.post("/api/payments/providers")
-def upsert_payment_provider(cfg: PaymentProviderConfig):
+async def upsert_payment_provider(cfg: PaymentProviderConfig):
     data = cfg.dict()
     if not supabase:
         return {"message": "Provider Saved (soft)", "provider": data | {"api_key": _mask_key(cfg.api_key)}}
     try:
-        supabase.table("payment_providers").upsert(data).execute()
+        await db().table("payment_providers").upsert(data).execute()
+        query_cache.invalidate("payment_providers")
         return {"message": "Provider Saved", "provider": data | {"api_key": _mask_key(cfg.api_key)}}
     except Exception:
         return {"message": "Provider Saved (soft)", "provider": data | {"api_key": _mask_key(cfg.api_key)}}
 
 @app.get("/api/payments/providers")
-def list_payment_providers(cpo_id: str | None = None):
+async def list_payment_providers(cpo_id: str | None = None):
     if not supabase: return []
     try:
-        q = supabase.table("payment_providers").select("provider, environment, name, cpo_id, api_key")
+        q = db().table("payment_providers").select("provider, environment, name, cpo_id, api_key")
         if cpo_id: q = q.eq("cpo_id", cpo_id)
-        res = q.execute().data
+        res = await query_cache.afetch("payment_providers", ("list", cpo_id), lambda: _data(q))
         for r in res:
             r["api_key"] = _mask_key(r.get("api_key",""))
         return res
@@ -342,7 +435,7 @@ def list_payment_providers(cpo_id: str | None = None):
         return []
 
 @app.post("/api/payments/intent")
-def create_payment_intent(req: PaymentIntentRequest):
+async def create_payment_intent(req: PaymentIntentRequest):
     pid = f"PAY-{int(datetime.utcnow().timestamp())}"
     link = f"https://pay.dev/uniev/{pid}" if req.provider == "xendit" else f"https://pay.dev/midtrans/{pid}"
     data = {
@@ -361,17 +454,17 @@ def create_payment_intent(req: PaymentIntentRequest):
     if not supabase:
         return {"message": "Payment Intent Created (soft)", "data": data}
     try:
-        supabase.table("payments").insert(data).execute()
+        await db().table("payments").insert(data).execute()
         return {"message": "Payment Intent Created", "data": data}
     except Exception:
         return {"message": "Payment Intent Created (soft)", "data": data}
 
 @app.get("/api/payments/{payment_id}")
-def get_payment_status(payment_id: str):
+async def get_payment_status(payment_id: str):
     if not supabase:
         return {"payment_id": payment_id, "status": "PENDING"}
     try:
-        res = supabase.table("payments").select("*").eq("payment_id", payment_id).limit(1).execute().data
+        res = (await db().table("payments").select("*").eq("payment_id", payment_id).limit(1).execute()).data
         return res[0] if res else {"payment_id": payment_id, "status": "UNKNOWN"}
     except Exception:
         return {"payment_id": payment_id, "status": "PENDING"}
@@ -379,22 +472,22 @@ def get_payment_status(payment_id: str):
 # --- 6. ANALYTICS & REPORTING ENDPOINTS (Module 2.4) ---
 
 @app.get("/api/analytics/dashboard")
-def get_dashboard_stats():
+async def get_dashboard_stats():
     """Analytics Summary untuk Dashboard CPO (KPIs)"""
     if not supabase: return {"error": "DB Offline"}
         
     # [NOTE] Ini adalah contoh agregasi yang lambat. Di production, gunakan View SQL.
     
-    res_energy = supabase.table("transactions").select("total_kwh").execute()
+    res_energy = await db().table("transactions").select("total_kwh").execute()
     total_energy = sum([x['total_kwh'] for x in res_energy.data if x['total_kwh']])
     
-    res_rev = supabase.table("transactions").select("total_amount").execute()
+    res_rev = await db().table("transactions").select("total_amount").execute()
     total_revenue = sum([x['total_amount'] for x in res_rev.data if x['total_amount']])
     
     # Uptime Logic
-    all_chargers = supabase.table("chargers").select("status", count="exact").execute()
+    all_chargers = await db().table("chargers").select("status", count="exact").execute()
     total_units = all_chargers.count
-    healthy_chargers = supabase.table("chargers").select("status", count="exact").neq("status", "Faulted").neq("status", "Offline").execute()
+    healthy_chargers = await db().table("chargers").select("status", count="exact").neq("status", "Faulted").neq("status", "Offline").execute()
     healthy_count = healthy_chargers.count
     uptime = (healthy_count / total_units) * 100 if total_units > 0 else 0
     
@@ -416,21 +509,22 @@ def get_utilization_chart():
     }
 
 @app.post("/api/evse/command")
-def evse_command(charger_id: str, action: Literal["REBOOT","UNLOCK","LOCK","UPDATE_FIRMWARE","UPDATE_CONFIG"], payload: dict | None = None):
+async def evse_command(charger_id: str, action: Literal["REBOOT","UNLOCK","LOCK","UPDATE_FIRMWARE","UPDATE_CONFIG"], payload: dict | None = None):
     if not supabase: raise HTTPException(status_code=503, detail="Database Offline")
     data = {"charger_id": charger_id, "action": action, "status": "PENDING", "payload": payload, "ts": datetime.utcnow().isoformat()}
     try:
-        supabase.table("charging_commands").insert(data).execute()
-        return {"message": "Command queued", "data": data}
+        res = await db().table("charging_commands").insert(data).execute()
+        delivery = await run_in_threadpool(notify_command, res.data[0] if res.data else data)
+        return {"message": "Command queued", "data": data, "delivery": delivery}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/reports/transactions.csv")
-def export_transactions_csv():
+async def export_transactions_csv():
     if not supabase:
         return ""
     try:
-        res = supabase.table("transactions").select("*").order("stop_time", desc=True).execute().data
+        res = (await db().table("transactions").select("*").order("stop_time", desc=True).execute()).data
         import csv, io
         buf = io.StringIO()
         fields = list(res[0].keys()) if res else ["transaction_id","charger_id","stop_time","total_kwh","total_amount","status","payment_status"]
@@ -449,22 +543,22 @@ class APIKeyCreate(BaseModel):
     cpo_id: str | None = None
 
 @app.post("/api/apikeys")
-def create_api_key(payload: APIKeyCreate):
+async def create_api_key(payload: APIKeyCreate):
     if not supabase:
         return {"message": "API key saved (soft)", "data": payload.dict()}
     try:
-        supabase.table("api_keys").upsert(payload.dict()).execute()
+        await db().table("api_keys").upsert(payload.dict()).execute()
         return {"message": "API key saved"}
     except Exception:
         return {"message": "API key saved (soft)"}
 
 @app.get("/api/apikeys")
-def list_api_keys(cpo_id: str | None = None):
+async def list_api_keys(cpo_id: str | None = None):
     if not supabase: return []
-    q = supabase.table("api_keys").select("name,key,status,cpo_id,created_at")
+    q = db().table("api_keys").select("name,key,status,cpo_id,created_at")
     if cpo_id: q = q.eq("cpo_id", cpo_id)
     try:
-        items = q.execute().data
+        items = (await q.execute()).data
         for i in items:
             k = i.get("key", "")
             i["key"] = (k[:4] + "****" + k[-4:]) if k else ""
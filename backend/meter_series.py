@@ -0,0 +1,394 @@
+# backend/meter_series.py
+# Time-series MeterValues per sesi (transaction_id) dan charger, kolumnar:
+# tiap kolom disimpan di array.array, per CHUNK sampel di-seal lalu dikompres
+# zlib (timestamp delta-encoded). Chunk yang sudah di-seal di-append ke file
+# per sesi sehingga kurva sesi tetap ada setelah restart tanpa satu baris DB
+# per sampel. Kompresi dan I/O file jalan di satu thread writer (urutan per
+# sesi terjaga); append() di event loop hanya menyentuh array di memori.
+import os
+import json
+import math
+import time
+import zlib
+import struct
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+
+logger = logging.getLogger("OCPP")
+
+# (nama kolom, typecode array); ts = epoch milidetik
+COLUMNS = (("ts_ms", "q"), ("energy_wh", "d"), ("power_w", "f"), ("soc", "f"))
+NAN = float("nan")
+
+
+def _empty_columns():
+    return [array(code) for _, code in COLUMNS]
+
+
+class Chunk:
+    """Chunk yang sudah di-seal: kolom terkompres + rentang waktu untuk skip cepat saat range read."""
+    __slots__ = ("t0", "t1", "n", "blobs")
+
+    def __init__(self, t0, t1, n, blobs):
+        self.t0, self.t1, self.n, self.blobs = t0, t1, n, blobs
+
+    @classmethod
+    def seal(cls, cols, level=6):
+        ts = cols[0]
+        deltas = array("q", [ts[0]])
+        deltas.extend(b - a for a, b in zip(ts, ts[1:]))
+        blobs = [zlib.compress(deltas.tobytes(), level)]
+        blobs += [zlib.compress(c.tobytes(), level) for c in cols[1:]]
+        return cls(ts[0], ts[-1], len(ts), blobs)
+
+    def columns(self):
+        out = []
+        for (_, code), blob in zip(COLUMNS, self.blobs):
+            a = array(code)
+            a.frombytes(zlib.decompress(blob))
+            out.append(a)
+        out[0] = array("q", accumulate(out[0]))
+        return out
+
+    @property
+    def nbytes(self):
+        return sum(len(b) for b in self.blobs)
+
+    def to_record(self, charger_id):
+        hdr = json.dumps({"c": charger_id, "t0": self.t0, "t1": self.t1, "n": self.n,
+                          "sizes": [len(b) for b in self.blobs]}).encode()
+        return struct.pack("<I", len(hdr)) + hdr + b"".join(self.blobs)
+
+
+def read_records(path):
+    """Baca file sesi -> (charger_id, [Chunk]). Record terpotong di akhir (crash) diabaikan."""
+    chunks, charger_id = [], None
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + 4 <= len(data):
+        (hlen,) = struct.unpack_from("<I", data, pos)
+        try:
+            hdr = json.loads(data[pos + 4:pos + 4 + hlen])
+        except ValueError:
+            break
+        pos += 4 + hlen
+        blobs = []
+        for size in hdr["sizes"]:
+            blobs.append(data[pos:pos + size])
+            pos += size
+        if pos > len(data):
+            break
+        charger_id = hdr["c"]
+        chunks.append(Chunk(hdr["t0"], hdr["t1"], hdr["n"], blobs))
+    return charger_id, chunks
+
+
+def read_charger_id(path):
+    """charger_id asli dari header record pertama (nama file hasil sanitasi)."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+        if len(head) < 4:
+            return None
+        (hlen,) = struct.unpack("<I", head)
+        try:
+            return json.loads(f.read(hlen))["c"]
+        except (ValueError, KeyError):
+            return None
+
+
+class SessionSeries:
+    __slots__ = ("transaction_id", "charger_id", "chunks", "sealing", "open", "closed", "last_ts")
+
+    def __init__(self, transaction_id, charger_id, chunks=None, closed=False):
+        self.transaction_id = transaction_id
+        self.charger_id = charger_id
+        self.chunks = chunks or []
+        self.sealing = []               # kolom penuh yang menunggu di-seal thread writer
+        self.open = _empty_columns()
+        self.closed = closed
+        self.last_ts = self.chunks[-1].t1 if self.chunks else None
+
+    def __len__(self):
+        return sum(c.n for c in self.chunks) + sum(len(c[0]) for c in self.sealing) + len(self.open[0])
+
+    def view(self):
+        """Salinan daftar chunk + buffer (dipanggil dengan lock); read() boleh jalan tanpa lock."""
+        return self.chunks[:], self.sealing + [[c[:] for c in self.open]]
+
+    @staticmethod
+    def read(view, start=None, end=None):
+        """Kolom dalam [start, end] (epoch ms); chunk di luar rentang tidak didekompres."""
+        chunks, buffers = view
+        out = _empty_columns()
+        parts = [c.columns() for c in chunks
+                 if (start is None or c.t1 >= start) and (end is None or c.t0 <= end)]
+        parts.extend(buffers)
+        for cols in parts:
+            ts = cols[0]
+            lo = bisect_left(ts, start) if start is not None else 0
+            hi = bisect_right(ts, end) if end is not None else len(ts)
+            for dst, src in zip(out, cols):
+                dst.extend(src[lo:hi])
+        return out
+
+
+class MeterSeriesStore:
+    def __init__(self, directory=None, chunk_size=256, max_cached_closed=500, level=6):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_cached_closed = max_cached_closed
+        self.level = level
+        self._open = {}                 # transaction_id -> SessionSeries (sesi berjalan)
+        self._closed = OrderedDict()    # LRU sesi selesai yang masih di memori
+        self._by_charger = {}           # charger_id -> [transaction_id] (urut mulai)
+        self._charger_of = {}           # transaction_id -> charger_id
+        self._lock = threading.Lock()
+        # Satu thread: seal + append file + baca file sesi lama berurutan (FIFO)
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="meter-series")
+        self.samples = 0
+        self.out_of_order = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.write_errors = 0
+
+    def open_dir(self):
+        """Bangun ulang indeks charger -> sesi dari file yang ada (isi chunk dibaca saat diminta)."""
+        if not self.directory:
+            return self
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".series"):
+                continue
+            safe_id, _, tid = name[:-len(".series")].rpartition("__")
+            try:
+                tid = int(tid)
+                charger_id = read_charger_id(os.path.join(self.directory, name))
+            except (ValueError, OSError):
+                continue
+            self._index(charger_id or safe_id, tid)
+        return self
+
+    def _index(self, charger_id, transaction_id):
+        if transaction_id not in self._charger_of:
+            self._charger_of[transaction_id] = charger_id
+            self._by_charger.setdefault(charger_id, []).append(transaction_id)
+
+    def _path(self, charger_id, transaction_id):
+        safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in charger_id)
+        return os.path.join(self.directory, f"{safe}__{transaction_id}.series")
+
+    def _persist(self, series, chunk):
+        if not self.directory:
+            return
+        try:
+            with open(self._path(series.charger_id, series.transaction_id), "ab") as f:
+                f.write(chunk.to_record(series.charger_id))
+        except OSError as e:
+            self.write_errors += 1
+            logger.error(f"❌ METER SERIES write failed tx={series.transaction_id}: {e}")
+
+    def _seal(self, series):
+        """Dipanggil dengan lock: serahkan buffer penuh ke thread writer."""
+        if not len(series.open[0]):
+            return
+        cols, series.open = series.open, _empty_columns()
+        series.sealing.append(cols)
+        self._io.submit(self._io_seal, series, cols)
+
+    def _io_seal(self, series, cols):
+        chunk = Chunk.seal(cols, self.level)
+        with self._lock:
+            self.raw_bytes += sum(c.itemsize * len(c) for c in cols)
+            self.compressed_bytes += chunk.nbytes
+            series.chunks.append(chunk)
+            series.sealing.remove(cols)
+        self._persist(series, chunk)
+
+    def _io_resume(self, series, path):
+        """Sesi yang berjalan sebelum restart: chunk lama dari file ditaruh sebelum chunk baru."""
+        try:
+            chunks = read_records(path)[1]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"❌ METER SERIES read failed tx={series.transaction_id}: {e}")
+            return
+        with self._lock:
+            series.chunks[:0] = chunks
+            if chunks and (series.last_ts is None or series.last_ts < chunks[-1].t1):
+                series.last_ts = chunks[-1].t1
+
+    def flush(self):
+        """Tunggu semua seal/tulis file yang antri selesai (shutdown, tes)."""
+        self._io.submit(lambda: None).result()
+
+    def append(self, charger_id, transaction_id, ts, energy_wh=None, power_w=None, soc=None):
+        """Tambah satu sampel (ts = epoch detik). Sampel lebih tua dari sampel terakhir dibuang."""
+        t = int(ts * 1000)
+        with self._lock:
+            series = self._open.get(transaction_id)
+            if series is None:
+                series = self._open[transaction_id] = SessionSeries(transaction_id, charger_id)
+                cached = self._closed.pop(transaction_id, None)
+                if cached is not None:
+                    series.chunks, series.last_ts = cached.chunks, cached.last_ts
+                elif self.directory and transaction_id in self._charger_of:
+                    # File sesi sudah ada (restart): dibaca thread writer sebelum seal berikutnya
+                    self._io.submit(self._io_resume, series, self._path(charger_id, transaction_id))
+                self._index(charger_id, transaction_id)
+            if series.last_ts is not None and t < series.last_ts:
+                self.out_of_order += 1
+                return False
+            cols = series.open
+            cols[0].append(t)
+            cols[1].append(NAN if energy_wh is None else energy_wh)
+            cols[2].append(NAN if power_w is None else power_w)
+            cols[3].append(NAN if soc is None else soc)
+            series.last_ts = t
+            self.samples += 1
+            if len(cols[0]) >= self.chunk_size:
+                self._seal(series)
+            return True
+
+    def close(self, transaction_id):
+        """Sesi selesai: seal sisa buffer dan pindahkan ke cache LRU."""
+        with self._lock:
+            series = self._open.pop(transaction_id, None)
+            if series is None:
+                return None
+            self._seal(series)
+            series.closed = True
+            self._closed[transaction_id] = series
+            while len(self._closed) > self.max_cached_closed:
+                self._closed.popitem(last=False)
+            return series
+
+    def _cached(self, transaction_id):
+        """Dipanggil dengan lock: sesi di memori (berjalan atau LRU) atau None."""
+        series = self._open.get(transaction_id)
+        if series is None:
+            series = self._closed.get(transaction_id)
+            if series is not None:
+                self._closed.move_to_end(transaction_id)
+        return series
+
+    def _load(self, transaction_id, charger_id):
+        """Baca sesi selesai dari file (tanpa lock) lalu simpan di LRU."""
+        if not self.directory or charger_id is None:
+            return None
+        path = self._path(charger_id, transaction_id)
+        if not os.path.exists(path):
+            return None
+        cid, chunks = read_records(path)
+        with self._lock:
+            series = self._cached(transaction_id)
+            if series is None:
+                series = self._closed[transaction_id] = SessionSeries(transaction_id, cid or charger_id, chunks, closed=True)
+                while len(self._closed) > self.max_cached_closed:
+                    self._closed.popitem(last=False)
+        return series
+
+    def read(self, transaction_id, start_ms=None, end_ms=None, max_points=None, charger_id=None):
+        """
+        Kurva sesi: {"ts_ms": [epoch ms], "energy_wh": [...], "power_w": [...], "soc": [...]}.
+        start_ms/end_ms epoch ms (satuan sama dengan ts_ms); max_points > 0 = downsample rata (sampel terakhir selalu ikut).
+        NaN (kolom tidak dilaporkan charger) dikembalikan sebagai None.
+        Bisa membaca file dan dekompresi: panggil dari executor, bukan event loop.
+        """
+        with self._lock:
+            series = self._cached(transaction_id)
+            charger_id = charger_id or self._charger_of.get(transaction_id)
+        if series is None:
+            series = self._load(transaction_id, charger_id)
+            if series is None:
+                return None
+        with self._lock:
+            view = series.view()
+            meta = {"transaction_id": transaction_id, "charger_id": series.charger_id,
+                    "closed": series.closed, "samples_total": len(series)}
+        cols = SessionSeries.read(view, None if start_ms is None else int(start_ms),
+                                  None if end_ms is None else int(end_ms))
+        n = len(cols[0])
+        idx = range(n)
+        if max_points and n > max_points:
+            step = n / float(max_points)
+            idx = sorted({min(n - 1, int(i * step)) for i in range(max_points)} | {n - 1})
+        out = dict(meta, points=len(idx))
+        for (name, _), col in zip(COLUMNS, cols):
+            out[name] = [None if isinstance(col[i], float) and math.isnan(col[i]) else col[i] for i in idx]
+        return out
+
+    def sessions(self, charger_id):
+        """Metadata sesi charger (terbaru dulu) tanpa mendekompres sampel."""
+        with self._lock:
+            tids = list(self._by_charger.get(charger_id, []))
+            rows = []
+            for tid in reversed(tids):
+                series = self._open.get(tid)
+                if series is None:
+                    series = self._closed.get(tid)
+                if series is None:
+                    rows.append({"transaction_id": tid, "closed": True, "cached": False})
+                    continue
+                buffers = [c[0] for c in series.sealing + [series.open] if len(c[0])]
+                first = series.chunks[0].t0 if series.chunks else (buffers[0][0] if buffers else None)
+                rows.append({"transaction_id": tid, "closed": series.closed, "cached": True,
+                             "samples": len(series), "first_ts_ms": first, "last_ts_ms": series.last_ts})
+        return rows
+
+    def prune(self, max_age):
+        """Hapus file sesi selesai yang lebih tua dari max_age detik. Return jumlah file."""
+        if not self.directory:
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        with self._lock:
+            open_paths = {self._path(s.charger_id, tid) for tid, s in self._open.items()}
+        # I/O file di luar lock: append() di event loop tidak ikut menunggu
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".series") or path in open_paths:
+                continue
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+            # Nama file hasil sanitasi (ocpp/CP01 -> ocpp_CP01); id charger asli dari index
+            tid = name[:-len(".series")].rpartition("__")[2]
+            if not tid.isdigit():
+                continue
+            tid = int(tid)
+            with self._lock:
+                self._closed.pop(tid, None)
+                charger_id = self._charger_of.pop(tid, None)
+                tids = self._by_charger.get(charger_id)
+                if tids is not None and tid in tids:
+                    tids.remove(tid)
+                    if not tids:
+                        del self._by_charger[charger_id]
+        return removed
+
+    def stats(self):
+        with self._lock:
+            buffered = sum(len(s.open[0]) + sum(len(c[0]) for c in s.sealing) for s in self._open.values())
+            return {
+                "open_sessions": len(self._open),
+                "cached_closed_sessions": len(self._closed),
+                "chargers": len(self._by_charger),
+                "samples": self.samples,
+                "buffered_samples": buffered,
+                "out_of_order_dropped": self.out_of_order,
+                "raw_bytes": self.raw_bytes,
+                "compressed_bytes": self.compressed_bytes,
+                "compression_ratio": round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else None,
+                "write_errors": self.write_errors,
+            }
@@ -0,0 +1,180 @@
+# backend/ocpp_bridge.py
+# Client untuk Control Server milik OCPP server (lihat backend/control_server.py).
+# Dipakai main_api untuk push perintah langsung ke charger yang terhubung
+# dan membaca state live charger dari memori OCPP server.
+import os
+import json
+import logging
+import urllib.request
+
+try:
+    from backend import config
+except ImportError:
+    try:
+        import config
+    except Exception:
+        config = None
+
+try:
+    from backend.control_server import TOKEN_HEADER
+except ImportError:
+    from control_server import TOKEN_HEADER
+
+logger = logging.getLogger("UNIEV")
+
+CONTROL_HOST = os.getenv("OCPP_CONTROL_HOST") or (getattr(config, "OCPP_CONTROL_HOST", "127.0.0.1") if config else "127.0.0.1")
+CONTROL_PORT = int(os.getenv("OCPP_CONTROL_PORT") or (getattr(config, "PORT_OCPP_CONTROL", 9100) if config else 9100))
+CONTROL_TIMEOUT = getattr(config, "OCPP_CONTROL_TIMEOUT", 0.5) if config else 0.5
+CONTROL_TOKEN = os.getenv("OCPP_CONTROL_TOKEN") or (getattr(config, "OCPP_CONTROL_TOKEN", "") if config else "")
+
+
+def control_headers():
+    headers = {"Content-Type": "application/json"}
+    if CONTROL_TOKEN:
+        headers[TOKEN_HEADER] = CONTROL_TOKEN
+    return headers
+
+
+def _request(method, path, body=None, base_url=None, timeout=None):
+    url = (base_url or f"http://{CONTROL_HOST}:{CONTROL_PORT}") + path
+    data = json.dumps(body, default=str).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers=control_headers())
+    with urllib.request.urlopen(req, timeout=timeout or CONTROL_TIMEOUT) as resp:
+        return json.loads(resp.read() or b"null")
+
+
+def _owner_url(charger_id):
+    """Mode cluster: Control URL worker yang memegang socket charger (None = pakai default)."""
+    try:
+        try:
+            from backend.cluster import get_registry
+        except ImportError:
+            from cluster import get_registry
+        registry = get_registry()
+        return registry.owner_url(charger_id) if registry else None
+    except Exception:
+        return None
+
+
+def notify_command(cmd):
+    """
+    Push satu baris charging_commands ke OCPP server (ke worker pemilik
+    socket bila registry cluster aktif; worker default akan meneruskan).
+    Return "push" bila perintah langsung dikirim ke charger, "unsupported"
+    bila action tidak punya mapping OCPP (baris ditandai UNSUPPORTED), atau
+    "queued": OCPP server tidak bisa dihubungi / charger offline; baris tetap
+    PENDING dan akan diambil oleh rekonsiliasi periodik.
+    """
+    try:
+        res = _request("POST", "/commands", cmd, base_url=_owner_url(cmd.get("charger_id")))
+    except Exception as e:
+        logger.debug(f"OCPP push failed, falling back to poll: {e}")
+        return "queued"
+    if not res:
+        return "queued"
+    return res.get("delivery") or ("push" if res.get("delivered") else "queued")
+
+
+def _worker_urls():
+    """Semua Control URL worker (mode cluster) atau [None] = Control Server default."""
+    try:
+        try:
+            from backend.cluster import get_registry
+        except ImportError:
+            from cluster import get_registry
+        registry = get_registry()
+        urls = list(registry.workers().values()) if registry else []
+        return urls or [None]
+    except Exception:
+        return [None]
+
+
+def fetch_charger_states(charger_ids=None):
+    """
+    State live charger dari memori OCPP server (tanpa query DB).
+    Return {charger_id: state}; dict kosong bila OCPP server tidak bisa dihubungi.
+    """
+    path = "/chargers/state"
+    if charger_ids:
+        path += "?ids=" + ",".join(charger_ids)
+    states = {}
+    for url in _worker_urls():
+        try:
+            res = _request("GET", path, base_url=url)
+        except Exception as e:
+            logger.debug(f"OCPP state fetch failed ({url or 'default'}): {e}")
+            continue
+        for st in (res or {}).get("chargers", []):
+            # Charger yang pindah worker: state dari worker yang sedang terhubung menang
+            prev = states.get(st["charger_id"])
+            if prev is None or (st.get("connected") and not prev.get("connected")):
+                states[st["charger_id"]] = st
+    return states
+
+
+def fetch_session_series(transaction_id, start_ms=None, end_ms=None, max_points=None, charger_id=None):
+    """
+    Kurva MeterValues satu sesi dari memori/file OCPP server. Sesi yang pindah
+    worker (reconnect) punya potongan di beberapa worker: digabung urut waktu.
+    start_ms/end_ms dan ts_ms hasil semuanya epoch ms.
+    Return None bila tidak ada worker yang menyimpan sesi ini.
+    """
+    from urllib.parse import urlencode
+    query = {k: v for k, v in (("start_ms", start_ms), ("end_ms", end_ms), ("charger_id", charger_id)) if v is not None}
+    path = f"/sessions/{int(transaction_id)}/series" + ("?" + urlencode(query) if query else "")
+    parts = []
+    for url in _worker_urls():
+        try:
+            res = _request("GET", path, base_url=url, timeout=max(CONTROL_TIMEOUT, 2.0))
+        except Exception as e:
+            logger.debug(f"OCPP series fetch failed ({url or 'default'}): {e}")
+            continue
+        if res and res.get("ts_ms"):
+            parts.append(res)
+    if not parts:
+        return None
+    cols = ("ts_ms", "energy_wh", "power_w", "soc")
+    rows = sorted(zip(*[sum((p[c] for p in parts), []) for c in cols]), key=lambda r: r[0])
+    if max_points and len(rows) > max_points:
+        step = len(rows) / float(max_points)
+        rows = [rows[min(len(rows) - 1, int(i * step))] for i in range(max_points - 1)] + [rows[-1]]
+    out = {"transaction_id": int(transaction_id), "charger_id": parts[0].get("charger_id"),
+           "closed": all(p.get("closed") for p in parts), "points": len(rows)}
+    for i, c in enumerate(cols):
+        out[c] = [r[i] for r in rows]
+    return out
+
+
+def fetch_charger_sessions(charger_id):
+    """Daftar sesi yang punya time-series untuk charger ini (semua worker)."""
+    sessions = {}
+    for url in _worker_urls():
+        try:
+            res = _request("GET", f"/chargers/{charger_id}/series", base_url=url)
+        except Exception as e:
+            logger.debug(f"OCPP series list failed ({url or 'default'}): {e}")
+            continue
+        for row in (res or {}).get("sessions", []):
+            sessions.setdefault(row["transaction_id"], row)
+    return sorted(sessions.values(), key=lambda r: r["transaction_id"], reverse=True)
+
+
+# Kolom baris chargers yang ditimpa dengan state live
+LIVE_COLUMNS = ("status", "current_power_kw", "current_session_kwh", "current_soc", "last_heartbeat")
+
+
+def merge_live_state(rows, states=None):
+    """Timpa kolom live baris tabel chargers (snapshot berkala) dengan state dari OCPP server."""
+    if states is None:
+        states = fetch_charger_states()
+    if not states:
+        return rows
+    for row in rows:
+        st = states.get(row.get("charger_id"))
+        if st is None:
+            continue
+        for col in LIVE_COLUMNS:
+            if st.get(col) is not None:
+                row[col] = st[col]
+        row["connected"] = st.get("connected")
+    return rows
@@ -0,0 +1,129 @@
+# backend/ocpp_codec.py
+# Jalur decode frame OCPP masuk yang bisa dikonfigurasi:
+#   strict  : perilaku library ocpp (json stdlib, validasi schema request + response)
+#   fast    : orjson (bila terpasang), validator per action di-cache, response
+#             buatan server sendiri tidak divalidasi ulang
+#   sampled : seperti fast; charger trusted hanya divalidasi 1 dari N pesan per
+#             action (pesan pertama selalu). Gagal validasi -> charger tidak trusted lagi.
+import json
+import threading
+
+from ocpp.messages import Call, CallResult, CallError, get_validator, validate_payload
+from ocpp.exceptions import FormatViolationError, ProtocolError, PropertyConstraintViolationError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MODES = ("strict", "fast", "sampled")
+
+
+def loads(text):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # mis. integer > 64 bit: biarkan stdlib yang memutuskan
+    return json.loads(text)
+
+
+def unpack(text):
+    """Pengganti ocpp.messages.unpack dengan parser JSON yang lebih cepat (error OCPP sama)."""
+    try:
+        msg = loads(text)
+    except ValueError:
+        raise FormatViolationError(details={"cause": "Message is not valid JSON"})
+    if not isinstance(msg, list) or not msg:
+        raise ProtocolError(details={"cause": "OCPP message hasn't the correct format. It should be a list"})
+    for cls in (Call, CallResult, CallError):
+        if msg[0] == cls.message_type_id:
+            try:
+                return cls(*msg[1:])
+            except TypeError:
+                raise ProtocolError(details={"cause": "Message is missing elements."})
+    raise PropertyConstraintViolationError(details={f"MessageTypeId '{msg[0]}' isn't valid"})
+
+
+class OcppDecoder:
+    def __init__(self, mode="strict", sample_every=20, trusted=(), ocpp_version="1.6"):
+        if mode not in MODES:
+            raise ValueError(f"decode mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.sample_every = max(1, int(sample_every))
+        self.trusted = tuple(trusted or ())     # prefix charger_id; "*" = semua charger
+        self.ocpp_version = ocpp_version
+        self._validators = {}                   # (message_type_id, action) -> Draft4Validator
+        self._seen = {}                         # charger_id -> {action: jumlah pesan}
+        self._demoted = set()
+        self._lock = threading.Lock()
+        self.validated = 0
+        self.skipped = 0
+        self.failed = 0
+
+    @property
+    def library_path(self):
+        """True bila decode + validasi diserahkan penuh ke library ocpp."""
+        return self.mode == "strict"
+
+    def is_trusted(self, charger_id):
+        if charger_id in self._demoted:
+            return False
+        return any(p == "*" or charger_id.startswith(p) for p in self.trusted)
+
+    def _validator(self, msg):
+        key = (msg.message_type_id, msg.action)
+        v = self._validators.get(key)
+        if v is None:
+            v = self._validators[key] = get_validator(msg.message_type_id, msg.action, self.ocpp_version)
+        return v
+
+    def should_validate(self, charger_id, action):
+        if self.mode != "sampled" or not self.is_trusted(charger_id):
+            return True
+        with self._lock:
+            seen = self._seen.get(charger_id)
+            if seen is None:
+                seen = self._seen[charger_id] = {}
+            n = seen.get(action, 0)
+            seen[action] = n + 1
+        return n % self.sample_every == 0
+
+    def validate(self, charger_id, msg):
+        """Validasi payload CALL masuk; raise OCPPError (dipetakan library) bila tidak valid.
+
+        Hanya action charger -> server; tidak ada yang butuh parse_float=Decimal
+        (library hanya memakainya untuk SetChargingProfile / RemoteStartTransaction
+        / GetCompositeSchedule yang dikirim server).
+        """
+        if not self.should_validate(charger_id, msg.action):
+            self.skipped += 1
+            return
+        self.validated += 1
+        try:
+            ok = self._validator(msg).is_valid(msg.payload)
+        except OSError:
+            ok = False  # action tanpa schema: library yang membuat error-nya
+        if not ok:
+            self.failed += 1
+            if self.mode == "sampled" and self.is_trusted(charger_id):
+                self._demoted.add(charger_id)
+            validate_payload(msg, self.ocpp_version)
+
+    def forget(self, charger_id):
+        with self._lock:
+            self._seen.pop(charger_id, None)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "json": "orjson" if orjson is not None and self.mode != "strict" else "json",
+            "sample_every": self.sample_every if self.mode == "sampled" else None,
+            "trusted": list(self.trusted),
+            "demoted": sorted(self._demoted),
+            "validated": self.validated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "cached_validators": len(self._validators),
+        }
+
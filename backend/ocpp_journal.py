@@ -0,0 +1,404 @@
+# backend/ocpp_journal.py
+# Journal append-only semua frame OCPP-J (masuk & keluar) per charger.
+#
+# Format: segment `ocpp-<waktu>.jsonl.gz` berisi beberapa gzip member (satu
+# member per flush). Sidecar `.idx` (JSONL) mencatat tiap member: offset,
+# panjang dan rentang waktu. Sidecar `.cidx` (JSON gzip, ditulis saat segment
+# dirotasi/ditutup) memetakan charger -> nomor member (delta); membaca trafik
+# satu charger hanya mendekompresi member yang memuat charger tsb. Segment
+# tanpa `.cidx` (masih aktif / proses mati) dibaca per rentang waktu saja.
+#
+#   python -m backend.ocpp_journal list  --dir data/journal
+#   python -m backend.ocpp_journal dump  --dir data/journal --charger SIM-00001 --since 2026-01-01T10:00
+#   python -m backend.ocpp_journal replay --dir data/journal --charger SIM-00001 --speed 10 --url ws://localhost:9000
+import os
+import sys
+import json
+import gzip
+import time
+import queue
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger("OCPP")
+
+INBOUND = "in"    # charger -> server
+OUTBOUND = "out"  # server -> charger
+
+
+class MessageJournal:
+    """Writer journal. record() aman dipanggil dari event loop (hanya enqueue)."""
+
+    def __init__(self, directory, segment_max_bytes=64 * 1024 * 1024, segment_max_seconds=3600,
+                 retention_segments=48, flush_interval=1.0, compresslevel=6, max_queue=100000):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self.retention_segments = retention_segments
+        self.flush_interval = flush_interval
+        self.compresslevel = compresslevel
+        # Antrian dibatasi: saat disk lambat frame dibuang (dihitung), event loop tidak ikut tertahan
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._segment = None
+        self._segment_started = 0.0
+        self._members = 0
+        self._charger_members = {}   # charger_id -> [nomor member] segment aktif
+        self._thread = None
+        self.frames = 0
+        self.bytes_raw = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self._dropped_logged = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="ocpp-journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, charger_id, direction, raw):
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", "replace")
+        try:
+            self._queue.put_nowait((time.time(), charger_id, direction, raw))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        try:
+            self._queue.put(None, timeout=5)
+        except queue.Full:
+            pass
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    # --- writer thread ---
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= 5000 or time.monotonic() >= deadline:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stop = True
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.error(f"❌ Journal write failed ({len(batch)} frames): {e}")
+            if self.dropped != self._dropped_logged:
+                logger.warning(f"⚠️ Journal queue full: {self.dropped - self._dropped_logged} frames dropped "
+                               f"({self.dropped} since start)")
+                self._dropped_logged = self.dropped
+        self._close_segment()
+
+    def _close_segment(self):
+        """Tulis index per charger segment aktif (atomic: tmp lalu rename)."""
+        if self._segment is None:
+            return
+        index = {}
+        for cid, members in self._charger_members.items():
+            prev, deltas = 0, []
+            for m in members:
+                deltas.append(m - prev)
+                prev = m
+            index[cid] = deltas
+        data = json.dumps({"members": self._members, "c": index}, separators=(",", ":")).encode()
+        tmp = self._segment + ".cidx.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=self.compresslevel))
+            os.replace(tmp, self._segment + ".cidx")
+        except OSError as e:
+            logger.error(f"❌ Journal charger index failed ({os.path.basename(self._segment)}): {e}")
+        self._segment = None
+        self._members = 0
+        self._charger_members = {}
+
+    def _open_segment(self, now):
+        self._close_segment()
+        name = "ocpp-" + datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%S%f") + ".jsonl.gz"
+        self._segment = os.path.join(self.directory, name)
+        self._segment_started = now
+        self._apply_retention()
+
+    def _apply_retention(self):
+        segments = list_segments(self.directory)
+        for path in segments[:-self.retention_segments] if self.retention_segments else []:
+            for p in (path, path + ".idx", path + ".cidx"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def _write(self, batch):
+        now = batch[-1][0]
+        if (self._segment is None or now - self._segment_started >= self.segment_max_seconds
+                or os.path.getsize(self._segment) >= self.segment_max_bytes):
+            self._open_segment(now)
+
+        lines = []
+        chargers = set()
+        for ts, cid, direction, raw in batch:
+            lines.append(json.dumps({"t": round(ts, 6), "c": cid, "d": direction, "m": raw}, separators=(",", ":")))
+            chargers.add(cid)
+        payload = ("\n".join(lines) + "\n").encode()
+        member = gzip.compress(payload, compresslevel=self.compresslevel)
+
+        with open(self._segment, "ab") as f:
+            offset = f.tell()
+            f.write(member)
+        entry = {"o": offset, "n": len(member), "t0": batch[0][0], "t1": now}
+        with open(self._segment + ".idx", "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        for cid in chargers:
+            self._charger_members.setdefault(cid, []).append(self._members)
+        self._members += 1
+
+        self.frames += len(batch)
+        self.bytes_raw += len(payload)
+        self.bytes_written += len(member)
+
+    def stats(self):
+        return {
+            "frames": self.frames, "queue": self._queue.qsize(), "dropped": self.dropped,
+            "bytes_raw": self.bytes_raw, "bytes_written": self.bytes_written,
+            "ratio": round(self.bytes_raw / self.bytes_written, 2) if self.bytes_written else None,
+            "segment": os.path.basename(self._segment) if self._segment else None,
+        }
+
+
+class JournaledConnection:
+    """Proxy websocket: catat setiap recv()/send() ke journal, sisanya diteruskan."""
+
+    def __init__(self, websocket, charger_id, journal):
+        self._ws = websocket
+        self._cid = charger_id
+        self._journal = journal
+
+    async def recv(self):
+        msg = await self._ws.recv()
+        self._journal.record(self._cid, INBOUND, msg)
+        return msg
+
+    async def send(self, msg):
+        self._journal.record(self._cid, OUTBOUND, msg)
+        await self._ws.send(msg)
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+# --- READER ---
+def list_segments(directory):
+    try:
+        return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".jsonl.gz"))
+    except FileNotFoundError:
+        return []
+
+
+def _read_index(segment):
+    try:
+        with open(segment + ".idx") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return None
+
+
+def _read_charger_index(segment):
+    """{charger_id: set(nomor member)} dari `.cidx`; None bila belum ada."""
+    try:
+        with open(segment + ".cidx", "rb") as f:
+            data = json.loads(gzip.decompress(f.read()))
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+    out = {}
+    for cid, deltas in data["c"].items():
+        members, m = set(), 0
+        for d in deltas:
+            m += d
+            members.add(m)
+        out[cid] = members
+    return out
+
+
+def read_frames(directory, charger_id=None, since=None, until=None):
+    """Generator frame {t, c, d, m} urut waktu. since/until = epoch detik."""
+    for segment in list_segments(directory):
+        index = _read_index(segment)
+        if index is None:
+            # Tanpa index (mis. segment disalin manual): baca penuh
+            with gzip.open(segment, "rt") as f:
+                members = [f.read()]
+        else:
+            members = []
+            cidx = _read_charger_index(segment) if charger_id is not None else None
+            wanted = cidx.get(charger_id, set()) if cidx is not None else None
+            with open(segment, "rb") as f:
+                for i, e in enumerate(index):
+                    if since is not None and e["t1"] < since: continue
+                    if until is not None and e["t0"] > until: continue
+                    if wanted is not None and i not in wanted: continue
+                    if charger_id is not None and "c" in e and charger_id not in e["c"]: continue  # index lama
+                    f.seek(e["o"])
+                    members.append(gzip.decompress(f.read(e["n"])).decode())
+        for text in members:
+            for line in text.splitlines():
+                if not line:
+                    continue
+                fr = json.loads(line)
+                if charger_id is not None and fr["c"] != charger_id: continue
+                if since is not None and fr["t"] < since: continue
+                if until is not None and fr["t"] > until: continue
+                yield fr
+
+
+# --- REPLAY ---
+async def replay(frames, url, speed=1.0, prefix=""):
+    """
+    Kirim ulang frame INBOUND (CALL dari charger) ke server dengan jeda asli
+    dibagi speed. CALL dari server dijawab dengan CALLRESULT terekam untuk
+    action yang sama. Return statistik latency per action.
+    """
+    import asyncio
+    import websockets
+
+    by_charger = {}
+    for fr in frames:
+        by_charger.setdefault(fr["c"], []).append(fr)
+    if not by_charger:
+        return {}
+    t_origin = min(v[0]["t"] for v in by_charger.values())
+    stats = {}
+
+    async def run_charger(cid, frs):
+        # Jawaban terekam charger untuk CALL dari server, per action
+        calls_out = {}
+        recorded_answers = {}
+        for fr in frs:
+            msg = json.loads(fr["m"])
+            if fr["d"] == OUTBOUND and msg[0] == 2:
+                calls_out[msg[1]] = msg[2]
+            elif fr["d"] == INBOUND and msg[0] == 3 and msg[1] in calls_out:
+                recorded_answers.setdefault(calls_out[msg[1]], []).append(msg[2])
+
+        pending = {}
+        start = time.monotonic()
+        async with websockets.connect(f"{url.rstrip('/')}/{prefix}{cid}", subprotocols=["ocpp1.6"]) as ws:
+            async def reader():
+                async for raw in ws:
+                    msg = json.loads(raw)
+                    if msg[0] == 2:
+                        answers = recorded_answers.get(msg[2]) or [{}]
+                        payload = answers.pop(0) if len(answers) > 1 else answers[0]
+                        await ws.send(json.dumps([3, msg[1], payload]))
+                    elif msg[1] in pending:
+                        action, t0 = pending.pop(msg[1])
+                        st = stats.setdefault(action, {"count": 0, "errors": 0, "lat": []})
+                        st["count"] += 1
+                        st["lat"].append(time.monotonic() - t0)
+                        if msg[0] == 4:
+                            st["errors"] += 1
+            rd = asyncio.create_task(reader())
+            for fr in frs:
+                msg = json.loads(fr["m"])
+                if fr["d"] != INBOUND or msg[0] != 2:
+                    continue
+                delay = (fr["t"] - t_origin) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                pending[msg[1]] = (msg[2], time.monotonic())
+                await ws.send(fr["m"])
+            deadline = time.monotonic() + 10
+            while pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            rd.cancel()
+
+    await asyncio.gather(*(run_charger(c, f) for c, f in by_charger.items()), return_exceptions=True)
+    out = {}
+    for action, st in sorted(stats.items()):
+        lat = sorted(st["lat"])
+        out[action] = {
+            "count": st["count"], "errors": st["errors"],
+            "p50_ms": round(lat[len(lat) // 2] * 1000, 2) if lat else None,
+            "p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000, 2) if lat else None,
+        }
+    return out
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UNIEV OCPP message journal")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("list", "dump", "replay"):
+        p = sub.add_parser(name)
+        p.add_argument("--dir", default=_default_dir())
+        p.add_argument("--charger")
+        p.add_argument("--since", help="ISO time (UTC)")
+        p.add_argument("--until", help="ISO time (UTC)")
+        if name == "replay":
+            p.add_argument("--url", default="ws://localhost:9000")
+            p.add_argument("--speed", type=float, default=1.0, help="1 = waktu asli, 10 = 10x lebih cepat")
+            p.add_argument("--prefix", default="", help="Prefix charger_id saat replay (hindari bentrok dengan charger asli)")
+            p.add_argument("--out", help="Simpan statistik replay ke JSON")
+    args = parser.parse_args(argv)
+    since, until = _parse_time(args.since), _parse_time(args.until)
+
+    if args.cmd == "list":
+        for seg in list_segments(args.dir):
+            idx = _read_index(seg) or []
+            cidx = _read_charger_index(seg)
+            if cidx is not None:
+                chargers = len(cidx)
+            else:
+                chargers = len(set(c for e in idx for c in e["c"])) if idx and "c" in idx[0] else "?"
+            span = (datetime.fromtimestamp(idx[0]["t0"], timezone.utc).isoformat(), datetime.fromtimestamp(idx[-1]["t1"], timezone.utc).isoformat()) if idx else ("?", "?")
+            print(f"{os.path.basename(seg)}  {os.path.getsize(seg):>10} B  members={len(idx):<5} chargers={chargers:<6} {span[0]} .. {span[1]}")
+    elif args.cmd == "dump":
+        for fr in read_frames(args.dir, args.charger, since, until):
+            ts = datetime.fromtimestamp(fr["t"], timezone.utc).isoformat()
+            print(f"{ts} {fr['c']} {'->' if fr['d'] == INBOUND else '<-'} {fr['m']}")
+    else:
+        import asyncio
+        frames = list(read_frames(args.dir, args.charger, since, until))
+        result = asyncio.run(replay(frames, args.url, args.speed, args.prefix))
+        print(json.dumps(result, indent=2))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=2)
+
+
+def _default_dir():
+    try:
+        from backend import config
+    except ImportError:
+        import config
+    return getattr(config, "JOURNAL_DIR", "journal")
+
+
+if __name__ == "__main__":
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    main()
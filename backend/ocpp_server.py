@@ -4,8 +4,12 @@ import logging
 import sys
 import os
 import traceback
-from datetime import datetime
+from datetime import datetime, timezone
 from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import time
+import argparse
+import multiprocessing
 
 # --- 1. FORCE PATH INJECTION (CRITICAL FIX) ---
 # Ini wajib ada di paling atas agar Python bisa menemukan 'backend.database'
@@ -24,12 +28,15 @@ logger = logging.getLogger("OCPP")
 
 # --- 3. DATABASE LOADING (ROBUST) ---
 supabase_client = None
+config = None
+Database = None
+db_query_stats = None
 try:
     # Sekarang import ini pasti berhasil karena sys.path sudah diperbaiki
     from backend import config
-    from backend.database import supabase
+    from backend.database import supabase, Database, query_stats as db_query_stats
     supabase_client = supabase
-    logger.info("✅ Database connected successfully.")
+    logger.info("✅ Database module loaded (client dibuat saat pertama dipakai).")
 except ImportError as e:
     logger.error(f"❌ Critical Import Error: {e}")
     logger.error(f"   System Path: {sys.path}")
@@ -38,17 +45,75 @@ except Exception as e:
 
 HOST = getattr(config, "OCPP_HOST", "0.0.0.0") if config else "0.0.0.0"
 PORT = getattr(config, "OCPP_PORT", 9000) if config else 9000
-db_executor = ThreadPoolExecutor(max_workers=3)
+
+# Metrik DB executor (dibaca lewat GET /metrics di Control Server)
+from backend.metrics import REGISTRY, Counter, Gauge, Histogram
+from backend import cold_start
+from backend.db_scheduler import PriorityExecutor, CRITICAL, STATUS, BULK
+DB_TASK_WAIT = Histogram("uniev_db_task_wait_seconds", "Waktu task menunggu di antrian db_executor", ["priority", "task"])
+DB_TASK_RUN = Histogram("uniev_db_task_run_seconds", "Waktu eksekusi task di db_executor", ["priority", "task"])
+DB_TASK_ERRORS = Counter("uniev_db_task_errors_total", "Exception yang lolos dari task db_executor", ["priority", "task"])
+DB_TASK_DROPPED = Counter("uniev_db_tasks_dropped_total", "Task dibuang karena antrian kelasnya penuh", ["priority"])
+DB_TASK_MERGED = Counter("uniev_db_tasks_merged_total", "Task digabung dengan task antri ber-key sama", ["priority"])
+DB_WRITE_ERRORS = Counter("uniev_db_write_errors_total", "Penulisan DB yang gagal (termasuk yang ditelan handler)", ["table"])
+
+# Billing (critical) > Boot/Status (status) > live meter (bulk); lihat backend/db_scheduler.py
+# Penulisan handler sengaja tetap di thread ini, bukan client async ber-pool
+# (yang hanya dipakai fetch_pending_commands):
+# - pool async tidak mengenal prioritas; burst live meter bisa memakai semua slot
+#   dan billing menunggu. Di sini billing punya thread cadangan, antrian per
+#   kelas dibatasi (drop dihitung) dan task ber-key digabung;
+# - handler tidak menunggu hasil tulis (fire-and-forget), event loop hanya membayar submit;
+# - fallback skema / per baris (charging_commands, chargers) dan client pengganti
+#   (LocalClient SQLite, FakeDB di bench/tes) hanya punya API sinkron.
+db_executor = PriorityExecutor(
+    workers=getattr(config, "DB_WORKERS", 3) if config else 3,
+    reserved_critical=getattr(config, "DB_RESERVED_CRITICAL_WORKERS", 1) if config else 1,
+    limits=getattr(config, "DB_QUEUE_LIMITS", None) if config else None,
+    wait_hist=DB_TASK_WAIT, run_hist=DB_TASK_RUN, error_counter=DB_TASK_ERRORS,
+    drop_counter=DB_TASK_DROPPED, merge_counter=DB_TASK_MERGED,
+)
+# Satu thread khusus append+fsync journal transaksi (urutan tulis terjaga)
+wal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tx-wal")
+LIVE_FLUSH_INTERVAL = getattr(config, "LIVE_METER_FLUSH_INTERVAL", 2.0) if config else 2.0
+LIVE_STATS_INTERVAL = getattr(config, "LIVE_METER_STATS_INTERVAL", 60) if config else 60
+CONTROL_HOST = getattr(config, "OCPP_CONTROL_HOST", "127.0.0.1") if config else "127.0.0.1"
+CONTROL_PORT = getattr(config, "PORT_OCPP_CONTROL", 9100) if config else 9100
+CONTROL_TOKEN = os.getenv("OCPP_CONTROL_TOKEN") or (getattr(config, "OCPP_CONTROL_TOKEN", "") if config else "")
+RECONCILE_INTERVAL = getattr(config, "COMMAND_RECONCILE_INTERVAL", 30) if config else 30
+ADVERTISE_HOST = getattr(config, "OCPP_CONTROL_ADVERTISE_HOST", CONTROL_HOST) if config else CONTROL_HOST
+JOURNAL_ENABLED = getattr(config, "JOURNAL_ENABLED", False) if config else False
+COMMAND_TTL = getattr(config, "COMMAND_TTL_SECONDS", 300) if config else 300
+COMMAND_TIMEOUT = getattr(config, "COMMAND_TIMEOUT_SECONDS", 30) if config else 30
+COMMAND_MAX_INFLIGHT = getattr(config, "COMMAND_MAX_INFLIGHT", 500) if config else 500
+COMMAND_MAX_PER_CHARGER = getattr(config, "COMMAND_MAX_INFLIGHT_PER_CHARGER", 1) if config else 1
+HEARTBEAT_INTERVAL = getattr(config, "HEARTBEAT_INTERVAL", 30) if config else 30
+# "websocket": liveness via ping websocket + Heartbeat OCPP jarang (adaptif); "heartbeat": perilaku lama
+KEEPALIVE_MODE = getattr(config, "KEEPALIVE_MODE", "heartbeat") if config else "heartbeat"
+WS_PING_INTERVAL = getattr(config, "WS_PING_INTERVAL", 30) if config else 30
+WS_PING_TIMEOUT = getattr(config, "WS_PING_TIMEOUT", 20) if config else 20
+# permessage-deflate: None = nonaktif (charger tetap bisa connect tanpa kompresi)
+WS_COMPRESSION = getattr(config, "WS_COMPRESSION", "deflate") if config else "deflate"
+OFFLINE_MISSED_HEARTBEATS = getattr(config, "OFFLINE_MISSED_HEARTBEATS", 3) if config else 3
+OFFLINE_DB_SWEEP_INTERVAL = getattr(config, "OFFLINE_DB_SWEEP_INTERVAL", 60) if config else 60
 
 # --- 4. GLOBAL REGISTRY ---
 connected_chargers = {}
 
+# Mode cluster (diisi configure_worker); registry None = single process
+WORKER_INDEX = 0
+WORKER_ID = None
+CONTROL_URL = None
+registry = None
+
 # --- 5. LIBRARY SETUP ---
 try:
     from ocpp.routing import on
     from ocpp.v16 import ChargePoint as cp16
     from ocpp.v16 import call, call_result
     from ocpp.v16.enums import Action, RegistrationStatus
+    from ocpp.messages import MessageType
+    from ocpp.exceptions import OCPPError
     from dataclasses import dataclass
 
     # Auto-Patch Compatibility
@@ -68,88 +133,375 @@ try:
 except ImportError:
     sys.exit(1)
 
+from backend.live_buffer import LiveMeterBuffer, group_by_columns
+from backend.charger_state import ChargerStateRegistry
+from backend.boot_admission import BootAdmission, PENDING
+from backend.rate_limit import ChargerRateLimiter
+from backend.keepalive import AdaptiveHeartbeat
+from backend.bandwidth import BandwidthMeter, CountingServerProtocol, deflate_extensions
+from backend.ocpp_codec import OcppDecoder, unpack as fast_unpack
+from backend.control_server import ControlServer
+from backend.command_queue import PendingCommandIndex
+from backend.command_executor import CommandExecutor, REJECTED
+from backend.cluster import get_registry
+from backend.ocpp_bridge import _request as control_request
+from backend.ocpp_journal import MessageJournal, JournaledConnection
+from backend.tx_journal import TransactionJournal
+from backend.session_store import SessionStore
+from backend.meter_series import MeterSeriesStore
+
+# --- 5b. METRICS ---
+MESSAGES = Counter("uniev_ocpp_messages_total", "Pesan OCPP (CALL) dari charger per action", ["action"])
+HANDLER_SECONDS = Histogram("uniev_ocpp_handler_seconds", "Latensi handler OCPP per action", ["action"])
+HANDLER_ERRORS = Counter("uniev_ocpp_handler_errors_total", "Handler OCPP yang melempar exception", ["action"])
+CONNECTIONS = Counter("uniev_ocpp_connections_total", "Koneksi websocket charger yang diterima")
+RECONNECTS = Counter("uniev_ocpp_reconnects_total", "Koneksi dari charger yang sudah pernah terhubung ke proses ini")
+THROTTLED = Counter("uniev_ocpp_throttled_total", "Pesan charger yang melebihi rate limit (dijawab tanpa diproses penuh)", ["action"])
+DISCONNECTS = Counter("uniev_ocpp_disconnects_total", "Koneksi charger yang terputus")
+COMMAND_SECONDS = Histogram("uniev_command_dispatch_seconds", "RTT perintah remote ke charger sampai response", ["action", "status"])
+Gauge("uniev_ocpp_connected_chargers", "Charger yang sedang terhubung ke worker ini", fn=lambda: len(connected_chargers))
+Gauge("uniev_db_executor_queue_depth", "Task yang antri di db_executor per kelas prioritas", ["priority"], fn=lambda: db_executor.depths())
+Gauge("uniev_db_executor_busy", "Thread db_executor yang sedang bekerja", fn=lambda: db_executor.busy)
+Gauge("uniev_db_executor_workers", "Jumlah thread db_executor", fn=lambda: db_executor.max_workers)
+Gauge("uniev_db_up", "Health probe DB terakhir berhasil (1) atau gagal/belum dicek (0)",
+      fn=lambda: 1 if Database and Database.health()["ok"] else 0)
+Gauge("uniev_db_queries", "Query DB yang dieksekusi proses ini per tabel/operasi", ["table", "op"],
+      fn=lambda: {k: v[0] for k, v in db_query_stats.by_table().items()})
+Gauge("uniev_db_query_seconds", "Total waktu query DB per tabel/operasi", ["table", "op"],
+      fn=lambda: {k: round(v[1], 6) for k, v in db_query_stats.by_table().items()})
+Gauge("uniev_db_query_bytes", "Byte payload query DB (request + response) per tabel/operasi", ["table", "op"],
+      fn=lambda: {k: v[3] for k, v in db_query_stats.by_table().items()})
+
+# charger_id yang pernah connect (untuk menghitung reconnect)
+_seen_chargers = set()
+
+def db_call(priority, fn, *args, key=None):
+    """Jadwalkan fn di db_executor dengan kelas prioritas; return asyncio future (boleh tidak di-await)."""
+    fut = asyncio.wrap_future(db_executor.submit_task(priority, fn, *args, key=key))
+    fut.add_done_callback(_consume_db_result)
+    return fut
+
+def _consume_db_result(fut):
+    # Fire-and-forget: jangan biarkan "exception was never retrieved" memenuhi log
+    if not fut.cancelled():
+        fut.exception()
+
+def _observe_command(cmd, status, rtt_ms):
+    if rtt_ms is not None:
+        COMMAND_SECONDS.observe(rtt_ms / 1000.0, action=cmd.get('action'), status=status)
+
 # --- 6. DB WORKERS ---
-def _thread_process_transaction(charger_id, transaction_id, meter_stop, timestamp):
-    if not supabase_client or not ENABLE_DB: return
+def build_transaction_record(charger_id, transaction_id, meter_stop, timestamp, session=None):
+    # Energi = meter_stop - meter_start dari session_store; sesi tidak dikenal -> perilaku lama (meter_stop penuh)
+    energy_wh = session.energy_wh(meter_stop) if session else None
+    if energy_wh is None:
+        energy_wh = float(meter_stop or 0)
+    elif energy_wh < 0:
+        logger.warning(f"⚠️ METER WENT BACKWARDS {charger_id} tx={transaction_id}: start={session.meter_start} stop={meter_stop}")
+        energy_wh = 0.0
+    total_kwh = energy_wh / 1000.0
+    total_amount = (total_kwh * 2500) + 5000
+    record = {
+        "transaction_id": transaction_id, "charger_id": charger_id,
+        "stop_time": timestamp, "meter_stop": meter_stop,
+        "total_kwh": total_kwh, "total_amount": total_amount,
+        "carbon_saved_kg": total_kwh * 0.85,
+        "status": "COMPLETED", "payment_status": "PAID"
+    }
+    if session and session.id_tag:
+        record["user_id"] = session.id_tag
+    return record
+
+def _thread_save_transactions(rows):
+    """Simpan batch transaksi. Raise bila gagal agar tetap di journal dan dicoba lagi."""
+    if not supabase_client or not ENABLE_DB:
+        raise RuntimeError("database unavailable")
     try:
-        total_kwh = float(meter_stop) / 1000.0
-        total_amount = (total_kwh * 2500) + 5000
-        data = {
-            "transaction_id": transaction_id, "charger_id": charger_id,
-            "stop_time": timestamp, "meter_stop": meter_stop,
-            "total_kwh": total_kwh, "total_amount": total_amount,
-            "carbon_saved_kg": total_kwh * 0.85,
-            "status": "COMPLETED", "payment_status": "PAID"
-        }
-        supabase_client.table("transactions").insert(data).execute()
-        logger.info(f"💰 BILL: {charger_id} | {total_kwh} kWh | Rp {total_amount}")
-    except: pass
+        # Idempotent saat replay setelah crash
+        supabase_client.table("transactions").upsert(rows, on_conflict="transaction_id").execute()
+    except Exception:
+        # Skema tanpa unique transaction_id: insert biasa (DB mati -> raise lagi)
+        try:
+            supabase_client.table("transactions").insert(rows).execute()
+        except Exception:
+            DB_WRITE_ERRORS.inc(table="transactions")
+            raise
+    for r in rows:
+        logger.info(f"💰 BILL: {r['charger_id']} | {r['total_kwh']} kWh | Rp {r['total_amount']}")
 
-def _thread_save_boot(charger_id, vendor, model):
-    if not supabase_client: return
+def _thread_process_transaction(record):
+    # Jalur tanpa journal (mis. handler dipakai di luar main())
     try:
-        # FORCE RESET STATUS SAAT BOOT
-        data = {
-            "charger_id": charger_id, 
-            "vendor": vendor, 
-            "model": model, 
-            "status": "Available", # <--- Reset status
-            "current_power_kw": 0,
-            "current_session_kwh": 0,
-            "last_heartbeat": datetime.utcnow().isoformat()
-        }
-        supabase_client.table("chargers").upsert(data).execute()
-    except: pass
+        _thread_save_transactions([record])
+    except Exception as e:
+        logger.error(f"❌ BILL LOST {record.get('charger_id')} tx={record.get('transaction_id')}: {e}")
 
-def _thread_save_status(charger_id, status):
+def _thread_save_boot_bulk(rows):
+    """Upsert batch BootNotification (vendor/model). Reset status & meter ikut snapshot charger_state."""
     if not supabase_client: return
-    try:
-        supabase_client.table("chargers").update({"status": status}).eq("charger_id", charger_id).execute()
-    except: pass
+    for group in group_by_columns(rows):
+        try:
+            supabase_client.table("chargers").upsert(group).execute()
+        except Exception:
+            DB_WRITE_ERRORS.inc(table="chargers")
+            raise
 
-def _thread_save_live_meter(charger_id, kwh, kw, soc):
+def _thread_save_live_meter_bulk(rows):
     if not supabase_client: return
+    for group in group_by_columns(rows):
+        try:
+            supabase_client.table("chargers").upsert(group).execute()
+        except Exception:
+            # Fallback: update per baris (mis. upsert ditolak constraint tabel)
+            for row in group:
+                data = {k: v for k, v in row.items() if k != "charger_id"}
+                try:
+                    supabase_client.table("chargers").update(data).eq("charger_id", row["charger_id"]).execute()
+                except Exception:
+                    DB_WRITE_ERRORS.inc(table="chargers")
+                    raise
+
+# Journal frame OCPP (dibuat di main(); None = nonaktif)
+journal = None
+# Write-ahead journal transaksi (dibuat di main())
+tx_journal = None
+# Sesi aktif + allocator transaction_id; main() menggantinya dengan store yang di-snapshot ke disk
+session_store = SessionStore()
+# Di-clear main() bila file hwm tidak ada sampai reconcile_tx_id_floor selesai
+tx_ids_ready = asyncio.Event()
+tx_ids_ready.set()
+# Time-series MeterValues per sesi; main() mengganti dengan store yang menulis chunk ke SERIES_DIR
+meter_series = MeterSeriesStore()
+SERIES_RETENTION = getattr(config, "SERIES_RETENTION_DAYS", 90) * 86400 if config else 90 * 86400
+SESSION_SNAPSHOT_INTERVAL = getattr(config, "SESSION_SNAPSHOT_INTERVAL", 5.0) if config else 5.0
+SESSION_MAX_AGE = getattr(config, "SESSION_MAX_AGE_HOURS", 72) * 3600 if config else 72 * 3600
+TX_FLUSH_INTERVAL = getattr(config, "TX_FLUSH_INTERVAL", 1.0) if config else 1.0
+
+# Rate limit pesan masuk per charger/action (hanya action di THROTTLED_RESPONSES)
+THROTTLED_TOP_N = getattr(config, "OCPP_THROTTLED_TOP_N", 20) if config else 20
+rate_limiter = ChargerRateLimiter(
+    limits=getattr(config, "OCPP_RATE_LIMITS", None) if config else None,
+    charger_limit=getattr(config, "OCPP_RATE_LIMIT_PER_CHARGER", None) if config else None,
+)
+
+live_buffer = LiveMeterBuffer(
+    _thread_save_live_meter_bulk,
+    max_batch=getattr(config, "LIVE_METER_MAX_BATCH", 500) if config else 500,
+)
+
+# BootNotification: upsert di-batch tiap BOOT_FLUSH_INTERVAL; saat backlog
+# terlalu dalam charger dijawab Pending dan boot ulang setelah interval acak
+BOOT_FLUSH_INTERVAL = getattr(config, "BOOT_FLUSH_INTERVAL", 0.5) if config else 0.5
+boot_buffer = LiveMeterBuffer(
+    _thread_save_boot_bulk,
+    max_batch=getattr(config, "BOOT_FLUSH_BATCH", 500) if config else 500,
+)
+bandwidth = BandwidthMeter()
+decoder = OcppDecoder(
+    mode=getattr(config, "OCPP_DECODE_MODE", "strict") if config else "strict",
+    sample_every=getattr(config, "OCPP_VALIDATION_SAMPLE_EVERY", 20) if config else 20,
+    trusted=getattr(config, "OCPP_TRUSTED_CHARGERS", ()) if config else (),
+)
+keepalive = AdaptiveHeartbeat(
+    enabled=KEEPALIVE_MODE == "websocket",
+    base_interval=HEARTBEAT_INTERVAL,
+    min_interval=getattr(config, "HEARTBEAT_INTERVAL_MIN", 120) if config else 120,
+    max_interval=getattr(config, "HEARTBEAT_INTERVAL_MAX", 900) if config else 900,
+    target_rate=getattr(config, "HEARTBEAT_TARGET_RATE", 20.0) if config else 20.0,
+    lag_high=getattr(config, "LOOP_LAG_HIGH", 0.1) if config else 0.1,
+    ping_interval=WS_PING_INTERVAL,
+)
+boot_admission = BootAdmission(
+    heartbeat_interval=keepalive.interval,
+    jitter=getattr(config, "BOOT_INTERVAL_JITTER", 0.2) if config else 0.2,
+    max_backlog=getattr(config, "BOOT_MAX_BACKLOG", 2000) if config else 2000,
+    retry_interval=getattr(config, "BOOT_RETRY_INTERVAL", 15) if config else 15,
+    backlog_fn=lambda: _boot_backlog(),
+)
+
+def _boot_backlog():
+    # DB sedang gagal (bukan lambat): Pending tidak mempercepat apa pun, jadi jangan tahan charger
+    if boot_buffer.consecutive_errors:
+        return 0
+    return boot_buffer.depth() + db_executor.queue_depth(STATUS)
+
+# State live per charger (sumber kebenaran untuk API); kolom yang berubah
+# di-snapshot ke tabel chargers lewat live_buffer tiap LIVE_METER_FLUSH_INTERVAL
+charger_state = ChargerStateRegistry(
+    sink=live_buffer,
+    heartbeat_persist_seconds=getattr(config, "CHARGER_HEARTBEAT_PERSIST_SECONDS", 60) if config else 60,
+    # Interval terpanjang yang mungkin diberikan (adaptif + jitter) x jumlah heartbeat yang boleh terlewat
+    offline_after=int(round(keepalive.longest_interval * (1 + boot_admission.jitter))) * OFFLINE_MISSED_HEARTBEATS,
+)
+
+# --- 7. HANDLER ---
+def _epoch(ts):
+    """Timestamp OCPP (ISO 8601, tanpa zona = UTC) -> epoch detik; gagal parse -> waktu sekarang."""
     try:
-        # Update data live untuk monitoring User App
-        data = {}
-        if kwh is not None: data['current_session_kwh'] = kwh
-        if kw is not None: data['current_power_kw'] = kw
-        if soc is not None: data['current_soc'] = soc
-        
-        if data:
-            supabase_client.table("chargers").update(data).eq("charger_id", charger_id).execute()
+        dt = datetime.fromisoformat(str(ts).replace('Z', '+00:00'))
+        return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+def apply_meter_values(charger_id, meter_val, transaction_id=None):
+    """
+    Ambil kWh/kW/SoC terakhir dari MeterValues (snake_case atau camelCase) ke charger_state,
+    dan simpan tiap sampel ke meter_series sesi (transactionId, atau sesi aktif charger).
+    """
+    try:
+        if meter_val:
+            kwh = kw = soc = None
+            if transaction_id is None:
+                session = session_store.latest_for(charger_id)
+                transaction_id = session.transaction_id if session else None
+            # Parsing Sampled Value (Simplified)
+            for mv in meter_val:
+                samples = mv.get('sampled_value') or mv.get('sampledValue') or []
+                e_wh = p_w = s_pct = None
+                for s in samples:
+                    measurand = s.get('measurand') or s.get('Measurand')
+                    val = float(s.get('value') or 0)
+                    unit = s.get('unit') or s.get('Unit')
+
+                    if measurand == 'Energy.Active.Import.Register':
+                        kwh = val / 1000 if unit == 'Wh' else val
+                        e_wh = kwh * 1000
+                    elif measurand == 'Power.Active.Import':
+                        kw = val / 1000 if unit == 'W' else val
+                        p_w = kw * 1000
+                    elif measurand == 'SoC':
+                        soc = int(val)
+                        s_pct = val
+                if transaction_id is not None and (e_wh is not None or p_w is not None or s_pct is not None):
+                    meter_series.append(charger_id, transaction_id, _epoch(mv.get('timestamp')), e_wh, p_w, s_pct)
+
+            if kwh is not None or kw is not None:
+                charger_state.meter(charger_id, kwh, kw, soc)
     except: pass
 
-# --- 7. HANDLER ---
+# Pesan yang melebihi rate limit tetap dijawab valid tanpa validasi schema /
+# handler penuh; isinya digabung ke charger_state (last-write-wins) bila berguna.
+# Action di luar tabel ini (Boot, Start/StopTransaction, Authorize) tidak pernah dibatasi.
+def _absorb_meter(cp, payload):
+    apply_meter_values(cp.id, payload.get('meterValue'), payload.get('transactionId'))
+    return {}
+
+def _absorb_status(cp, payload):
+    charger_state.status(cp.id, payload.get('status'), payload.get('errorCode'))
+    return {}
+
+THROTTLED_RESPONSES = {
+    "MeterValues": _absorb_meter,
+    "StatusNotification": _absorb_status,
+    "Heartbeat": lambda cp, payload: {"currentTime": datetime.utcnow().isoformat()},
+}
+
 class ChargePointHandler(cp16):
+    @property
+    def active_transaction_id(self):
+        # Transaksi aktif terakhir (dipakai RemoteStop bila perintah tidak membawa transaction_id)
+        s = session_store.latest_for(self.id)
+        return s.transaction_id if s else None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not decoder.library_path:
+            # Validasi request dilakukan decoder (cache + sampling); response buatan server tidak divalidasi ulang
+            for handlers in self.route_map.values():
+                handlers['_skip_schema_validation'] = True
+
+    async def route_message(self, raw_msg):
+        bandwidth.inbound(self.id, raw_msg)
+        if decoder.library_path:
+            return await super().route_message(raw_msg)
+        try:
+            msg = fast_unpack(raw_msg)
+        except OCPPError as e:
+            logger.warning(f"⚠️ INVALID FRAME {self.id}: {e}")
+            return
+        if msg.message_type_id == MessageType.Call:
+            try:
+                await self._handle_call(msg)
+            except OCPPError as error:
+                await self._send(msg.create_call_error(error).to_json())
+        elif msg.message_type_id in (MessageType.CallResult, MessageType.CallError):
+            self._response_queue.put_nowait(msg)
+
+    async def _send(self, message):
+        bandwidth.outbound(self.id, message)
+        await super()._send(message)
+
+    async def _handle_call(self, msg):
+        # Hitung + ukur latensi tiap CALL dari charger (validasi, handler, kirim response)
+        action = msg.action
+        MESSAGES.inc(action=action)
+        charger_state.seen(self.id)
+        start = time.perf_counter()
+        if action in THROTTLED_RESPONSES and not rate_limiter.allow(self.id, action):
+            THROTTLED.inc(action=action)
+            payload = msg.payload if isinstance(msg.payload, dict) else {}
+            await self._send(msg.create_call_result(THROTTLED_RESPONSES[action](self, payload)).to_json())
+            return
+        try:
+            if not decoder.library_path and action in self.route_map:
+                decoder.validate(self.id, msg)
+            return await super()._handle_call(msg)
+        except Exception:
+            HANDLER_ERRORS.inc(action=action)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, action=action)
+
     @on(Action.BootNotification)
     async def on_boot_notification(self, **kwargs):
         vendor = kwargs.get('charge_point_vendor') or kwargs.get('chargePointVendor')
         model = kwargs.get('charge_point_model') or kwargs.get('chargePointModel')
+        status, interval = boot_admission.admit()
+        if status == PENDING:
+            logger.info(f"⏳ BOOT PENDING: {self.id} (retry {interval}s)")
+            return call_result.BootNotificationPayload(
+                current_time=datetime.utcnow().isoformat(), interval=interval, status=RegistrationStatus.pending
+            )
         logger.info(f"📩 BOOT: {self.id}")
-        
-        asyncio.get_running_loop().run_in_executor(db_executor, _thread_save_boot, self.id, vendor, model)
-        
+        charger_state.boot(self.id, vendor, model)
+        keepalive.assign(self.id, interval)
+        boot_buffer.put_fields(self.id, {"vendor": vendor, "model": model, "last_heartbeat": datetime.utcnow().isoformat()})
+
         return call_result.BootNotificationPayload(
-            current_time=datetime.utcnow().isoformat(), interval=30, status=RegistrationStatus.accepted
+            current_time=datetime.utcnow().isoformat(), interval=interval, status=RegistrationStatus.accepted
         )
 
     @on(Action.Heartbeat)
     async def on_heartbeat(self, **kwargs):
+        charger_state.heartbeat(self.id)
         return call_result.HeartbeatPayload(current_time=datetime.utcnow().isoformat())
 
     @on(Action.StatusNotification)
     async def on_status_notification(self, **kwargs):
         status = kwargs.get('status')
         logger.info(f"📊 STATUS {self.id}: {status}")
-        asyncio.get_running_loop().run_in_executor(db_executor, _thread_save_status, self.id, status)
+        charger_state.status(self.id, status, kwargs.get('error_code') or kwargs.get('errorCode'))
         return call_result.StatusNotificationPayload()
 
     @on(Action.StartTransaction)
     async def on_start_transaction(self, **kwargs):
-        logger.info(f"⚡ START TX: {self.id}")
+        if not tx_ids_ready.is_set():
+            await tx_ids_ready.wait()   # hwm hilang: tunggu max id DB agar tidak menerbitkan id ganda
+        session = session_store.start(
+            self.id,
+            connector_id=kwargs.get('connector_id') or kwargs.get('connectorId'),
+            id_tag=kwargs.get('id_tag') or kwargs.get('idTag'),
+            meter_start=kwargs.get('meter_start', kwargs.get('meterStart')),
+            started_at=kwargs.get('timestamp'),
+        )
+        if session is None:
+            # Ruang transaction id int32 habis (lihat /sessions, uniev_tx_ids_left): tolak, jangan pakai ulang id
+            logger.error(f"❌ START TX {self.id} rejected: transaction ids exhausted")
+            return call_result.StartTransactionPayload(transaction_id=0, id_tag_info={"status": "Invalid"})
+        logger.info(f"⚡ START TX: {self.id} tx={session.transaction_id}")
+        charger_state.transaction(self.id, session.transaction_id)
         return call_result.StartTransactionPayload(
-            transaction_id=int(datetime.utcnow().timestamp()), id_tag_info={"status": "Accepted"}
+            transaction_id=session.transaction_id, id_tag_info={"status": "Accepted"}
         )
 
     @on(Action.StopTransaction)
@@ -158,51 +510,51 @@ class ChargePointHandler(cp16):
         meter = kwargs.get('meter_stop') or kwargs.get('meterStop')
         ts = kwargs.get('timestamp')
         logger.info(f"🛑 STOP TX: {tid}")
-        
-        asyncio.get_running_loop().run_in_executor(db_executor, _thread_process_transaction, self.id, tid, meter, ts)
-        
-        # Reset Status di DB jadi Available setelah stop
-        asyncio.get_running_loop().run_in_executor(db_executor, _thread_save_status, self.id, "Available")
+        if tid is not None and session_store.is_duplicate_stop(tid, self.id):
+            # Charger mengirim ulang (response sebelumnya hilang): sudah ditagih, jangan timpa record
+            logger.warning(f"♻️ STOP TX {tid} ({self.id}): duplicate, already billed")
+            return call_result.StopTransactionPayload(id_tag_info={"status": "Accepted"})
+        session = session_store.stop(tid)
+        if tid is not None:
+            meter_series.close(session.transaction_id if session else tid)
+        if session is None:
+            logger.warning(f"⚠️ STOP TX {tid} ({self.id}): unknown session, billing meter_stop as-is")
+        charger_state.transaction(self.id, self.active_transaction_id)  # sesi lain di connector lain, atau None
+
+        record = build_transaction_record(self.id, tid, meter, ts, session)
+        loop = asyncio.get_running_loop()
+        if tx_journal:
+            try:
+                # Durable dulu (fsync), baru jawab charger; DB di-flush batch oleh transaction_flusher
+                await loop.run_in_executor(wal_executor, tx_journal.append, record)
+            except Exception as e:
+                logger.error(f"❌ TX JOURNAL append failed: {e}")
+                db_call(CRITICAL, _thread_process_transaction, record)
+        else:
+            db_call(CRITICAL, _thread_process_transaction, record)
+
+        # Reset Status jadi Available setelah stop (snapshot ke DB lewat live_buffer)
+        charger_state.status(self.id, "Available")
         
         return call_result.StopTransactionPayload(id_tag_info={"status": "Accepted"})
 
     @on(Action.MeterValues)
     async def on_meter_values(self, **kwargs):
         # Logic Tangkap Meter untuk User App
-        try:
-            meter_val = kwargs.get('meter_value') or kwargs.get('meterValue')
-            if meter_val:
-                kwh = kw = soc = None
-                # Parsing Sampled Value (Simplified)
-                for mv in meter_val:
-                    samples = mv.get('sampled_value') or mv.get('sampledValue') or []
-                    for s in samples:
-                        measurand = s.get('measurand') or s.get('Measurand')
-                        val = float(s.get('value') or 0)
-                        unit = s.get('unit') or s.get('Unit')
-                        
-                        if measurand == 'Energy.Active.Import.Register':
-                            kwh = val / 1000 if unit == 'Wh' else val
-                        elif measurand == 'Power.Active.Import':
-                            kw = val / 1000 if unit == 'W' else val
-                        elif measurand == 'SoC':
-                            soc = int(val)
-                
-                if kwh is not None or kw is not None:
-                    asyncio.get_running_loop().run_in_executor(db_executor, _thread_save_live_meter, self.id, kwh, kw, soc)
-        except: pass
+        apply_meter_values(self.id, kwargs.get('meter_value') or kwargs.get('meterValue'),
+                           kwargs.get('transaction_id') or kwargs.get('transactionId'))
         return call_result.MeterValuesPayload()
 
     # --- REMOTE COMMANDS ---
     async def remote_start(self, user_id):
         logger.info(f"🚀 EXEC REMOTE START -> {self.id}")
         req = call.RemoteStartTransactionPayload(id_tag=user_id)
-        await self.call(req)
+        return await self.call(req)
 
     async def remote_stop(self, tx_id):
         logger.info(f"🚀 EXEC REMOTE STOP -> {self.id}")
-        req = call.RemoteStopTransactionPayload(transaction_id=int(tx_id)) 
-        await self.call(req)
+        req = call.RemoteStopTransactionPayload(transaction_id=int(tx_id))
+        return await self.call(req)
 
 # --- CONNECTION ---
 async def on_connect(websocket, path=None):
@@ -211,50 +563,755 @@ async def on_connect(websocket, path=None):
         charger_id = (path or "/").strip('/') or "UNKNOWN"
         
         logger.info(f"🔗 CONNECTED: {charger_id}")
+        CONNECTIONS.inc()
+        if charger_id in _seen_chargers:
+            RECONNECTS.inc()
+        _seen_chargers.add(charger_id)
+        ws_raw = websocket
+        bandwidth.attach(charger_id, ws_raw)
+        if journal:
+            websocket = JournaledConnection(websocket, charger_id, journal)
         cp = ChargePointHandler(charger_id, websocket)
         connected_chargers[charger_id] = cp
+        charger_state.connected(charger_id)
+        if registry:
+            await claim_charger(charger_id)
+        if pending_commands.has_pending(charger_id):
+            asyncio.get_running_loop().call_soon(deliver_pending, charger_id)
         await cp.start()
     except Exception as e:
         logger.error(f"🔥 ERROR: {e}")
     finally:
-        if 'charger_id' in locals() and charger_id in connected_chargers:
+        if 'ws_raw' in locals():
+            bandwidth.detach(charger_id, ws_raw)
+        # Charger bisa reconnect sebelum socket lama tertutup: cleanup hanya
+        # bila handler ini masih yang terdaftar, jangan bongkar koneksi baru.
+        if 'cp' in locals() and connected_chargers.get(charger_id) is cp:
+            DISCONNECTS.inc()
             del connected_chargers[charger_id]
+            charger_state.disconnected(charger_id)
+            rate_limiter.forget(charger_id)
+            keepalive.release(charger_id)
+            decoder.forget(charger_id)
+            command_executor.forget(charger_id)
+            if registry:
+                asyncio.get_running_loop().run_in_executor(db_executor, registry.release, charger_id, WORKER_ID)
+
+# --- CLUSTER OWNERSHIP ---
+async def claim_charger(charger_id):
+    """Catat worker ini sebagai pemilik socket, lalu kabari worker lain (perintah tertunda di sana ikut diteruskan)."""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(db_executor, registry.claim, charger_id, WORKER_ID)
+        peers = await loop.run_in_executor(db_executor, registry.workers)
+    except Exception as e:
+        logger.warning(f"⚠️ Registry claim failed for {charger_id}: {e}")
+        return
+    for wid, url in peers.items():
+        if wid != WORKER_ID:
+            loop.run_in_executor(None, _notify_peer, url, charger_id)
+
+def _notify_peer(url, charger_id):
+    try:
+        control_request("POST", f"/chargers/{charger_id}/connected", {}, base_url=url)
+    except Exception:
+        pass
+
+async def route_command(cmd, forwarded=False):
+    """
+    Mode cluster: teruskan perintah ke worker pemilik socket. Bila charger
+    lokal, tidak punya pemilik, atau forward gagal, jatuh ke dispatch_command
+    (yang menyimpan perintah di pending_commands bila charger offline).
+    Return status delivery (PUSHED / QUEUED / UNSUPPORTED).
+    """
+    cid = cmd.get('charger_id')
+    if registry is None or forwarded or cid in connected_chargers:
+        return dispatch_command(cmd)
+    loop = asyncio.get_running_loop()
+    try:
+        url = await loop.run_in_executor(db_executor, registry.owner_url, cid)
+        if url and url != CONTROL_URL:
+            res = await loop.run_in_executor(None, lambda: control_request("POST", "/commands?forwarded=1", cmd, base_url=url))
+            return _delivery_of(res)
+    except Exception as e:
+        logger.warning(f"⚠️ Forward {cmd.get('action')} -> {cid} failed: {e}")
+    return dispatch_command(cmd)
 
 # --- COMMAND BRIDGE ---
+# Status delivery perintah (dilaporkan main_api sebagai "delivery")
+PUSHED, QUEUED, UNSUPPORTED = "push", "queued", "unsupported"
+
+def _delivery_of(res):
+    """Status delivery dari response /commands (worker lama hanya mengirim "delivered")."""
+    if not res:
+        return QUEUED
+    return res.get("delivery") or (PUSHED if res.get("delivered") else QUEUED)
+
+# ID perintah yang sudah dikirim -> status delivery; mencegah dobel eksekusi saat push dan
+# rekonsiliasi melihat baris yang sama sebelum hasil eksekusinya tersimpan.
+_dispatched_ids = OrderedDict()
+_DISPATCHED_MAX = 10000
+
+# Perintah untuk charger yang belum terhubung, di-index per charger_id
+pending_commands = PendingCommandIndex(ttl_seconds=COMMAND_TTL)
+# Status terminal yang menunggu ditulis batch: {status: [id, ...]}
+_terminal_commands = {}
+# Menunggu response charger; hasil ACCEPTED/REJECTED/TIMEOUT + rtt ditulis batch
+command_executor = CommandExecutor(
+    max_inflight=COMMAND_MAX_INFLIGHT, max_per_charger=COMMAND_MAX_PER_CHARGER, timeout=COMMAND_TIMEOUT,
+    on_record=_observe_command,
+)
+
+# Skema charging_commands lama (tanpa migrasi backend/sql/charging_commands_results.sql)
+# menolak kolom rtt_ms/responded_at atau status baru. Sekali ditolak, tulis versi
+# yang lebih sederhana: 0 = status + rtt_ms + responded_at, 1 = status saja,
+# 2 = status lama "EXECUTED". Tanpa ini baris tetap PENDING dan dikirim ulang.
+# Berlaku juga untuk status terminal EXPIRED/DUPLICATE/UNSUPPORTED (_thread_mark_commands).
+_command_result_level = 0
+_COMMAND_RESULT_LEVELS = ("status + rtt_ms/responded_at", "status only", "legacy EXECUTED status")
+# Kode error PostgREST/Postgres untuk kolom tidak dikenal, nilai enum dan check constraint
+_SCHEMA_ERROR_CODES = {"PGRST204", "42703", "22P02", "23514"}
+
+def _command_result_data(row, level):
+    if level == 0:
+        return {k: row[k] for k in ("status", "rtt_ms", "responded_at")}
+    return {"status": row["status"] if level == 1 else "EXECUTED"}
+
+def _degrade_command_results(level, e, to=None):
+    """Turunkan _command_result_level setelah error skema; False bila bukan error skema atau sudah paling sederhana."""
+    global _command_result_level
+    if level + 1 >= len(_COMMAND_RESULT_LEVELS) or getattr(e, "code", None) not in _SCHEMA_ERROR_CODES:
+        return False
+    to = max(level + 1, to or 0)
+    _command_result_level = max(_command_result_level, to)
+    logger.warning(f"⚠️ charging_commands rejected {_COMMAND_RESULT_LEVELS[level]} ({e}); "
+                   f"writing {_COMMAND_RESULT_LEVELS[to]} (apply backend/sql/charging_commands_results.sql)")
+    return True
+
+def _thread_save_command_result(row):
+    while True:
+        level = _command_result_level
+        try:
+            supabase_client.table("charging_commands").update(_command_result_data(row, level)).eq("id", row["id"]).execute()
+            return
+        except Exception as e:
+            if _degrade_command_results(level, e):
+                continue
+            DB_WRITE_ERRORS.inc(table="charging_commands")
+            logger.warning(f"⚠️ Command {row['id']} result update failed: {e}")
+            return
+
+def _thread_save_command_results(rows):
+    if not supabase_client: return
+    if _command_result_level == 0:
+        failed = []
+        for group in group_by_columns(rows):
+            try:
+                supabase_client.table("charging_commands").upsert(group).execute()
+            except Exception:
+                failed.extend(group)
+        rows = failed
+    for row in rows:
+        _thread_save_command_result(row)
+
+def _thread_mark_commands(batch):
+    if not supabase_client: return
+    for status, ids in batch.items():
+        while True:
+            # Hanya kolom status: yang ditolak skema pasti nilai statusnya -> langsung level 2
+            level = max(_command_result_level, 1)
+            try:
+                supabase_client.table("charging_commands").update(
+                    _command_result_data({"status": status}, level)).in_("id", ids).execute()
+                break
+            except Exception as e:
+                if _degrade_command_results(level, e, to=2):
+                    continue
+                DB_WRITE_ERRORS.inc(table="charging_commands")
+                logger.warning(f"⚠️ Command batch ({status}, {len(ids)} rows) update failed: {e}")
+                break
+
+# Aksi yang punya mapping OCPP di server ini; aksi EVSE lain (REBOOT, UNLOCK, ...) UNSUPPORTED
+_COMMAND_ACTIONS = ("REMOTE_START", "REMOTE_STOP")
+
+def _queue_terminal(cmd, status):
+    if cmd.get('id') is not None:
+        _terminal_commands.setdefault(status, []).append(cmd['id'])
+
+def dispatch_command(cmd):
+    """
+    Kirim satu baris charging_commands ke charger. Return PUSHED bila charger
+    terhubung; QUEUED bila tidak (perintah disimpan di pending_commands sampai
+    charger connect atau TTL habis); UNSUPPORTED bila action belum punya
+    mapping OCPP (baris langsung ditandai UNSUPPORTED, tidak dikirim).
+    """
+    cid = cmd.get('charger_id')
+    cmd_id = cmd.get('id')
+    action = cmd.get('action')
+    if cmd_id is not None and cmd_id in _dispatched_ids:
+        return _dispatched_ids[cmd_id]
+
+    cp = None
+    if action in _COMMAND_ACTIONS:
+        cp = connected_chargers.get(cid)
+        if cp is None:
+            duplicate = pending_commands.add(cmd)
+            if duplicate is not None:
+                _queue_terminal(duplicate, "DUPLICATE")
+            return QUEUED
+
+    delivery = PUSHED if cp is not None else UNSUPPORTED
+    if cmd_id is not None:
+        _dispatched_ids[cmd_id] = delivery
+        if len(_dispatched_ids) > _DISPATCHED_MAX:
+            _dispatched_ids.popitem(last=False)
+    if delivery == UNSUPPORTED:
+        logger.warning(f"⚠️ COMMAND {action} -> {cid}: unsupported action")
+        _queue_terminal(cmd, "UNSUPPORTED")
+        return UNSUPPORTED
+
+    payload = cmd.get('payload') if isinstance(cmd.get('payload'), dict) else {}
+    logger.info(f"🔔 COMMAND: {action} -> {cid}")
+    if action == "REMOTE_START":
+        uid = cmd.get('user_id')
+        asyncio.create_task(command_executor.run(cmd, lambda: cp.remote_start(uid)))
+    else:
+        tx_id = payload.get('transaction_id') or cp.active_transaction_id
+        if tx_id is None:
+            logger.warning(f"⚠️ REMOTE STOP -> {cid}: no active transaction")
+            command_executor.record(cmd, REJECTED)
+        else:
+            asyncio.create_task(command_executor.run(cmd, lambda: cp.remote_stop(tx_id)))
+    return PUSHED
+
+def deliver_pending(charger_id):
+    """Dipanggil saat on_connect (atau kabar dari worker lain): kirim perintah yang menunggu charger ini."""
+    live, expired = pending_commands.pop_for(charger_id)
+    for cmd in expired:
+        _queue_terminal(cmd, "EXPIRED")
+    for cmd in live:
+        if registry and charger_id not in connected_chargers:
+            asyncio.create_task(route_command(cmd))
+        else:
+            dispatch_command(cmd)
+    if live:
+        logger.info(f"📬 DELIVERED {len(live)} queued command(s) -> {charger_id}")
+
+async def command_sweeper():
+    """
+    Tiap detik: pindahkan perintah kedaluwarsa ke EXPIRED, lalu tulis status
+    terminal dan hasil eksekusi (status + rtt_ms) dalam batch.
+    """
+    global _terminal_commands
+    while True:
+        await asyncio.sleep(1)
+        for cmd in pending_commands.pop_expired():
+            _queue_terminal(cmd, "EXPIRED")
+        if _terminal_commands:
+            batch, _terminal_commands = _terminal_commands, {}
+            logger.info(f"⌛ COMMANDS FINALIZED: " + ", ".join(f"{k}={len(v)}" for k, v in batch.items()))
+            db_call(STATUS, _thread_mark_commands, batch)
+        results = command_executor.drain_results()
+        if results:
+            db_call(STATUS, _thread_save_command_results, results)
+
+def _thread_fetch_pending_commands():
+    return supabase_client.table("charging_commands").select("*").eq("status", "PENDING").execute().data
+
+async def fetch_pending_commands():
+    # Client async (pool keep-alive) langsung di event loop; client pengganti (tes/bench) tetap lewat db_executor
+    if Database and supabase_client is Database.get_client():
+        return (await Database.get_async_client().table("charging_commands").select("*").eq("status", "PENDING").execute()).data
+    return await db_call(BULK, _thread_fetch_pending_commands)
+
 async def command_checker():
+    """
+    Safety-net: rekonsiliasi perintah PENDING yang gagal di-push oleh API.
+    Baris lama tidak menumpuk karena pending_commands menandainya EXPIRED.
+    """
+    if registry and WORKER_INDEX != 0:
+        return  # Mode cluster: rekonsiliasi hanya di worker 0, yang meneruskan ke pemilik
     logger.info("👀 Command Bridge Started...")
     while True:
         if supabase_client:
             try:
-                # Polling Database
-                res = supabase_client.table("charging_commands").select("*").eq("status", "PENDING").execute()
-                for cmd in res.data:
-                    cid = cmd['charger_id']
-                    action = cmd['action']
-                    uid = cmd['user_id']
-                    
-                    if cid in connected_chargers:
-                        cp = connected_chargers[cid]
-                        logger.info(f"🔔 COMMAND: {action} -> {cid}")
-                        
-                        if action == "REMOTE_START":
-                            asyncio.create_task(cp.remote_start(uid))
-                        elif action == "REMOTE_STOP":
-                            asyncio.create_task(cp.remote_stop(12345))
-                            
-                        supabase_client.table("charging_commands").update({"status": "EXECUTED"}).eq("id", cmd['id']).execute()
+                for cmd in await fetch_pending_commands():
+                    await route_command(cmd)
             except Exception as e:
                 # logger.error(f"Bridge Error: {e}") # Silent error agar log tidak penuh
                 pass
-        await asyncio.sleep(1.5)
+        await asyncio.sleep(RECONCILE_INTERVAL)
+
+# --- CONTROL SERVER (push dari main_api) ---
+control_server = ControlServer(CONTROL_HOST, CONTROL_PORT, token=CONTROL_TOKEN)
+
+@control_server.route("POST", "/commands")
+async def _control_push_command(params, query, body):
+    if not isinstance(body, dict) or not body.get('charger_id'):
+        raise ValueError("command body must include charger_id")
+    delivery = await route_command(body, forwarded=query.get("forwarded") == "1")
+    # UNSUPPORTED tetap 200: baris sudah final, bukan error request (urllib raise untuk 4xx)
+    return (202 if delivery == QUEUED else 200), {"delivered": delivery == PUSHED, "delivery": delivery}
+
+@control_server.route("POST", "/chargers/{charger_id}/connected")
+def _control_charger_connected(params, query, body):
+    # Worker lain baru menerima socket charger ini
+    cid = params["charger_id"]
+    if pending_commands.has_pending(cid):
+        deliver_pending(cid)
+    return {"ok": True}
+
+@control_server.route("GET", "/journal/stats")
+def _control_journal_stats(params, query, body):
+    return journal.stats() if journal else {"enabled": False}
+
+@control_server.route("GET", "/transactions/journal")
+def _control_tx_journal(params, query, body):
+    return tx_journal.stats() if tx_journal else {"enabled": False}
+
+@control_server.route("GET", "/chargers/connected")
+def _control_connected(params, query, body):
+    return {"worker_id": WORKER_ID, "chargers": sorted(connected_chargers)}
+
+@control_server.route("GET", "/metrics")
+def _control_metrics(params, query, body):
+    # Format teks Prometheus; scrape dari 127.0.0.1:PORT_OCPP_CONTROL
+    return REGISTRY.render()
+
+Gauge("uniev_live_buffer_pending", "Snapshot charger (live meter/status) yang belum di-flush", fn=lambda: live_buffer.depth())
+Gauge("uniev_tx_journal_backlog", "Transaksi di journal yang belum tersimpan di DB", fn=lambda: tx_journal.backlog() if tx_journal else 0)
+Gauge("uniev_tx_journal_flush_lag_seconds", "Umur transaksi tertua di backlog", fn=lambda: tx_journal.stats()["flush_lag_s"] if tx_journal else 0)
+Gauge("uniev_journal_dropped_frames", "Frame OCPP yang tidak masuk journal karena antrian writer penuh",
+      fn=lambda: journal.dropped if journal else 0)
+Gauge("uniev_chargers_silent", "Charger terhubung yang tidak mengirim apa pun > offline_after", fn=lambda: charger_state.stats()["silent"])
+Gauge("uniev_charger_offline_transitions", "Transisi ke Offline sejak start", ["reason"], fn=lambda: dict(charger_state.went_offline))
+Gauge("uniev_boot_backlog", "Backlog penulisan boot (buffer + antrian status db_executor)", fn=lambda: boot_admission.stats()["backlog"])
+Gauge("uniev_boot_admissions", "Jawaban BootNotification sejak start", ["result"],
+      fn=lambda: {"accepted": boot_admission.accepted, "pending": boot_admission.pending})
+Gauge("uniev_ocpp_throttled_by_charger",
+      f"Pesan ter-throttle per charger/action sejak start ({THROTTLED_TOP_N} charger paling berisik)",
+      ["charger_id", "action"], fn=lambda: rate_limiter.counts(THROTTLED_TOP_N))
+Gauge("uniev_ocpp_payload_bytes", "Byte JSON OCPP (sebelum kompresi) per action/arah sejak start",
+      ["action", "direction"], fn=lambda: bandwidth.by_action())
+Gauge("uniev_ws_wire_bytes", "Byte websocket di wire (setelah permessage-deflate) sejak start", ["direction"],
+      fn=lambda: {(d,): bandwidth.totals()["wire_" + d] for d in ("in", "out")})
+Gauge("uniev_ws_compressed_connections", "Koneksi charger yang menegosiasikan permessage-deflate",
+      fn=lambda: bandwidth.totals()["compressed_connections"])
+Gauge("uniev_ocpp_validations", "Validasi schema payload masuk oleh decoder (mode fast/sampled)", ["result"],
+      fn=lambda: {("passed",): decoder.validated - decoder.failed, ("failed",): decoder.failed, ("skipped",): decoder.skipped})
+Gauge("uniev_sessions_active", "Sesi charging aktif di session_store", fn=lambda: len(session_store.active()))
+Gauge("uniev_tx_ids_left", "Sisa transaction id sebelum melewati int32 (0 = StartTransaction ditolak)",
+      fn=lambda: session_store.ids.ids_left() or 0)
+Gauge("uniev_sessions_duplicate_stops", "StopTransaction yang dikirim ulang untuk sesi yang sudah ditagih (diabaikan)",
+      fn=lambda: session_store.duplicate_stops)
+Gauge("uniev_sessions_unknown_stops", "StopTransaction untuk sesi yang tidak dikenal (ditagih meter_stop penuh)",
+      fn=lambda: session_store.unknown_stops)
+Gauge("uniev_heartbeat_interval_seconds", "Interval Heartbeat yang diberikan ke boot berikutnya (sebelum jitter)", fn=lambda: keepalive.interval)
+Gauge("uniev_event_loop_lag_seconds", "Lag event loop maksimum pada periode tuning terakhir", fn=lambda: keepalive.loop_lag)
+Gauge("uniev_heartbeat_msgs_saved_per_second", "Perkiraan Heartbeat/detik yang dihemat vs interval tetap", fn=lambda: keepalive.report()["ocpp_msgs_saved_per_s"])
+Gauge("uniev_commands_pending", "Perintah yang menunggu charger connect", fn=lambda: len(pending_commands))
+Gauge("uniev_commands_inflight", "Perintah yang menunggu response charger", fn=lambda: command_executor.inflight)
+
+@control_server.route("GET", "/boot/stats")
+def _control_boot_stats(params, query, body):
+    return {**boot_admission.stats(), "buffer": boot_buffer.stats()}
+
+@control_server.route("GET", "/chargers/throttled")
+def _control_throttled(params, query, body):
+    # Charger paling berisik (mis. MeterValues dalam loop) untuk dicek hardware-nya
+    return {"top": rate_limiter.top(int(query.get("limit", 20))), "stats": rate_limiter.stats()}
+
+@control_server.route("GET", "/chargers/bandwidth")
+def _control_bandwidth(params, query, body):
+    # Charger dengan byte wire terbanyak; payload = JSON OCPP, wire = setelah deflate + header frame/ping
+    return {"top": bandwidth.top(int(query.get("limit", 20))), "totals": bandwidth.totals(),
+            "compression": WS_COMPRESSION}
+
+@control_server.route("GET", "/chargers/{charger_id}/bandwidth")
+def _control_charger_bandwidth(params, query, body):
+    row = bandwidth.charger(params["charger_id"])
+    if row is None:
+        return 404, {"error": "unknown charger"}
+    return row
+
+@control_server.route("GET", "/sessions")
+def _control_sessions(params, query, body):
+    # Sesi aktif di worker ini (?charger_id= untuk satu charger)
+    rows = session_store.active(query.get("charger_id"))
+    return {"sessions": [s.to_dict() for s in rows], "stats": session_store.stats()}
+
+@control_server.route("GET", "/sessions/{transaction_id}/series")
+async def _control_session_series(params, query, body):
+    # ?start_ms=&end_ms= epoch ms (satuan sama dengan ts_ms), ?max_points= downsample
+    try:
+        tid = int(params["transaction_id"])
+        start_ms = int(query["start_ms"]) if query.get("start_ms") else None
+        end_ms = int(query["end_ms"]) if query.get("end_ms") else None
+        max_points = int(query.get("max_points") or 0) or None
+    except ValueError:
+        return 400, {"error": "invalid transaction_id/start_ms/end_ms/max_points"}
+    # Sesi lama dibaca dari file + dekompresi: di executor, bukan di event loop
+    res = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: meter_series.read(tid, start_ms, end_ms, max_points, charger_id=query.get("charger_id")))
+    return (200, res) if res else (404, {"error": "no series for this transaction on this worker"})
+
+@control_server.route("GET", "/chargers/{charger_id}/series")
+def _control_charger_series(params, query, body):
+    return {"charger_id": params["charger_id"], "sessions": meter_series.sessions(params["charger_id"])}
+
+@control_server.route("GET", "/series/stats")
+def _control_series_stats(params, query, body):
+    return meter_series.stats()
+
+@control_server.route("GET", "/ocpp/decoder")
+def _control_decoder(params, query, body):
+    return decoder.stats()
+
+@control_server.route("GET", "/keepalive")
+def _control_keepalive(params, query, body):
+    # Interval Heartbeat saat ini + perkiraan penghematan pesan vs interval tetap HEARTBEAT_INTERVAL
+    return keepalive.report()
+
+@control_server.route("GET", "/db/stats")
+def _control_db_stats(params, query, body):
+    return db_executor.stats()
+
+@control_server.route("GET", "/db/health")
+def _control_db_health(params, query, body):
+    return {"db": Database.health() if Database else None, "cold_start": cold_start.report()}
+
+@control_server.route("GET", "/db/queries")
+def _control_db_queries(params, query, body):
+    """Top query DB worker ini per (tabel, operasi, call site); ?by=total_ms|avg_ms|max_ms|count|rows|bytes_in&limit="""
+    if not Database:
+        return {"queries": 0, "top": []}
+    return Database.query_stats(int(query.get("limit", 20)), query.get("by", "total_ms"))
+
+@control_server.route("GET", "/chargers/state")
+def _control_charger_states(params, query, body):
+    # ?ids=A,B untuk subset; tanpa ids = semua charger yang dikenal worker ini
+    ids = [c for c in query.get("ids", "").split(",") if c] or None
+    return {"worker_id": WORKER_ID, "chargers": charger_state.all(ids), "stats": charger_state.stats()}
+
+@control_server.route("GET", "/chargers/{charger_id}/state")
+def _control_charger_state(params, query, body):
+    st = charger_state.get(params["charger_id"])
+    return (200, st) if st else (404, {"error": "charger not tracked by this worker"})
+
+@control_server.route("GET", "/commands/stats")
+def _control_command_stats(params, query, body):
+    return {"executor": command_executor.stats(), "pending": pending_commands.stats()}
+
+# --- OFFLINE DETECTION ---
+def _thread_mark_stale_offline(cutoff_iso):
+    """Charger yang tidak dipegang worker mana pun (mis. proses lama mati) tetap ditandai Offline."""
+    if not supabase_client: return
+    try:
+        supabase_client.table("chargers").update({"status": "Offline", "current_power_kw": 0}) \
+            .lt("last_heartbeat", cutoff_iso).neq("status", "Offline").execute()
+    except Exception:
+        DB_WRITE_ERRORS.inc(table="chargers")
+        raise
+
+async def offline_sweeper():
+    """
+    Tiap detik: charger terhubung yang melewatkan OFFLINE_MISSED_HEARTBEATS
+    interval ditandai Offline (ditulis batch lewat live_buffer). Worker 0 juga
+    menandai baris DB yang last_heartbeat-nya kedaluwarsa.
+    """
+    last_db_sweep = time.monotonic()
+    while True:
+        await asyncio.sleep(1)
+        gone = charger_state.sweep()
+        if gone:
+            logger.warning(f"💤 OFFLINE ({len(gone)} silent > {charger_state.offline_after}s): " + ", ".join(gone[:10]) + (" ..." if len(gone) > 10 else ""))
+        if WORKER_INDEX == 0 and time.monotonic() - last_db_sweep >= OFFLINE_DB_SWEEP_INTERVAL:
+            last_db_sweep = time.monotonic()
+            # last_heartbeat di DB bisa tertinggal CHARGER_HEARTBEAT_PERSIST_SECONDS dari kontak sebenarnya
+            grace = charger_state.offline_after + charger_state.heartbeat_persist_seconds + LIVE_FLUSH_INTERVAL
+            cutoff = datetime.utcfromtimestamp(time.time() - grace).isoformat()
+            try:
+                await db_call(BULK, _thread_mark_stale_offline, cutoff)
+            except Exception as e:
+                logger.debug(f"Offline DB sweep failed: {e}")
+
+# --- KEEPALIVE TUNER ---
+async def keepalive_tuner(period=10):
+    """Ukur lag event loop tiap detik; tiap `period` detik hitung ulang interval Heartbeat untuk boot berikutnya."""
+    lag_max = 0.0
+    ticks = 0
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(1)
+        lag_max = max(lag_max, time.monotonic() - started - 1)
+        ticks += 1
+        if ticks < period:
+            continue
+        old = keepalive.interval
+        boot_admission.heartbeat_interval = keepalive.update(len(connected_chargers), lag_max)
+        if keepalive.interval != old:
+            saved = keepalive.report()
+            logger.info(f"💓 HEARTBEAT INTERVAL {old}s -> {keepalive.interval}s (chargers={len(connected_chargers)}, "
+                        f"lag={saved['loop_lag_ms']}ms, saved {saved['saved_pct']}% heartbeat msgs)")
+        lag_max = 0.0
+        ticks = 0
+
+# --- BOOT FLUSHER ---
+async def boot_flusher():
+    """Upsert batch BootNotification; interval pendek agar charger baru cepat terlihat di DB."""
+    while True:
+        await asyncio.sleep(BOOT_FLUSH_INTERVAL)
+        try:
+            while boot_buffer.depth():
+                if not await db_call(STATUS, boot_buffer.flush, key="boot_flush"): break
+        except Exception as e:
+            logger.error(f"Boot Flush Error: {e}")
+
+# --- LIVE METER FLUSHER ---
+async def live_meter_flusher():
+    """Flush buffer live meter secara bulk; maksimal satu flush in-flight di db_executor."""
+    last_report = time.monotonic()
+    while True:
+        await asyncio.sleep(LIVE_FLUSH_INTERVAL)
+        try:
+            while live_buffer.depth():
+                if not await db_call(BULK, live_buffer.flush, key="live_flush"): break
+        except Exception as e:
+            logger.error(f"Live Flush Error: {e}")
+        if time.monotonic() - last_report >= LIVE_STATS_INTERVAL:
+            last_report = time.monotonic()
+            st = live_buffer.stats()
+            charger_state.prune()
+            logger.info(
+                f"📦 LIVE BUFFER: flushed={st['rows_flushed']} merged={st['updates_merged']}/{st['updates_total']} "
+                f"pending={st['pending']} executor_queue={db_executor.queue_depth()} "
+                f"flush={st['last_flush_ms']}ms (max {st['max_flush_ms']}ms)"
+            )
+
+def open_journal():
+    directory = getattr(config, "JOURNAL_DIR", "journal")
+    if WORKER_ID and registry:
+        directory = os.path.join(directory, WORKER_ID)   # satu writer per worker
+    return MessageJournal(
+        directory,
+        segment_max_bytes=int(getattr(config, "JOURNAL_SEGMENT_MB", 64) * 1024 * 1024),
+        segment_max_seconds=getattr(config, "JOURNAL_SEGMENT_SECONDS", 3600),
+        retention_segments=getattr(config, "JOURNAL_RETENTION_SEGMENTS", 48),
+        max_queue=getattr(config, "JOURNAL_MAX_QUEUE", 100000),
+    ).start()
+
+# --- TRANSACTION FLUSHER ---
+async def transaction_flusher():
+    """Flush backlog journal transaksi ke DB; saat DB bermasalah mundur (backoff) dan coba lagi."""
+    delay = TX_FLUSH_INTERVAL
+    degraded = False
+    while True:
+        await asyncio.sleep(delay)
+        while tx_journal.backlog():
+            if not await db_call(CRITICAL, tx_journal.flush):
+                break
+        st = tx_journal.stats()
+        if st["backlog"]:
+            if not degraded:
+                logger.warning(f"⚠️ TX BACKLOG {st['backlog']} (lag {st['flush_lag_s']}s): {st['last_error']}")
+            degraded = True
+            delay = min(delay * 2, 30)
+        else:
+            if degraded:
+                logger.info(f"✅ TX BACKLOG drained (flushed={st['flushed']})")
+            degraded = False
+            delay = TX_FLUSH_INTERVAL
+
+def open_tx_journal():
+    directory = getattr(config, "TX_JOURNAL_DIR", "tx_journal")
+    if WORKER_ID and registry:
+        directory = os.path.join(directory, WORKER_ID)
+    return TransactionJournal(
+        directory, _thread_save_transactions,
+        batch_size=getattr(config, "TX_FLUSH_BATCH", 200) if config else 200,
+    ).open()
+
+# --- SESSION SNAPSHOT ---
+async def session_snapshotter():
+    """Snapshot sesi aktif ke disk bila berubah; sesi tanpa StopTransaction > SESSION_MAX_AGE dibuang."""
+    loop = asyncio.get_running_loop()
+    last_prune = time.monotonic()
+    while True:
+        await asyncio.sleep(SESSION_SNAPSHOT_INTERVAL)
+        if time.monotonic() - last_prune >= 3600:
+            last_prune = time.monotonic()
+            stale = session_store.prune(SESSION_MAX_AGE)
+            if stale:
+                logger.warning(f"🧹 SESSIONS: dropped {len(stale)} session(s) without StopTransaction: {stale[:10]}")
+            for tid in stale:
+                meter_series.close(tid)
+            try:
+                await loop.run_in_executor(wal_executor, meter_series.prune, SERIES_RETENTION)
+            except Exception as e:
+                logger.error(f"❌ SERIES PRUNE failed: {e}")
+        try:
+            await loop.run_in_executor(wal_executor, session_store.snapshot)
+        except OSError as e:
+            logger.error(f"❌ SESSION SNAPSHOT failed: {e}")
+
+def _thread_max_transaction_id():
+    """
+    transaction_id terbesar di tabel transactions. DB tidak bisa dibaca: pakai
+    waktu sekarang (transaction_id lama = unix timestamp) sebagai batas bawah.
+    """
+    try:
+        rows = supabase_client.table("transactions").select("transaction_id") \
+            .order("transaction_id", desc=True).limit(1).execute().data if supabase_client else []
+        return int(rows[0]["transaction_id"]) if rows and rows[0].get("transaction_id") is not None else 0
+    except Exception as e:
+        logger.warning(f"⚠️ TX IDS: cannot read max transaction_id from DB ({e}); using clock as floor")
+        return int(time.time())
+
+async def reconcile_tx_id_floor():
+    """
+    Naikkan allocator di atas max transaction_id DB tanpa menahan start server.
+    Tanpa file hwm (hilang/instalasi baru) StartTransaction menunggu ini selesai.
+    """
+    try:
+        db_max = await db_call(STATUS, _thread_max_transaction_id)
+        session_store.ids.raise_floor(db_max)
+        logger.info(f"🔢 TX IDS reconciled with DB (max {db_max}, last issued {session_store.ids.stats().get('last_id')})")
+    except Exception as e:
+        logger.error(f"❌ TX IDS reconcile failed: {e}")
+        if not session_store.ids.has_hwm:
+            session_store.ids.raise_floor(int(time.time()))
+    finally:
+        tx_ids_ready.set()
+
+def open_session_store():
+    directory = getattr(config, "SESSION_DIR", "sessions") if config else "sessions"
+    if WORKER_ID and registry:
+        directory = os.path.join(directory, WORKER_ID)
+    # Id tiap worker disisipkan (slot = index worker) agar tidak pernah bertabrakan antar worker
+    return SessionStore(
+        directory, slot=WORKER_INDEX,
+        stride=getattr(config, "TX_ID_STRIDE", 16) if config else 16,
+        id_block=getattr(config, "TX_ID_BLOCK", 100) if config else 100,
+        id_low_water=getattr(config, "TX_ID_LOW_WATER", 1000000) if config else 1000000,
+        stopped_memory=getattr(config, "SESSION_STOPPED_MEMORY", 10000) if config else 10000,
+    ).open(tx_journal.max_transaction_id() if tx_journal else None)
+
+def open_meter_series():
+    directory = getattr(config, "SERIES_DIR", "series") if config else "series"
+    if WORKER_ID and registry:
+        directory = os.path.join(directory, WORKER_ID)
+    return MeterSeriesStore(
+        directory,
+        chunk_size=getattr(config, "SERIES_CHUNK_SAMPLES", 256) if config else 256,
+        max_cached_closed=getattr(config, "SERIES_CACHED_SESSIONS", 500) if config else 500,
+    ).open_dir()
 
 async def main():
+    global journal, tx_journal, session_store, meter_series
+    if Database:
+        Database.warm_up()
+    tx_journal = open_tx_journal()
+    session_store = open_session_store()
+    if not session_store.ids.has_hwm:
+        tx_ids_ready.clear()
+    asyncio.create_task(reconcile_tx_id_floor())
+    meter_series = open_meter_series()
     logger.info(f"--- UNIEV OCPP SERVER STARTING ON {HOST}:{PORT} ---")
-    server = await websockets.serve(on_connect, HOST, int(PORT), subprotocols=['ocpp1.6'], ping_interval=None)
-    await asyncio.gather(server.wait_closed(), command_checker())
+    if JOURNAL_ENABLED:
+        journal = open_journal()
+        logger.info(f"📼 Journal -> {journal.directory}")
+    # reuse_port: beberapa worker berbagi port yang sama, kernel membagi koneksi
+    server = await websockets.serve(
+        on_connect, HOST, int(PORT), subprotocols=['ocpp1.6'],
+        ping_interval=WS_PING_INTERVAL if keepalive.enabled else None, ping_timeout=WS_PING_TIMEOUT,
+        reuse_port=bool(registry) and sys.platform != 'win32',
+        create_protocol=CountingServerProtocol,
+        compression=None,
+        extensions=deflate_extensions(
+            window_bits=getattr(config, "WS_DEFLATE_WINDOW_BITS", None) if config else None,
+            mem_level=getattr(config, "WS_DEFLATE_MEM_LEVEL", None) if config else None,
+            level=getattr(config, "WS_DEFLATE_LEVEL", None) if config else None,
+            no_context_takeover=getattr(config, "WS_DEFLATE_NO_CONTEXT_TAKEOVER", False) if config else False,
+        ) if WS_COMPRESSION == "deflate" else None,
+    )
+    try:
+        await control_server.start()
+    except (OSError, RuntimeError) as e:
+        logger.error(f"❌ Control Server failed on port {CONTROL_PORT}: {e} (push disabled, polling only)")
+    if registry:
+        await asyncio.get_running_loop().run_in_executor(db_executor, registry.register_worker, WORKER_ID, CONTROL_URL)
+        logger.info(f"🧩 WORKER {WORKER_ID} registered (control {CONTROL_URL})")
+    cold_start.mark(f"ocpp_server[{WORKER_ID}]")
+    try:
+        await asyncio.gather(server.wait_closed(), command_checker(), command_sweeper(), live_meter_flusher(), transaction_flusher(), offline_sweeper(), boot_flusher(), keepalive_tuner(),
+                             session_snapshotter())
+    finally:
+        if journal:
+            journal.close()
+        tx_journal.close()
+        meter_series.flush()
+        if Database:
+            await Database.aclose()
+        try:
+            session_store.snapshot(force=True)
+        except OSError as e:
+            logger.error(f"❌ SESSION SNAPSHOT failed on shutdown: {e}")
+        if registry:
+            try:
+                registry.unregister_worker(WORKER_ID)
+            except Exception:
+                pass
 
-if __name__ == "__main__":
+def configure_worker(index, node_id, clustered):
+    """Set identitas worker ke-index. Control Server tiap worker: PORT_OCPP_CONTROL + index."""
+    global WORKER_INDEX, WORKER_ID, CONTROL_PORT, CONTROL_URL, registry
+    WORKER_INDEX = index
+    WORKER_ID = f"{node_id}-w{index}"
+    CONTROL_PORT = int(getattr(config, "PORT_OCPP_CONTROL", 9100) if config else 9100) + index
+    CONTROL_URL = f"http://{ADVERTISE_HOST}:{CONTROL_PORT}"
+    control_server.port = CONTROL_PORT
+    charger_state.worker_id = WORKER_ID
+    if clustered:
+        registry = get_registry()
+        if registry is None:
+            raise RuntimeError("Cluster mode needs CLUSTER_REGISTRY = 'sqlite' or 'supabase'")
+
+def run_worker(index, node_id, clustered):
     if sys.platform == 'win32': asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    configure_worker(index, node_id, clustered)
     try:
         asyncio.run(main())
-    except KeyboardInterrupt: pass
\ No newline at end of file
+    except KeyboardInterrupt: pass
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UNIEV OCPP 1.6J Server")
+    parser.add_argument("--workers", type=int, default=getattr(config, "OCPP_WORKERS", 1) if config else 1,
+                        help="Jumlah proses worker yang berbagi port OCPP (Linux, SO_REUSEPORT)")
+    parser.add_argument("--node-id", default=os.getenv("UNIEV_NODE_ID") or (getattr(config, "NODE_ID", "node1") if config else "node1"),
+                        help="Identitas host untuk registry multi-node")
+    parser.add_argument("--cluster", action="store_true",
+                        help="Daftarkan worker ke registry walau --workers 1 (mis. satu worker per host)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    clustered = args.cluster or args.workers > 1
+    if clustered and (os.getenv("UNIEV_CLUSTER_REGISTRY") or getattr(config, "CLUSTER_REGISTRY", "none")) == "none":
+        # Stand-in lokal: satu file SQLite dibagi semua worker di mesin ini
+        os.environ["UNIEV_CLUSTER_REGISTRY"] = "sqlite"
+
+    if args.workers <= 1:
+        run_worker(0, args.node_id, clustered)
+    else:
+        if sys.platform == 'win32':
+            sys.exit("--workers > 1 butuh SO_REUSEPORT (Linux)")
+        logger.info(f"--- SPAWNING {args.workers} OCPP WORKERS ({args.node_id}) ---")
+        procs = [
+            multiprocessing.Process(target=run_worker, args=(i, args.node_id, True), name=f"ocpp-w{i}")
+            for i in range(args.workers)
+        ]
+        for p in procs: p.start()
+        try:
+            for p in procs: p.join()
+        except KeyboardInterrupt:
+            for p in procs: p.terminate()
@@ -0,0 +1,217 @@
+# backend/query_stats.py
+# Instrumentasi semua query DB: client dari database.get_client() /
+# get_async_client() dibungkus proxy yang mencatat latency, jumlah baris dan
+# byte payload per (tabel, operasi, call site). Query di atas DB_SLOW_QUERY_MS
+# di-log; top offender dilihat lewat endpoint (API, OCPP server) atau dump JSON.
+import os
+import sys
+import json
+import time
+import logging
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("UNIEV")
+
+OPS = ("select", "insert", "update", "upsert", "delete", "rpc")
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def payload_size(data):
+    """Perkiraan byte JSON data (request atau response)."""
+    if data is None:
+        return 0
+    try:
+        if orjson is not None:
+            return len(orjson.dumps(data, default=str))
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def call_site(skip_files=()):
+    """'file.py:line func' pemanggil pertama di luar modul DB."""
+    f = sys._getframe(2)
+    while f is not None:
+        path = f.f_code.co_filename
+        if path != _THIS_FILE and os.path.basename(path) not in skip_files:
+            return f"{os.path.basename(path)}:{f.f_lineno} {f.f_code.co_name}"
+        f = f.f_back
+    return "unknown"
+
+
+class QueryStats:
+    """Agregat per (tabel, operasi, call site): count, total/max detik, baris, byte, error, slow."""
+
+    def __init__(self, slow_ms=500.0, skip_files=("database.py", "local_db.py")):
+        self.slow_s = slow_ms / 1000.0
+        self.skip_files = tuple(skip_files)
+        self._rows = {}         # (table, op, site) -> [count, total_s, max_s, rows, bytes_in, bytes_out, errors, slow]
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def site(self):
+        return call_site(self.skip_files)
+
+    def record(self, table, op, site, elapsed, rows=0, bytes_in=0, bytes_out=0, error=None):
+        key = (table, op, site)
+        slow = elapsed >= self.slow_s
+        with self._lock:
+            r = self._rows.get(key)
+            if r is None:
+                r = self._rows[key] = [0, 0.0, 0.0, 0, 0, 0, 0, 0]
+            r[0] += 1
+            r[1] += elapsed
+            if elapsed > r[2]:
+                r[2] = elapsed
+            r[3] += rows
+            r[4] += bytes_in
+            r[5] += bytes_out
+            r[6] += 1 if error is not None else 0
+            r[7] += 1 if slow else 0
+        if slow:
+            logger.warning(f"🐢 SLOW QUERY {elapsed * 1000:.0f}ms {op} {table} rows={rows} "
+                           f"bytes={bytes_in + bytes_out} at {site}" + (f" error={error}" if error else ""))
+
+    def _entry(self, key, r):
+        table, op, site = key
+        return {
+            "table": table, "op": op, "site": site,
+            "count": r[0], "total_ms": round(r[1] * 1000, 2), "avg_ms": round(r[1] / r[0] * 1000, 2),
+            "max_ms": round(r[2] * 1000, 2), "rows": r[3], "bytes_in": r[4], "bytes_out": r[5],
+            "errors": r[6], "slow": r[7],
+        }
+
+    def top(self, limit=20, by="total_ms"):
+        """Offender teratas; by = total_ms | avg_ms | max_ms | count | rows | bytes_in | bytes_out | errors | slow."""
+        with self._lock:
+            rows = [self._entry(k, r) for k, r in self._rows.items()]
+        rows.sort(key=lambda e: e.get(by, 0), reverse=True)
+        return rows[:limit]
+
+    def by_table(self):
+        """{(table, op): [count, total_s, rows, bytes]} untuk metrik."""
+        out = {}
+        with self._lock:
+            for (table, op, _), r in self._rows.items():
+                t = out.setdefault((table, op), [0, 0.0, 0, 0])
+                t[0] += r[0]
+                t[1] += r[1]
+                t[2] += r[3]
+                t[3] += r[4] + r[5]
+        return out
+
+    def summary(self, limit=20, by="total_ms"):
+        with self._lock:
+            count = sum(r[0] for r in self._rows.values())
+            total = sum(r[1] for r in self._rows.values())
+            slow = sum(r[7] for r in self._rows.values())
+            errors = sum(r[6] for r in self._rows.values())
+        return {
+            "since": self.started_at, "queries": count, "total_ms": round(total * 1000, 2),
+            "slow_threshold_ms": round(self.slow_s * 1000, 1), "slow": slow, "errors": errors,
+            "top": self.top(limit, by),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._rows.clear()
+            self.started_at = time.time()
+
+    def dump(self, path, limit=100):
+        """Tulis ringkasan ke file JSON (mis. saat proses Streamlit berhenti)."""
+        data = dict(self.summary(limit), pid=os.getpid(), argv=sys.argv[:2])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        return path
+
+
+def _result_rows(res):
+    data = getattr(res, "data", None)
+    if isinstance(data, list):
+        return len(data), data
+    return (1 if data else 0), data
+
+
+class TimedQuery:
+    """Proxy request builder: meneruskan chaining, mengukur execute()."""
+    __slots__ = ("_query", "_stats", "_table", "_op", "_sent")
+
+    def __init__(self, query, stats, table, op="select", sent=None):
+        self._query = query
+        self._stats = stats
+        self._table = table
+        self._op = op
+        self._sent = sent
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def chain(*args, **kwargs):
+            op, sent = self._op, self._sent
+            if name in OPS:
+                op = name
+                if name in ("insert", "update", "upsert") and args:
+                    sent = args[0]
+            return type(self)(attr(*args, **kwargs), self._stats, self._table, op, sent)
+        return chain
+
+    def _finish(self, site, start, res=None, error=None):
+        elapsed = time.perf_counter() - start
+        rows, data = _result_rows(res) if res is not None else (0, None)
+        self._stats.record(self._table, self._op, site, elapsed, rows,
+                           bytes_in=payload_size(data), bytes_out=payload_size(self._sent), error=error)
+
+    def execute(self):
+        site = self._stats.site()
+        start = time.perf_counter()
+        try:
+            res = self._query.execute()
+        except Exception as e:
+            self._finish(site, start, error=type(e).__name__)
+            raise
+        self._finish(site, start, res)
+        return res
+
+
+class TimedAsyncQuery(TimedQuery):
+    __slots__ = ()
+
+    def execute(self):
+        # call site diambil saat execute() dipanggil, bukan saat coroutine berjalan
+        return self._run(self._stats.site())
+
+    async def _run(self, site):
+        start = time.perf_counter()
+        try:
+            res = await self._query.execute()
+        except Exception as e:
+            self._finish(site, start, error=type(e).__name__)
+            raise
+        self._finish(site, start, res)
+        return res
+
+
+class InstrumentedClient:
+    """Bungkus client supabase / lokal / async; atribut lain diteruskan apa adanya."""
+
+    def __init__(self, client, stats, is_async=False):
+        self._client = client
+        self._stats = stats
+        self._query_cls = TimedAsyncQuery if is_async else TimedQuery
+
+    def table(self, name):
+        return self._query_cls(self._client.table(name), self._stats, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,90 @@
+# backend/rate_limit.py
+# Token bucket per charger untuk pesan OCPP masuk. Charger rusak yang mengirim
+# MeterValues terus-menerus dibatasi tanpa mengganggu charger lain.
+import time
+import threading
+
+
+class ChargerRateLimiter:
+    """
+    limits: {action: (rate_per_s, burst)}; hanya action di sini yang dibatasi.
+    charger_limit: (rate_per_s, burst) total semua action terbatas per charger.
+
+    allow() O(1): satu bucket per (charger, action) + satu bucket total per charger,
+    dikelompokkan per charger sehingga forget() juga O(1). Hitungan throttle
+    disimpan per charger (tetap ada setelah disconnect) agar hardware yang
+    berisik bisa dicari lewat top().
+    """
+
+    def __init__(self, limits=None, charger_limit=None, clock=time.monotonic):
+        self.limits = dict(limits or {})
+        self.charger_limit = charger_limit
+        self._clock = clock
+        self._buckets = {}      # charger_id -> {action|None: [tokens, last]}
+        self._throttled = {}    # charger_id -> {action: n}
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    def limited(self, action):
+        return action in self.limits
+
+    @staticmethod
+    def _take(buckets, key, rate, burst, now):
+        b = buckets.get(key)
+        if b is None:
+            b = buckets[key] = [float(burst), now]
+        else:
+            b[0] = min(burst, b[0] + (now - b[1]) * rate)
+            b[1] = now
+        if b[0] >= 1.0:
+            b[0] -= 1.0
+            return True
+        return False
+
+    def allow(self, charger_id, action):
+        limit = self.limits.get(action)
+        if limit is None:
+            return True
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets.get(charger_id)
+            if buckets is None:
+                buckets = self._buckets[charger_id] = {}
+            ok = self._take(buckets, action, limit[0], limit[1], now)
+            if ok and self.charger_limit:
+                ok = self._take(buckets, None, self.charger_limit[0], self.charger_limit[1], now)
+                if not ok:
+                    buckets[action][0] += 1.0   # kembalikan token action
+            if ok:
+                self.allowed += 1
+            else:
+                self.throttled += 1
+                per = self._throttled.setdefault(charger_id, {})
+                per[action] = per.get(action, 0) + 1
+            return ok
+
+    def forget(self, charger_id):
+        """Buang bucket charger yang disconnect (hitungan throttle tetap disimpan)."""
+        with self._lock:
+            self._buckets.pop(charger_id, None)
+
+    def counts(self, limit=20):
+        """{(charger_id, action): n} untuk metrik; hanya `limit` charger paling berisik (label terbatas)."""
+        return {(r["charger_id"], a): n for r in self.top(limit) for a, n in r["by_action"].items()}
+
+    def top(self, limit=20):
+        with self._lock:
+            rows = [{"charger_id": cid, "throttled": sum(per.values()), "by_action": dict(per)}
+                    for cid, per in self._throttled.items()]
+        rows.sort(key=lambda r: r["throttled"], reverse=True)
+        return rows[:limit]
+
+    def stats(self):
+        return {
+            "limits": {a: list(v) for a, v in self.limits.items()},
+            "charger_limit": list(self.charger_limit) if self.charger_limit else None,
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+            "noisy_chargers": len(self._throttled),
+        }
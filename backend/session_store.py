@@ -0,0 +1,319 @@
+# backend/session_store.py
+# Sesi charging aktif di memori OCPP server + allocator transaction_id.
+# StartTransaction mencatat id_tag, meter_start, waktu mulai dan connector;
+# StopTransaction menghitung energi = meter_stop - meter_start tanpa baca DB.
+# Sesi aktif di-snapshot berkala ke file agar selamat dari restart.
+import os
+import json
+import time
+import math
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("OCPP")
+
+# transactionId OCPP 1.6 = integer; banyak firmware charger menyimpannya sebagai int32
+TX_ID_MAX = 2 ** 31 - 1
+
+
+class TransactionIdAllocator:
+    """
+    Id monotonic tanpa tabrakan: id = seq * stride + slot (slot = index worker).
+    High-water mark seq dipersist per blok (fsync) sebelum dipakai, jadi setelah
+    crash allocator melanjutkan dari blok berikutnya (sisa blok lama dilewati).
+    open(floor_id) melanjutkan di atas id terbesar yang pernah terbit (snapshot,
+    journal, DB) walau file hwm hilang atau basi. Tanpa hwm maupun floor, seq
+    mulai dari waktu sekarang agar di atas id lama (dulu transaction_id = unix
+    timestamp). path None = tanpa persistensi.
+    """
+
+    def __init__(self, path, slot=0, stride=1, block=100, low_water=0):
+        if not 0 <= slot < stride:
+            raise ValueError(f"slot {slot} must be in [0, {stride})")
+        self.path = path
+        self.slot = slot
+        self.stride = stride
+        self.block = block
+        self.low_water = low_water
+        self._next = None
+        self._reserved = 0
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.exhausted = False
+        self.has_hwm = False
+
+    def open(self, floor_id=None):
+        """floor_id: id terbesar yang diketahui sudah terbit. OverflowError bila int32 sudah habis."""
+        try:
+            with open(self.path) as f:
+                hwm = int(f.read().strip())
+        except (TypeError, FileNotFoundError, ValueError):
+            hwm = None
+        self.has_hwm = hwm is not None
+        seeds = [hwm] if hwm is not None else []
+        if floor_id is not None:
+            seeds.append(int(floor_id) // self.stride + 1)
+        self._next = max(seeds) if seeds else math.ceil(time.time() / self.stride)
+        if hwm is not None and self._next > hwm:
+            logger.warning(f"⚠️ TX IDS: hwm {hwm} below issued id {floor_id}; continuing from seq {self._next}")
+        left = self.ids_left()
+        if left <= 0:
+            raise OverflowError(f"transaction ids exhausted (next {self._id(self._next)} > int32); "
+                                f"reset {self.path} or lower TX_ID_STRIDE")
+        if left < self.low_water:
+            logger.error(f"❌ TX IDS: only {left} transaction ids left before int32 overflow")
+        self._reserve()
+        return self
+
+    def raise_floor(self, floor_id):
+        """
+        Naikkan seq di atas floor_id yang diketahui belakangan (mis. max id di DB,
+        dibaca di background setelah start). Tidak pernah menurunkan seq.
+        """
+        with self._lock:
+            if self._next is None:
+                self.open(floor_id)
+                return
+            seq = int(floor_id) // self.stride + 1
+            if seq <= self._next:
+                return
+            logger.warning(f"⚠️ TX IDS: issued id {floor_id} above local seq {self._next}; continuing from seq {seq}")
+            self._next = seq
+            self._reserve()
+            if self.ids_left() <= 0 and not self.exhausted:
+                self.exhausted = True
+                logger.critical(f"🚨 TX IDS exhausted: {self._id(self._next)} exceeds int32; reset {self.path}")
+
+    def _id(self, seq):
+        return seq * self.stride + self.slot
+
+    def ids_left(self):
+        if self._next is None:
+            return None
+        return max(0, (TX_ID_MAX - self.slot) // self.stride - self._next + 1)
+
+    def _reserve(self):
+        self._reserved = self._next + self.block
+        if self.path is None:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(self._reserved))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def allocate(self):
+        """Id berikutnya; None bila ruang int32 habis (exhausted, dilaporkan di stats/metrics)."""
+        with self._lock:
+            if self._next is None:
+                self.open()
+            if self._id(self._next) > TX_ID_MAX:
+                if not self.exhausted:
+                    self.exhausted = True
+                    logger.critical(f"🚨 TX IDS exhausted: {self._id(self._next)} exceeds int32; reset {self.path}")
+                return None
+            if self._next >= self._reserved:
+                self._reserve()
+            seq = self._next
+            self._next += 1
+            self.issued += 1
+        return self._id(seq)
+
+    def stats(self):
+        if self._next is None:
+            return {"slot": self.slot, "stride": self.stride, "issued": 0}
+        return {
+            "slot": self.slot, "stride": self.stride, "issued": self.issued,
+            "last_id": self._id(self._next - 1), "reserved_until": self._reserved * self.stride,
+            "ids_left": self.ids_left(), "exhausted": self.exhausted,
+        }
+
+
+class Session:
+    __slots__ = ("transaction_id", "charger_id", "connector_id", "id_tag",
+                 "meter_start", "started_at", "opened_at")
+
+    def __init__(self, transaction_id, charger_id, connector_id=None, id_tag=None,
+                 meter_start=None, started_at=None, opened_at=None):
+        self.transaction_id = transaction_id
+        self.charger_id = charger_id
+        self.connector_id = connector_id
+        self.id_tag = id_tag
+        self.meter_start = meter_start
+        self.started_at = started_at            # timestamp dari charger
+        self.opened_at = opened_at or time.time()   # waktu server menerima StartTransaction
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def energy_wh(self, meter_stop):
+        """Wh tersalur; None bila meter_start tidak diketahui."""
+        if self.meter_start is None or meter_stop is None:
+            return None
+        return float(meter_stop) - float(self.meter_start)
+
+
+class SessionStore:
+    """directory None = hanya di memori (tanpa snapshot), mis. handler dipakai di luar main()."""
+
+    def __init__(self, directory=None, slot=0, stride=1, id_block=100, id_low_water=0, stopped_memory=10000):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, "sessions.snapshot") if directory else None
+        self.ids = TransactionIdAllocator(os.path.join(directory, "txid.hwm") if directory else None,
+                                          slot, stride, id_block, id_low_water)
+        self._sessions = {}         # transaction_id -> Session
+        self._by_charger = {}       # charger_id -> {transaction_id}
+        # Tombstone sesi yang baru di-stop: StopTransaction yang dikirim ulang charger
+        # (response hilang) tidak boleh ditagih ulang sebagai sesi tidak dikenal
+        self._stopped = OrderedDict()   # transaction_id -> charger_id
+        self.stopped_memory = stopped_memory
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.started = 0
+        self.stopped = 0
+        self.unknown_stops = 0
+        self.duplicate_stops = 0
+        self.recovered = 0
+        self.last_snapshot = None
+        self.last_snapshot_ms = 0.0
+
+    def open(self, floor_id=None):
+        """floor_id: id terbesar yang terbit di luar store ini (DB, journal transaksi)."""
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            try:
+                with open(self.snapshot_path) as f:
+                    rows = json.load(f)
+                for row in rows:
+                    self._add(Session(**row))
+            except FileNotFoundError:
+                pass
+            except (ValueError, TypeError) as e:
+                logger.error(f"❌ SESSION SNAPSHOT unreadable ({e}); starting empty")
+        known = [t for t in self._sessions if isinstance(t, int)]
+        if floor_id is not None:
+            known.append(int(floor_id))
+        self.ids.open(max(known) if known else None)
+        self.recovered = len(self._sessions)
+        if self.recovered:
+            logger.warning(f"♻️ SESSIONS: restored {self.recovered} active session(s) from snapshot")
+        return self
+
+    def _add(self, s):
+        self._sessions[s.transaction_id] = s
+        self._by_charger.setdefault(s.charger_id, set()).add(s.transaction_id)
+
+    def _remove(self, tid):
+        s = self._sessions.pop(tid, None)
+        if s is not None:
+            tids = self._by_charger.get(s.charger_id)
+            tids.discard(tid)
+            if not tids:
+                del self._by_charger[s.charger_id]
+        return s
+
+    def start(self, charger_id, connector_id=None, id_tag=None, meter_start=None, started_at=None):
+        """Sesi baru; None bila transaction id habis (lihat TransactionIdAllocator.allocate)."""
+        tid = self.ids.allocate()
+        if tid is None:
+            return None
+        s = Session(tid, charger_id, connector_id, id_tag, meter_start, started_at)
+        with self._lock:
+            self._add(s)
+            self._dirty = True
+            self.started += 1
+        return s
+
+    @staticmethod
+    def _tid(transaction_id):
+        try:
+            return int(transaction_id)
+        except (TypeError, ValueError):
+            return transaction_id
+
+    def stop(self, transaction_id):
+        """Keluarkan sesi; None bila tidak dikenal (mis. dimulai sebelum snapshot terakhir)."""
+        tid = self._tid(transaction_id)
+        with self._lock:
+            s = self._remove(tid)
+            if s is None:
+                self.unknown_stops += 1
+            else:
+                self._dirty = True
+                self.stopped += 1
+                self._stopped[tid] = s.charger_id
+                while len(self._stopped) > self.stopped_memory:
+                    self._stopped.popitem(last=False)
+        return s
+
+    def is_duplicate_stop(self, transaction_id, charger_id=None):
+        """True bila transaksi ini baru saja di-stop (StopTransaction dikirim ulang)."""
+        tid = self._tid(transaction_id)
+        with self._lock:
+            if tid not in self._stopped or (charger_id is not None and self._stopped[tid] != charger_id):
+                return False
+            self.duplicate_stops += 1
+            return True
+
+    def get(self, transaction_id):
+        return self._sessions.get(transaction_id)
+
+    def active(self, charger_id=None):
+        with self._lock:
+            if charger_id is None:
+                return list(self._sessions.values())
+            return [self._sessions[t] for t in self._by_charger.get(charger_id, ())]
+
+    def latest_for(self, charger_id):
+        rows = self.active(charger_id)
+        return max(rows, key=lambda s: s.opened_at) if rows else None
+
+    def prune(self, max_age):
+        """Buang sesi yang tidak pernah di-stop (charger hilang) setelah max_age detik."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            stale = [tid for tid, s in self._sessions.items() if s.opened_at < cutoff]
+            for tid in stale:
+                self._remove(tid)
+            if stale:
+                self._dirty = True
+        return stale
+
+    def snapshot(self, force=False):
+        """Tulis sesi aktif (atomic: tmp + fsync + rename). Dipanggil dari thread, bukan event loop."""
+        if not self.snapshot_path:
+            return False
+        with self._lock:
+            if not self._dirty and not force:
+                return False
+            rows = [s.to_dict() for s in self._sessions.values()]
+            self._dirty = False
+        start = time.perf_counter()
+        tmp = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(rows, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+        except OSError:
+            self._dirty = True
+            raise
+        self.last_snapshot = time.time()
+        self.last_snapshot_ms = round((time.perf_counter() - start) * 1000, 2)
+        return True
+
+    def stats(self):
+        return {
+            "active": len(self._sessions),
+            "started": self.started,
+            "stopped": self.stopped,
+            "unknown_stops": self.unknown_stops,
+            "duplicate_stops": self.duplicate_stops,
+            "recovered_on_start": self.recovered,
+            "last_snapshot_age_s": round(time.time() - self.last_snapshot, 1) if self.last_snapshot else None,
+            "last_snapshot_ms": self.last_snapshot_ms,
+            "ids": self.ids.stats(),
+        }
@@ -0,0 +1,25 @@
+-- backend/sql/charging_commands_results.sql
+-- Migrasi Supabase untuk hasil eksekusi perintah remote (CommandExecutor):
+-- kolom rtt_ms / responded_at dan status terminal baru. Jalankan sekali di
+-- SQL editor Supabase sebelum / sesudah deploy OCPP server.
+--
+-- Status charging_commands yang ditulis OCPP server:
+--   PENDING   baris baru dari API (tidak berubah)
+--   ACCEPTED  charger menjawab Accepted
+--   REJECTED  charger menjawab Rejected / error
+--   TIMEOUT   charger tidak menjawab dalam COMMAND_TIMEOUT_SECONDS
+--   EXPIRED   charger offline lebih lama dari COMMAND_TTL_SECONDS
+--   DUPLICATE perintah sama untuk charger yang sama masih menunggu
+--   UNSUPPORTED action belum punya mapping OCPP di server
+--   EXECUTED  status lama; dipakai OCPP server bila skema belum dimigrasi
+
+alter table charging_commands add column if not exists rtt_ms double precision;
+alter table charging_commands add column if not exists responded_at timestamp;
+
+-- Bila kolom status memakai check constraint, perluas daftar nilainya, mis.:
+-- alter table charging_commands drop constraint if exists charging_commands_status_check;
+-- alter table charging_commands add constraint charging_commands_status_check
+--     check (status in ('PENDING', 'EXECUTED', 'ACCEPTED', 'REJECTED', 'TIMEOUT', 'EXPIRED', 'DUPLICATE', 'UNSUPPORTED'));
+
+-- Rekonsiliasi OCPP server hanya membaca baris PENDING
+create index if not exists idx_charging_commands_status on charging_commands (status);
@@ -0,0 +1,203 @@
+# backend/tests/boot_storm.py
+# Skenario reconnect storm: seluruh armada boot bersamaan, ukur berapa lama
+# sampai semua charger Accepted lagi dan seberapa rata heartbeat sesudahnya.
+#
+#   python backend/tests/boot_storm.py --chargers 2000 --spawn-server --out storm.json
+#   python backend/tests/boot_storm.py --chargers 500 --url ws://localhost:9000   (server sudah jalan)
+#
+# --spawn-server: jalankan backend/ocpp_server.py sendiri, tunggu armada
+# terhubung, lalu restart server dan ukur konvergensi setelah restart.
+# Tanpa flag itu yang diukur adalah storm saat armada connect serempak.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from simfleet import Fleet, SCENARIOS  # noqa: E402
+from backend.ocpp_bridge import control_headers  # noqa: E402
+
+logger = logging.getLogger("STORM")
+
+# Tanpa sesi charging: semua charger idle dan hanya mengirim heartbeat
+IDLE_SCENARIO = {**SCENARIOS["uniform"], "first_arrival_s": [1e12, 1e12 + 1]}
+
+
+class StormFleet(Fleet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hb_times = []
+
+    def record(self, action, dt):
+        super().record(action, dt)
+        if action == "Heartbeat":
+            self.hb_times.append(time.monotonic())
+
+
+def _control_get(url, path):
+    try:
+        req = urllib.request.Request(url + path, headers=control_headers())
+        with urllib.request.urlopen(req, timeout=2) as resp:
+            return json.loads(resp.read())
+    except Exception:
+        return None
+
+
+class ServerProcess:
+    def __init__(self, control_url):
+        self.control_url = control_url
+        self.proc = None
+
+    async def start(self, timeout=30):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT_DIR, "backend", "ocpp_server.py")],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if _control_get(self.control_url, "/db/stats") is not None:
+                return
+            await asyncio.sleep(0.1)
+        raise RuntimeError("OCPP server did not start")
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+async def wait_converged(fleet, since, timeout):
+    """Detik sejak `since` sampai semua charger Accepted setelah `since` (None = timeout)."""
+    deadline = time.monotonic() + timeout
+    curve = []
+    while time.monotonic() < deadline:
+        ok = int(((fleet.accepted_at > since) & fleet.connected).sum())
+        curve.append((round(time.monotonic() - since, 2), ok))
+        if ok == fleet.n:
+            return round(fleet.accepted_at.max() - since, 2), curve
+        await asyncio.sleep(0.1)
+    return None, curve
+
+
+def heartbeat_spread(times, start, end):
+    """Heartbeat per detik dalam [start, end): peak vs mean (1.0 = rata sempurna)."""
+    if end - start < 1:
+        return {}
+    per_sec = np.bincount(np.floor(np.array([t - start for t in times if start <= t < end])).astype(int),
+                          minlength=int(end - start))[:int(end - start)]
+    mean = float(per_sec.mean()) if len(per_sec) else 0.0
+    return {
+        "heartbeats": int(per_sec.sum()),
+        "per_second_mean": round(mean, 2),
+        "per_second_peak": int(per_sec.max()) if len(per_sec) else 0,
+        "peak_to_mean": round(float(per_sec.max()) / mean, 2) if mean else None,
+    }
+
+
+def _milestones(curve, n):
+    out = {}
+    for pct in (50, 90, 99, 100):
+        need = int(np.ceil(n * pct / 100))
+        hit = next((t for t, ok in curve if ok >= need), None)
+        out[f"p{pct}_s"] = hit
+    return out
+
+
+async def run(args):
+    control_url = args.control_url
+    server = ServerProcess(control_url) if args.spawn_server else None
+    if server:
+        await server.start()
+
+    fleet = StormFleet(args.url, args.chargers, IDLE_SCENARIO, prefix=args.prefix, connect_rate=args.chargers)
+    ticker_stop = asyncio.Event()
+
+    async def ticker():
+        tick_no = 0
+        while not ticker_stop.is_set():
+            fleet.step(tick_no)
+            tick_no += 1
+            await asyncio.sleep(fleet.tick)
+
+    result = {"chargers": args.chargers, "spawned_server": bool(server)}
+    t0 = time.monotonic()
+    tasks = [asyncio.create_task(fleet._connection(i)) for i in range(args.chargers)]
+    tick_task = asyncio.create_task(ticker())
+    try:
+        initial, curve = await wait_converged(fleet, t0, args.timeout)
+        result["initial_converge_s"] = initial
+        result["initial"] = _milestones(curve, fleet.n)
+        logger.info(f"initial connect: {initial}s ({result['initial']})")
+
+        if server:
+            await asyncio.sleep(args.warmup)
+            pending_before = fleet.boot_pending
+            logger.info("restarting OCPP server ...")
+            restart_at = time.monotonic()
+            server.stop()
+            await server.start()
+            converge, curve = await wait_converged(fleet, restart_at, args.timeout)
+            result["restart_converge_s"] = converge
+            result["restart"] = _milestones(curve, fleet.n)
+            result["restart_boot_pending"] = fleet.boot_pending - pending_before
+            logger.info(f"after restart: {converge}s ({result['restart']})")
+
+        settle_start = time.monotonic()
+        await asyncio.sleep(args.settle)
+        result["heartbeat_spread"] = heartbeat_spread(fleet.hb_times, settle_start, time.monotonic())
+        intervals = fleet.hb_interval[fleet.connected]
+        result["heartbeat_interval_s"] = {
+            "min": float(intervals.min()) if len(intervals) else None,
+            "max": float(intervals.max()) if len(intervals) else None,
+            "distinct": int(len(np.unique(intervals))),
+        }
+        result["boot_pending_total"] = fleet.boot_pending
+        result["server_boot_stats"] = _control_get(control_url, "/boot/stats")
+        result["boot_latency_ms"] = fleet.summary()["latency_ms"].get("BootNotification")
+    finally:
+        ticker_stop.set()
+        for t in tasks + [tick_task]:
+            t.cancel()
+        await asyncio.gather(*tasks, tick_task, return_exceptions=True)
+        if server:
+            server.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UNIEV reconnect storm benchmark")
+    parser.add_argument("--url", default="ws://localhost:9000")
+    parser.add_argument("--control-url", default="http://127.0.0.1:9100")
+    parser.add_argument("--chargers", type=int, default=1000)
+    parser.add_argument("--prefix", default="STORM")
+    parser.add_argument("--spawn-server", action="store_true", help="Jalankan + restart ocpp_server.py sendiri")
+    parser.add_argument("--warmup", type=float, default=5, help="Detik stabil sebelum restart")
+    parser.add_argument("--settle", type=float, default=60, help="Detik pengukuran sebaran heartbeat")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--out", help="Simpan hasil ke JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [STORM] %(message)s', stream=sys.stdout)
+    logging.getLogger("ocpp").setLevel(logging.WARNING)
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# backend/tests/decode_bench.py
+# CPU per pesan OCPP masuk untuk tiap OCPP_DECODE_MODE (strict / fast / sampled).
+#
+#   python backend/tests/decode_bench.py --messages 20000 --out decode.json
+#
+# Dua pengukuran per mode, CPU thread event loop (time.thread_time):
+#   decode   : unpack + validasi schema saja (tanpa handler)
+#   pipeline : ChargePointHandler.route_message penuh (decode, handler, response)
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.tests.handler_bench import FakeDB, frame_for, message_plan  # noqa: E402
+
+
+class SinkWebSocket:
+    """Koneksi palsu: response dibuang, tidak ada I/O."""
+
+    def __init__(self, charger_id):
+        self.path = f"/{charger_id}"
+        self.sent = 0
+        self.last = None
+
+    async def send(self, msg):
+        self.sent += 1
+        self.last = msg
+
+    async def recv(self):
+        await asyncio.Event().wait()
+
+
+def build_frames(n, chargers):
+    """
+    Frame OCPP-J mentah: campuran Boot/Status/MeterValues/Heartbeat/Stop, dibagi
+    ke beberapa charger. transactionId di sini placeholder (cukup untuk decode);
+    pipeline menggantinya dengan id dari response StartTransaction.
+    """
+    per = max(2, n // chargers)
+    frames = []
+    for c in range(chargers):
+        cid = f"DEC-{c:04d}"
+        for i, action in enumerate(message_plan(per)):
+            frames.append((cid, action, json.dumps([2, str(uuid.uuid4()), action, frame_for(action, i)])))
+    return frames
+
+
+def decode_only(frames, decoder):
+    from ocpp.messages import unpack, validate_payload
+    from backend.ocpp_codec import unpack as fast_unpack
+
+    start = time.thread_time()
+    if decoder.library_path:
+        for _, _, raw in frames:
+            validate_payload(unpack(raw), "1.6")
+    else:
+        for cid, _, raw in frames:
+            decoder.validate(cid, fast_unpack(raw))
+    return time.thread_time() - start
+
+
+def with_tx_id(raw, tx_id):
+    msg = json.loads(raw)
+    msg[3]["transactionId"] = tx_id
+    return json.dumps(msg)
+
+
+async def pipeline(srv, frames):
+    handlers = {}
+    tx_ids = {}     # charger -> transactionId dari response StartTransaction
+    per_action = {}
+    total = 0.0
+    for cid, action, raw in frames:
+        h = handlers.get(cid)
+        if h is None:
+            h = handlers[cid] = srv.ChargePointHandler(cid, SinkWebSocket(cid))
+        if action in ("MeterValues", "StopTransaction") and cid in tx_ids:
+            raw = with_tx_id(raw, tx_ids[cid])
+        t0 = time.thread_time()
+        await h.route_message(raw)
+        dt = time.thread_time() - t0
+        if action == "StartTransaction":
+            tx_ids[cid] = json.loads(h._connection.last)[2]["transactionId"]
+        total += dt
+        row = per_action.setdefault(action, [0, 0.0])
+        row[0] += 1
+        row[1] += dt
+    sent = sum(h._connection.sent for h in handlers.values())
+    return total, per_action, sent
+
+
+async def run(args):
+    from backend import ocpp_server as srv
+    from backend.ocpp_codec import OcppDecoder, orjson
+
+    srv.supabase_client = FakeDB()
+    srv.rate_limiter.limits = {}        # ukur decode, bukan throttle
+    frames = build_frames(args.messages, args.chargers)
+    n = len(frames)
+    result = {"messages": n, "chargers": args.chargers, "orjson": orjson is not None, "modes": {}}
+
+    modes = [("strict", ()), ("fast", ()), ("sampled", ("*",))]
+    for mode, trusted in modes:
+        srv.decoder = OcppDecoder(mode=mode, sample_every=args.sample_every, trusted=trusted)
+        decode_only(frames[:200], srv.decoder)      # warm-up: isi cache validator
+        srv.decoder = OcppDecoder(mode=mode, sample_every=args.sample_every, trusted=trusted)
+        dec = min(decode_only(frames, srv.decoder) for _ in range(args.repeat))
+
+        srv.decoder = OcppDecoder(mode=mode, sample_every=args.sample_every, trusted=trusted)
+        total, per_action, sent = await pipeline(srv, frames)
+        result["modes"][mode] = {
+            "decode_us_per_msg": round(dec / n * 1e6, 2),
+            "pipeline_us_per_msg": round(total / n * 1e6, 2),
+            "per_action_us": {a: round(t / c * 1e6, 2) for a, (c, t) in sorted(per_action.items())},
+            "responses": sent,
+            "decoder": {k: v for k, v in srv.decoder.stats().items() if k in ("validated", "skipped", "failed")},
+        }
+
+    base = result["modes"]["strict"]
+    for mode, row in result["modes"].items():
+        row["decode_speedup"] = round(base["decode_us_per_msg"] / row["decode_us_per_msg"], 2)
+        row["pipeline_speedup"] = round(base["pipeline_us_per_msg"] / row["pipeline_us_per_msg"], 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UNIEV OCPP decode benchmark")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--chargers", type=int, default=50)
+    parser.add_argument("--sample-every", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="Ulangi decode-only, ambil yang tercepat")
+    parser.add_argument("--out", help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    result = asyncio.run(run(args))
+    print(f"{'mode':<10}{'decode us/msg':>15}{'pipeline us/msg':>17}{'speedup':>10}")
+    for mode, row in result["modes"].items():
+        print(f"{mode:<10}{row['decode_us_per_msg']:>15}{row['pipeline_us_per_msg']:>17}{row['pipeline_speedup']:>10}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"saved -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
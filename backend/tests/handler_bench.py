@@ -0,0 +1,306 @@
+# backend/tests/handler_bench.py
+# Benchmark in-process ChargePointHandler (tanpa jaringan, tanpa Supabase).
+#
+#   python backend/tests/handler_bench.py --chargers 200 --messages 50 --db-latency-ms 20 --out bench.json
+#   python backend/tests/handler_bench.py --compare bench.json
+#
+# Tiap "charger" adalah FakeWebSocket in-memory yang mengirim frame OCPP-J
+# satu per satu (menunggu CALLRESULT seperti charger asli). FakeDB meniru
+# query builder supabase dan bisa diberi latency per execute().
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+# --- FAKE DB ---
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data)
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = "select"
+
+    def _op(self, op, *args, **kwargs):
+        self.op = op
+        return self
+
+    def select(self, *a, **k): return self._op("select")
+    def insert(self, *a, **k): return self._op("insert")
+    def update(self, *a, **k): return self._op("update")
+    def upsert(self, *a, **k): return self._op("upsert")
+    def delete(self, *a, **k): return self._op("delete")
+    def eq(self, *a, **k): return self
+    def neq(self, *a, **k): return self
+    def in_(self, *a, **k): return self
+    def gt(self, *a, **k): return self
+    def order(self, *a, **k): return self
+    def limit(self, *a, **k): return self
+
+    def execute(self):
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        with self.db.lock:
+            key = f"{self.table}.{self.op}"
+            self.db.calls[key] = self.db.calls.get(key, 0) + 1
+        return FakeResult([])
+
+
+class FakeDB:
+    """Pengganti supabase client: hitung query per table.op dan tambahkan latency."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+# --- FAKE WEBSOCKET ---
+class FakeWebSocket:
+    """Sisi server dari koneksi charger; driver menulis frame ke inbox dan menunggu response."""
+
+    def __init__(self, charger_id):
+        self.path = f"/{charger_id}"
+        self.inbox = asyncio.Queue()
+        self.waiters = {}
+        self.recv_at = {}
+        self.handler_latency = []
+
+    async def recv(self):
+        msg = await self.inbox.get()
+        self.recv_at[json.loads(msg)[1]] = time.perf_counter()
+        return msg
+
+    async def send(self, msg):
+        frame = json.loads(msg)
+        mid = frame[1]
+        start = self.recv_at.pop(mid, None)
+        if start is not None:
+            self.handler_latency.append(time.perf_counter() - start)
+        fut = self.waiters.pop(mid, None)
+        if fut is not None and not fut.done():
+            fut.set_result(frame)
+
+    async def request(self, action, payload):
+        mid = str(uuid.uuid4())
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters[mid] = fut
+        await self.inbox.put(json.dumps([2, mid, action, payload]))
+        return await fut
+
+    async def close(self, *a, **k):
+        pass
+
+
+# --- MESSAGE MIX ---
+def frame_for(action, i, tx_id=1):
+    now = datetime.utcnow().isoformat() + "Z"
+    if action == "BootNotification":
+        return {"chargePointVendor": "BENCH", "chargePointModel": "Bench-1"}
+    if action == "Heartbeat":
+        return {}
+    if action == "StatusNotification":
+        return {"connectorId": 1, "errorCode": "NoError", "status": "Charging"}
+    if action == "StartTransaction":
+        return {"connectorId": 1, "idTag": "BENCH", "meterStart": 1000, "timestamp": now}
+    if action == "MeterValues":
+        return {"connectorId": 1, "transactionId": tx_id, "meterValue": [{"timestamp": now, "sampledValue": [
+            {"value": str(1000 + i * 10), "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+            {"value": "7200", "measurand": "Power.Active.Import", "unit": "W"},
+            {"value": str(20 + i % 80), "measurand": "SoC", "unit": "Percent"},
+        ]}]}
+    if action == "StopTransaction":
+        return {"transactionId": tx_id, "meterStop": 1000 + i * 10, "timestamp": now}
+    raise ValueError(action)
+
+
+def message_plan(n):
+    """Boot, StartTransaction, lalu campuran Status/MeterValues/Heartbeat, ditutup StopTransaction."""
+    plan = ["BootNotification", "StatusNotification", "StartTransaction"]
+    cycle = ["MeterValues", "MeterValues", "MeterValues", "Heartbeat", "StatusNotification"]
+    while len(plan) < n - 1:
+        plan.append(cycle[len(plan) % len(cycle)])
+    plan.append("StopTransaction")
+    return plan[:max(n, 4)]
+
+
+# --- STATS ---
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+
+def summarize(samples_s):
+    if not samples_s:
+        return {"count": 0}
+    ms = sorted(s * 1000 for s in samples_s)
+    pick = lambda p: round(ms[min(len(ms) - 1, int(p / 100.0 * len(ms)))], 3)
+    hist = {}
+    for b in BUCKETS_MS:
+        hist[f"le_{b}"] = sum(1 for v in ms if v <= b)
+    hist["le_inf"] = len(ms)
+    return {"count": len(ms), "p50_ms": pick(50), "p90_ms": pick(90), "p99_ms": pick(99),
+            "max_ms": round(ms[-1], 3), "mean_ms": round(sum(ms) / len(ms), 3), "histogram": hist}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+# --- RUNNER ---
+async def flush_buffer(srv, buf, priority, key):
+    """Flush sisa buffer write-behind lewat db_executor (seperti flusher server)."""
+    while buf.depth():
+        if not await srv.db_call(priority, buf.flush, key=key):
+            break
+
+
+async def run_bench(args):
+    from backend import ocpp_server as srv
+
+    db = FakeDB(args.db_latency_ms)
+    srv.supabase_client = db
+    if not args.rate_limit:
+        # Tanpa limit: pesan yang di-throttle dijawab lewat jalur cepat, latency tidak sebanding antar run
+        srv.rate_limiter = srv.ChargerRateLimiter()
+
+    # Memori per koneksi: handler idle + FakeWebSocket
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sockets = [FakeWebSocket(f"BENCH-{i:05d}") for i in range(args.chargers)]
+    handlers = [srv.ChargePointHandler(ws.path.strip('/'), ws) for ws in sockets]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    mem_total = sum(s.size_diff for s in after.compare_to(before, "filename"))
+
+    for h in handlers:
+        srv.connected_chargers[h.id] = h
+    listeners = [asyncio.create_task(h.start()) for h in handlers]
+
+    per_action = {}
+    queue_samples = []
+    stop = asyncio.Event()
+
+    async def sampler():
+        while not stop.is_set():
+            queue_samples.append(srv.db_executor.queue_depth())
+            await asyncio.sleep(0.01)
+
+    async def drive(ws):
+        tx_id = None
+        for i, action in enumerate(message_plan(args.messages)):
+            t0 = time.perf_counter()
+            frame = await ws.request(action, frame_for(action, i, tx_id))
+            per_action.setdefault(action, []).append(time.perf_counter() - t0)
+            if action == "StartTransaction":
+                # StopTransaction memakai id dari session store agar billing berjalan penuh
+                tx_id = frame[2].get("transactionId")
+
+    sampler_task = asyncio.create_task(sampler())
+    # MeterValues/BootNotification hanya masuk live_buffer/boot_buffer; flusher server yang menulisnya ke DB
+    flushers = [asyncio.create_task(srv.live_meter_flusher()), asyncio.create_task(srv.boot_flusher())]
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(ws) for ws in sockets))
+    elapsed = time.perf_counter() - start
+
+    # Flush sisa buffer, lalu tunggu pekerjaan DB yang masih antre agar drain time ikut terukur
+    drain_start = time.perf_counter()
+    await flush_buffer(srv, srv.boot_buffer, srv.STATUS, "boot_flush")
+    await flush_buffer(srv, srv.live_buffer, srv.BULK, "live_flush")
+    while srv.db_executor.queue_depth():
+        await asyncio.sleep(0.01)
+    drain = time.perf_counter() - drain_start
+    stop.set()
+    await sampler_task
+    for t in listeners + flushers:
+        t.cancel()
+    for h in handlers:
+        srv.connected_chargers.pop(h.id, None)
+
+    total_msgs = sum(len(v) for v in per_action.values())
+    handler_lat = [x for ws in sockets for x in ws.handler_latency]
+    return {
+        "meta": {
+            "commit": git_commit(), "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "chargers": args.chargers, "messages_per_charger": args.messages, "db_latency_ms": args.db_latency_ms,
+            "rate_limit": bool(args.rate_limit),
+        },
+        "throughput": {"messages": total_msgs, "elapsed_s": round(elapsed, 4), "msgs_per_s": round(total_msgs / elapsed, 1),
+                       "throttled": srv.rate_limiter.throttled},
+        "handler_latency": summarize(handler_lat),
+        "round_trip": {a: summarize(v) for a, v in sorted(per_action.items())},
+        "executor_queue": {
+            "max": max(queue_samples or [0]),
+            "mean": round(sum(queue_samples) / len(queue_samples), 2) if queue_samples else 0,
+            "drain_s": round(drain, 4),
+        },
+        "db_calls": dict(sorted(db.calls.items())),
+        "buffers": {"live": srv.live_buffer.stats(), "boot": srv.boot_buffer.stats()},
+        "sessions": {k: srv.session_store.stats()[k] for k in ("started", "stopped", "unknown_stops")},
+        "memory_per_connection_bytes": int(mem_total / max(args.chargers, 1)),
+    }
+
+
+def compare(old, new):
+    rows = [("msgs_per_s", old["throughput"]["msgs_per_s"], new["throughput"]["msgs_per_s"]),
+            ("throttled", old["throughput"].get("throttled"), new["throughput"].get("throttled"))]
+    for k in ("p50_ms", "p99_ms"):
+        rows.append((f"handler {k}", old["handler_latency"].get(k), new["handler_latency"].get(k)))
+    rows.append(("executor queue max", old["executor_queue"]["max"], new["executor_queue"]["max"]))
+    rows.append(("mem/conn bytes", old["memory_per_connection_bytes"], new["memory_per_connection_bytes"]))
+    print(f"{'metric':<22}{'baseline':>14}{'current':>14}{'delta':>10}")
+    for name, a, b in rows:
+        delta = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "-"
+        print(f"{name:<22}{str(a):>14}{str(b):>14}{delta:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UNIEV ChargePointHandler benchmark")
+    parser.add_argument("--chargers", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=50, help="Pesan per charger (termasuk Boot & Stop)")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Latency tiap execute() FakeDB")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="Pakai OCPP_RATE_LIMITS dari config (default: rate limiter dimatikan)")
+    parser.add_argument("--out", help="Simpan hasil ke file JSON")
+    parser.add_argument("--compare", help="Bandingkan hasil dengan file JSON baseline")
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan log OCPP")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    result = asyncio.run(run_bench(args))
+    print(json.dumps({k: result[k] for k in ("throughput", "handler_latency", "executor_queue", "memory_per_connection_bytes")}, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"saved -> {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
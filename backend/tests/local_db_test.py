@@ -0,0 +1,76 @@
+# backend/tests/local_db_test.py
+# Backend SQLite lokal (backend/local_db.py) untuk query yang dipakai billing_engine.
+#
+#   python backend/tests/local_db_test.py
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.local_db import LocalClient  # noqa: E402
+from backend.billing_engine import BillingCalculator  # noqa: E402
+
+
+def _client():
+    db = LocalClient(os.path.join(tempfile.mkdtemp(), "local.db"))
+    db.table("tariffs").insert({"id": 7, "name": "AC Standard", "price_kwh": 2500, "price_session": 5000}).execute()
+    db.table("chargers").insert([
+        {"charger_id": "CP01", "tariff_id": 7, "status": "Available"},
+        {"charger_id": "CP02", "tariff_id": None, "status": "Available"},
+    ]).execute()
+    return db
+
+
+def test_embedded_select():
+    db = _client()
+    rows = db.table("chargers").select("tariff_id, tariffs(*)").eq("charger_id", "CP01").execute().data
+    assert rows == [{"tariff_id": 7, "tariffs": {"id": 7, "name": "AC Standard", "price_kwh": 2500, "price_session": 5000}}], rows
+
+    rows = db.table("chargers").select("charger_id, tarif:tariffs(name,price_kwh)").execute().data
+    assert rows[0] == {"charger_id": "CP01", "tarif": {"name": "AC Standard", "price_kwh": 2500}}, rows
+    assert rows[1] == {"charger_id": "CP02", "tarif": None}, rows
+
+
+def test_unsupported_embed_raises():
+    db = _client()
+    try:
+        db.table("chargers").select("tariffs(cpos(*))").execute()
+    except NotImplementedError as e:
+        assert "embedded select" in str(e)
+    else:
+        raise AssertionError("nested embed should raise NotImplementedError")
+
+
+def test_schema_change_from_other_client():
+    path = os.path.join(tempfile.mkdtemp(), "local.db")
+    a, b = LocalClient(path), LocalClient(path)
+    a.table("transactions").insert({"transaction_id": 1, "charger_id": "CP01"}).execute()
+    assert b.table("transactions").select("*").is_("stop_time", "null").execute().data == [
+        {"transaction_id": 1, "charger_id": "CP01"}]
+
+    a.table("transactions").insert({"transaction_id": 2, "charger_id": "CP01", "stop_time": "t",
+                                    "meta": {"kwh": 1}}).execute()
+    rows = b.table("transactions").select("*").order("transaction_id").execute().data
+    assert rows[1] == {"transaction_id": 2, "charger_id": "CP01", "stop_time": "t", "meta": {"kwh": 1}}, rows
+    assert [r["transaction_id"] for r in b.table("transactions").select("transaction_id").eq("stop_time", "t").execute().data] == [2]
+    assert [r["transaction_id"] for r in b.table("transactions").select("transaction_id").is_("stop_time", "null").execute().data] == [1]
+
+
+def test_billing_uses_tariff():
+    bill = BillingCalculator(_client(), cache=None).calculate_final_bill("CP01", 10, 30)
+    assert bill["tariff_name"].startswith("AC Standard"), bill
+    assert bill["cost_session"] == 5000, bill
+
+
+def run():
+    for name, fn in sorted(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"ok {name}")
+
+
+if __name__ == "__main__":
+    run()
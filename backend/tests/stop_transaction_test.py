@@ -0,0 +1,67 @@
+# backend/tests/stop_transaction_test.py
+# StopTransaction yang dikirim ulang charger (response hilang) tidak boleh
+# menagih ulang meter_stop penuh dan menimpa record transaksi yang benar.
+#
+#   python backend/tests/stop_transaction_test.py
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend import ocpp_server as srv  # noqa: E402
+from backend.local_db import LocalClient  # noqa: E402
+from backend.session_store import SessionStore  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(json.loads(msg))
+
+
+async def _duplicate_stop():
+    db = LocalClient(os.path.join(tempfile.mkdtemp(), "local.db"))
+    srv.supabase_client, srv.tx_journal = db, None
+    srv.session_store = SessionStore().open(0)
+    ws = FakeWebSocket()
+    h = srv.ChargePointHandler("CP-DUP", ws)
+
+    await h.route_message(json.dumps([2, "s1", "StartTransaction", {
+        "connectorId": 1, "idTag": "U1", "meterStart": 50000, "timestamp": "2026-01-01T00:00:00Z"}]))
+    tid = ws.sent[-1][2]["transactionId"]
+    stop = {"transactionId": tid, "meterStop": 57500, "timestamp": "2026-01-01T01:00:00Z"}
+    await h.route_message(json.dumps([2, "e1", "StopTransaction", stop]))
+    await h.route_message(json.dumps([2, "e2", "StopTransaction", stop]))
+
+    deadline = time.monotonic() + 5
+    while (srv.db_executor.queue_depth() or srv.db_executor.busy) and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return ws, db.table("transactions").select("*").eq("transaction_id", tid).execute().data
+
+
+def test_duplicate_stop_is_not_billed_twice():
+    ws, rows = asyncio.run(_duplicate_stop())
+    assert [m[2] for m in ws.sent[-2:]] == [{"idTagInfo": {"status": "Accepted"}}] * 2, ws.sent
+    assert len(rows) == 1 and rows[0]["total_kwh"] == 7.5, rows
+    assert srv.session_store.duplicate_stops == 1 and srv.session_store.unknown_stops == 0
+
+
+def run():
+    logging.disable(logging.INFO)
+    for name, fn in sorted(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"ok {name}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,54 @@
+# backend/timer_wheel.py
+# Hashed timer wheel untuk deadline per key (mis. batas heartbeat charger).
+# schedule/cancel O(1); advance() hanya menyentuh slot yang dilewati, jadi
+# biaya sweep sebanding jumlah deadline yang jatuh tempo, bukan jumlah charger.
+import math
+
+
+class TimerWheel:
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self.slots = slots
+        self._wheel = [dict() for _ in range(slots)]
+        self._deadline = {}     # key -> deadline aktif (entry lain di slot diabaikan)
+        self._cursor = None     # tick terakhir yang sudah diproses
+
+    def __len__(self):
+        return len(self._deadline)
+
+    def __contains__(self, key):
+        return key in self._deadline
+
+    def schedule(self, key, deadline):
+        """Set (atau ganti) deadline key. Deadline lama otomatis tidak berlaku."""
+        self.cancel(key)
+        t = math.ceil(deadline / self.tick)
+        if self._cursor is not None and t <= self._cursor:
+            t = self._cursor + 1  # sudah lewat: jatuh tempo di advance() berikutnya
+        self._wheel[t % self.slots][key] = deadline
+        self._deadline[key] = (t, deadline)
+
+    def cancel(self, key):
+        entry = self._deadline.pop(key, None)
+        if entry is not None:
+            self._wheel[entry[0] % self.slots].pop(key, None)
+
+    def advance(self, now):
+        """Return [(key, deadline)] yang deadline-nya <= now, lalu hapus dari wheel."""
+        target = math.floor(now / self.tick)
+        if self._cursor is None:
+            self._cursor = target - 1
+        due = []
+        if target <= self._cursor:
+            return due
+        # Lebih dari satu putaran tertinggal: cukup satu kali keliling
+        start = max(self._cursor + 1, target - self.slots + 1)
+        for t in range(start, target + 1):
+            bucket = self._wheel[t % self.slots]
+            for key, deadline in list(bucket.items()):
+                if deadline <= now:
+                    del bucket[key]
+                    del self._deadline[key]
+                    due.append((key, deadline))
+        self._cursor = target
+        return due
@@ -0,0 +1,145 @@
+# backend/tx_journal.py
+# Write-ahead journal lokal untuk transaksi yang sudah selesai (billing).
+# StopTransaction ditulis + fsync ke file dulu, baru di-flush batch ke DB.
+# Bila DB lambat/mati, transaksi menumpuk sebagai backlog dan di-replay
+# otomatis (termasuk setelah restart) — tidak ada revenue yang hilang.
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger("OCPP")
+
+
+class TransactionJournal:
+    def __init__(self, directory, flush_fn, batch_size=200, compact_bytes=1024 * 1024):
+        self.directory = directory
+        self.path = os.path.join(directory, "transactions.wal")
+        self.checkpoint_path = os.path.join(directory, "transactions.checkpoint")
+        self._flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._backlog = []      # [(seq, ts, record)] belum tersimpan di DB
+        self._seq = 0
+        self._checkpoint = 0
+        self._file = None
+
+        # Statistik
+        self.appended = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.last_error = None
+        self.last_flush_ms = 0.0
+        self.recovered = 0
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(self.checkpoint_path) as f:
+                self._checkpoint = int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            self._checkpoint = 0
+        self._seq = self._checkpoint
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # baris terpotong (crash saat menulis)
+                    self._seq = max(self._seq, entry["seq"])
+                    if entry["seq"] > self._checkpoint:
+                        self._backlog.append((entry["seq"], entry["ts"], entry["data"]))
+        except FileNotFoundError:
+            pass
+        self.recovered = len(self._backlog)
+        if self.recovered:
+            logger.warning(f"♻️ TX JOURNAL: replaying {self.recovered} unflushed transaction(s)")
+        self._file = open(self.path, "a")
+        return self
+
+    def append(self, record):
+        """Tulis + fsync. Dipanggil dari thread WAL (bukan event loop). Return seq."""
+        with self._lock:
+            self._seq += 1
+            ts = time.time()
+            self._file.write(json.dumps({"seq": self._seq, "ts": ts, "data": record}, default=str) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._backlog.append((self._seq, ts, record))
+            self.appended += 1
+            return self._seq
+
+    def backlog(self):
+        return len(self._backlog)
+
+    def max_transaction_id(self):
+        """transaction_id terbesar di backlog (belum sampai DB); None bila kosong."""
+        with self._lock:
+            ids = [rec.get("transaction_id") for _, _, rec in self._backlog]
+        ids = [int(t) for t in ids if isinstance(t, int) or (isinstance(t, str) and t.isdigit())]
+        return max(ids) if ids else None
+
+    def flush(self):
+        """Kirim satu batch ke DB. Dipanggil dari thread DB. Return jumlah baris tersimpan."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._backlog[:self.batch_size]
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            try:
+                self._flush_fn([rec for _, _, rec in batch])
+            except Exception as e:
+                self.flush_errors += 1
+                self.last_error = str(e)
+                return 0
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 1)
+            with self._lock:
+                del self._backlog[:len(batch)]
+                self.flushed += len(batch)
+                self._write_checkpoint(batch[-1][0])
+                self._maybe_compact()
+            return len(batch)
+
+    def _write_checkpoint(self, seq):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self._checkpoint = seq
+
+    def _maybe_compact(self):
+        # Semua entry sudah di DB: kosongkan file WAL (checkpoint tetap menyimpan seq)
+        if self._backlog or self._file.tell() < self.compact_bytes:
+            return
+        self._file.close()
+        self._file = open(self.path, "w")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        with self._lock:
+            oldest = self._backlog[0][1] if self._backlog else None
+        return {
+            "appended": self.appended,
+            "flushed": self.flushed,
+            "backlog": self.backlog(),
+            "flush_lag_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "recovered_on_start": self.recovered,
+            "flush_errors": self.flush_errors,
+            "last_error": self.last_error,
+            "last_flush_ms": self.last_flush_ms,
+            "checkpoint_seq": self._checkpoint,
+        }
@@ -30,7 +30,9 @@ st.markdown("""
 
 # --- 2. DATABASE CONNECTION ---
 try:
-    from backend.database import supabase
+    from backend.database import supabase, query_cache
+    from backend import cold_start
+    from backend.ocpp_bridge import merge_live_state  # status/meter live dari OCPP server
 except ImportError:
     st.error("Backend module not found. Pastikan menjalankan dari root folder.")
     st.stop()
@@ -80,8 +82,8 @@ def get_transactions_history():
 def get_live_chargers():
     """Mengambil status realtime charger beserta data live meter."""
     try:
-        res = supabase.table("chargers").select("*").order("charger_id").execute()
-        return pd.DataFrame(res.data)
+        rows = query_cache.fetch("chargers", ("list",), lambda: supabase.table("chargers").select("*").order("charger_id").execute().data)
+        return pd.DataFrame(merge_live_state(rows or []))
     except: return pd.DataFrame()
 
 def get_user_financial_summary():
@@ -427,4 +429,6 @@ if menu == "EVSE Management":
                 r = requests.post(f"{api}/api/evse/command", params={"charger_id": charger_id, "action": action}, json=jp, timeout=10)
                 st.success(r.json())
             except Exception as e:
-                st.error(str(e))
\ No newline at end of file
+                st.error(str(e))
+
+cold_start.mark("dashboard_cpo", "first_render")
@@ -0,0 +1,77 @@
+# sim_chargepoint.py
+# Logika pesan OCPP 1.6J sisi charger untuk simulator (tanpa Streamlit).
+# Dipakai oleh simev.py (UI satu charger) dan simfleet.py (ribuan charger headless).
+from datetime import datetime
+from dataclasses import dataclass
+
+from ocpp.routing import on
+from ocpp.v16 import ChargePoint as cp16
+from ocpp.v16 import call, call_result
+from ocpp.v16.enums import RegistrationStatus, Action
+
+# Patching (nama payload berbeda antar versi library ocpp)
+if not hasattr(call_result, 'BootNotificationPayload'):
+    @dataclass
+    class GenericPayload: pass
+    call_result.BootNotificationPayload = getattr(call_result, 'BootNotification', GenericPayload)
+    call_result.RemoteStartTransactionPayload = getattr(call_result, 'RemoteStartTransaction', GenericPayload)
+    call_result.RemoteStopTransactionPayload = getattr(call_result, 'RemoteStopTransaction', GenericPayload)
+
+if not hasattr(call, 'BootNotificationPayload'):
+    call.BootNotificationPayload = getattr(call, 'BootNotification', None)
+    call.HeartbeatPayload = getattr(call, 'Heartbeat', None)
+    call.StatusNotificationPayload = getattr(call, 'StatusNotification', None)
+    call.StartTransactionPayload = getattr(call, 'StartTransaction', None)
+    call.StopTransactionPayload = getattr(call, 'StopTransaction', None)
+    call.MeterValuesPayload = getattr(call, 'MeterValues', None)
+
+
+class SimChargePoint(cp16):
+    """
+    Charger simulasi (connector 1). Semua nilai meter dikirim eksplisit oleh
+    pemanggil; perintah remote dari server diteruskan ke on_remote_command().
+    """
+
+    async def validate_message(self, *args, **kwargs): pass
+
+    async def send_boot(self, model, vendor):
+        req = call.BootNotificationPayload(charge_point_model=model, charge_point_vendor=vendor)
+        return await self.call(req)
+
+    async def send_heartbeat(self):
+        return await self.call(call.HeartbeatPayload())
+
+    async def send_status(self, status, err="NoError"):
+        await self.call(call.StatusNotificationPayload(connector_id=1, error_code=err, status=status))
+
+    async def start_txn(self, id_tag, meter_start_wh):
+        res = await self.call(call.StartTransactionPayload(connector_id=1, id_tag=id_tag, meter_start=int(meter_start_wh), timestamp=datetime.utcnow().isoformat()))
+        return res.transaction_id
+
+    async def stop_txn(self, tx_id, meter_stop_wh):
+        await self.call(call.StopTransactionPayload(transaction_id=tx_id, meter_stop=int(meter_stop_wh), timestamp=datetime.utcnow().isoformat()))
+
+    async def send_meter(self, tx_id, v, i, p, soc, kwh_total):
+        vals = [
+            {"value": str(v), "measurand": "Voltage", "unit": "V"},
+            {"value": str(i), "measurand": "Current.Import", "unit": "A"},
+            {"value": str(p * 1000), "measurand": "Power.Active.Import", "unit": "W"},
+            {"value": str(kwh_total * 1000), "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+            {"value": str(int(soc)), "measurand": "SoC", "unit": "Percent"}
+        ]
+        await self.call(call.MeterValuesPayload(connector_id=1, transaction_id=tx_id, meter_value=[{"timestamp": datetime.utcnow().isoformat(), "sampled_value": vals}]))
+
+    def on_remote_command(self, cmd):
+        """Override: cmd = {"action": "START", "rfid": ...} atau {"action": "STOP"}."""
+
+    # HANDLER UNTUK REMOTE START/STOP DARI SERVER
+    @on(Action.RemoteStartTransaction)
+    async def on_remote_start(self, **kwargs):
+        id_tag = kwargs.get('id_tag') or kwargs.get('idTag')
+        self.on_remote_command({"action": "START", "rfid": id_tag})
+        return call_result.RemoteStartTransactionPayload(status=RegistrationStatus.accepted)
+
+    @on(Action.RemoteStopTransaction)
+    async def on_remote_stop(self, **kwargs):
+        self.on_remote_command({"action": "STOP"})
+        return call_result.RemoteStopTransactionPayload(status=RegistrationStatus.accepted)
@@ -22,26 +22,8 @@ def ui_log(message, type="INFO"):
 # --- IMPORTS ---
 try:
     import websockets
-    from ocpp.routing import on
-    from ocpp.v16 import ChargePoint as cp16
-    from ocpp.v16 import call, call_result
-    from ocpp.v16.enums import RegistrationStatus, Action
-    from dataclasses import dataclass
-    
-    # Patching
-    if not hasattr(call_result, 'BootNotificationPayload'):
-        @dataclass
-        class GenericPayload: pass
-        call_result.BootNotificationPayload = getattr(call_result, 'BootNotification', GenericPayload)
-        call_result.RemoteStartTransactionPayload = getattr(call_result, 'RemoteStartTransaction', GenericPayload)
-        call_result.RemoteStopTransactionPayload = getattr(call_result, 'RemoteStopTransaction', GenericPayload)
-
-    if not hasattr(call, 'BootNotificationPayload'):
-        call.BootNotificationPayload = getattr(call, 'BootNotification', None)
-        call.StatusNotificationPayload = getattr(call, 'StatusNotification', None)
-        call.StartTransactionPayload = getattr(call, 'StartTransaction', None)
-        call.StopTransactionPayload = getattr(call, 'StopTransaction', None)
-        call.MeterValuesPayload = getattr(call, 'MeterValues', None)
+    from ocpp.v16.enums import RegistrationStatus
+    from sim_chargepoint import SimChargePoint
 
 except ImportError as e:
     st.error(f"CRITICAL ERROR: {e}")
@@ -56,64 +38,37 @@ if "sim" not in st.session_state:
     }
 
 # --- LOGIC ---
-class WebChargePoint(cp16):
-    
-    async def validate_message(self, *args, **kwargs): pass 
-
-    async def send_boot(self, model, vendor):
-        req = call.BootNotificationPayload(charge_point_model=model, charge_point_vendor=vendor)
-        return await self.call(req)
-
-    async def send_status(self, status, err="NoError"):
-        await self.call(call.StatusNotificationPayload(connector_id=1, error_code=err, status=status))
+class WebChargePoint(SimChargePoint):
+    # Nilai meter diambil dari st.session_state.sim; pesan OCPP ada di sim_chargepoint.py
 
     async def start_txn(self, id_tag):
-        start_wh = int(st.session_state.sim["kwh_total"] * 1000)
-        res = await self.call(call.StartTransactionPayload(connector_id=1, id_tag=id_tag, meter_start=start_wh, timestamp=datetime.utcnow().isoformat()))
-        return res.transaction_id
+        return await super().start_txn(id_tag, st.session_state.sim["kwh_total"] * 1000)
 
     async def stop_txn(self, tx_id):
-        stop_wh = int(st.session_state.sim["kwh_total"] * 1000)
-        await self.call(call.StopTransactionPayload(transaction_id=tx_id, meter_stop=stop_wh, timestamp=datetime.utcnow().isoformat()))
+        await super().stop_txn(tx_id, st.session_state.sim["kwh_total"] * 1000)
 
     async def send_meter(self, tx_id, v, i, p, soc):
-        current_wh = str(st.session_state.sim["kwh_total"] * 1000)
-        vals = [
-            {"value": str(v), "measurand": "Voltage", "unit": "V"},
-            {"value": str(i), "measurand": "Current.Import", "unit": "A"},
-            {"value": str(p * 1000), "measurand": "Power.Active.Import", "unit": "W"},
-            {"value": current_wh, "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
-            {"value": str(int(soc)), "measurand": "SoC", "unit": "Percent"}
-        ]
-        await self.call(call.MeterValuesPayload(connector_id=1, transaction_id=tx_id, meter_value=[{"timestamp": datetime.utcnow().isoformat(), "sampled_value": vals}]))
-
-    # [CRITICAL FIX] HANDLER UNTUK REMOTE START/STOP DARI SERVER
-    @on(Action.RemoteStartTransaction)
-    async def on_remote_start(self, **kwargs):
-        id_tag = kwargs.get('id_tag') or kwargs.get('idTag')
-        ui_log(f"🔔 REMOTE START RECEIVED (User: {id_tag})", "WARN")
-        
-        # Trigger Start di Loop Utama
-        st.session_state.sim["cmd_queue"].append({"action": "START", "rfid": id_tag})
-        
-        return call_result.RemoteStartTransactionPayload(status=RegistrationStatus.accepted)
+        await super().send_meter(tx_id, v, i, p, soc, st.session_state.sim["kwh_total"])
 
-    @on(Action.RemoteStopTransaction)
-    async def on_remote_stop(self, **kwargs):
-        ui_log("🔔 REMOTE STOP RECEIVED", "WARN")
-        st.session_state.sim["cmd_queue"].append({"action": "STOP"})
-        return call_result.RemoteStopTransactionPayload(status=RegistrationStatus.accepted)
+    # [CRITICAL FIX] REMOTE START/STOP DARI SERVER -> antrian loop utama
+    def on_remote_command(self, cmd):
+        if cmd["action"] == "START":
+            ui_log(f"🔔 REMOTE START RECEIVED (User: {cmd.get('rfid')})", "WARN")
+        else:
+            ui_log("🔔 REMOTE STOP RECEIVED", "WARN")
+        st.session_state.sim["cmd_queue"].append(cmd)
 
 # --- THREAD ---
-def thread_main(url, cp_id, model, vendor):
+def thread_main(url, cp_id, model, vendor, compression="deflate"):
     async def async_loop():
         try:
             ui_log(f"Connecting to {url}/{cp_id}...", "SYS")
-            async with websockets.connect(f"{url}/{cp_id}", subprotocols=['ocpp1.6']) as ws:
+            async with websockets.connect(f"{url}/{cp_id}", subprotocols=['ocpp1.6'], compression=compression) as ws:
                 cp = WebChargePoint(cp_id, ws)
+                deflate = any(ext.name == "permessage-deflate" for ext in ws.extensions)
                 st.session_state.sim["connected"] = True
                 st.session_state.sim["status"] = "Connected"
-                ui_log("WebSocket Handshake OK", "SUCCESS")
+                ui_log(f"WebSocket Handshake OK (permessage-deflate: {'ON' if deflate else 'OFF'})", "SUCCESS")
 
                 # Jalankan Listener di background agar bisa terima Remote Start
                 listener = asyncio.create_task(cp.start())
@@ -198,11 +153,13 @@ with st.sidebar:
     st.header("⚙️ Config")
     url = st.text_input("Server URL", "ws://localhost:9000")
     cid = st.text_input("Charger ID", "HF-001")
+    # Charger 4G: kompresi menghemat kuota data, dengan biaya CPU di kedua sisi
+    use_deflate = st.checkbox("Kompresi (permessage-deflate)", value=True)
     
     if not st.session_state.sim["connected"]:
         if st.button("🔌 CONNECT", type="primary"):
             st.session_state.sim["stop_event"].clear()
-            t = threading.Thread(target=thread_main, args=(url, cid, "Turbo-Sim", "UNIEV"), daemon=True)
+            t = threading.Thread(target=thread_main, args=(url, cid, "Turbo-Sim", "UNIEV", "deflate" if use_deflate else None), daemon=True)
             add_script_run_ctx(t)
             t.start()
             st.rerun()
@@ -0,0 +1,372 @@
+# simfleet.py
+# UNIEV Fleet Simulator (headless, tanpa Streamlit)
+#
+#   python simfleet.py --chargers 2000 --duration 600 --scenario commute --seed 42
+#   python simfleet.py --chargers 500 --speed 60 --scenario depot --out fleet.json
+#
+# Ribuan SimChargePoint dalam satu event loop. Fisika charging (SoC, daya,
+# energi) dihitung vektor (numpy) untuk seluruh armada per tick; tiap charger
+# hanya mengirim pesan OCPP yang jatuh tempo.
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+
+import numpy as np
+import websockets
+from ocpp.v16.enums import RegistrationStatus
+
+from sim_chargepoint import SimChargePoint
+
+logger = logging.getLogger("SIMFLEET")
+
+# --- SCENARIOS ---
+# arrivals_per_hour: rata-rata kedatangan EV per charger per jam (waktu simulasi)
+# first_arrival_s: rentang kedatangan pertama [min, max] detik simulasi
+# vehicles: campuran kendaraan (weight = peluang)
+# charger_kw: campuran daya charger (weight = peluang)
+SCENARIOS = {
+    "uniform": {
+        "arrivals_per_hour": 0.5,
+        "first_arrival_s": [0, 3600],
+        "soc_start": [10, 50],
+        "soc_target": [80, 100],
+        "vehicles": [
+            {"name": "Compact", "capacity_kwh": 40, "max_kw": 50, "taper_soc": 80, "weight": 0.4},
+            {"name": "Sedan", "capacity_kwh": 75, "max_kw": 150, "taper_soc": 75, "weight": 0.4},
+            {"name": "SUV", "capacity_kwh": 100, "max_kw": 120, "taper_soc": 70, "weight": 0.2},
+        ],
+        "charger_kw": [{"kw": 7.4, "weight": 0.3}, {"kw": 22, "weight": 0.4}, {"kw": 60, "weight": 0.3}],
+    },
+    "commute": {
+        # Gelombang pulang kerja: kedatangan pertama rapat di 30 menit awal
+        "arrivals_per_hour": 0.25,
+        "first_arrival_s": [0, 1800],
+        "soc_start": [15, 40],
+        "soc_target": [80, 90],
+        "vehicles": [
+            {"name": "Compact", "capacity_kwh": 40, "max_kw": 50, "taper_soc": 80, "weight": 0.6},
+            {"name": "Sedan", "capacity_kwh": 75, "max_kw": 150, "taper_soc": 75, "weight": 0.4},
+        ],
+        "charger_kw": [{"kw": 7.4, "weight": 0.5}, {"kw": 22, "weight": 0.5}],
+    },
+    "depot": {
+        # Armada depot: semua kendaraan datang hampir bersamaan (uji lonjakan)
+        "arrivals_per_hour": 0.1,
+        "first_arrival_s": [0, 60],
+        "soc_start": [5, 20],
+        "soc_target": [95, 100],
+        "vehicles": [
+            {"name": "Van", "capacity_kwh": 90, "max_kw": 100, "taper_soc": 80, "weight": 1.0},
+        ],
+        "charger_kw": [{"kw": 60, "weight": 1.0}],
+    },
+}
+
+
+def _pick(rng, items, n):
+    w = np.array([it["weight"] for it in items], dtype=float)
+    return rng.choice(len(items), size=n, p=w / w.sum())
+
+
+def _percentile(vals, p):
+    if not vals:
+        return None
+    s = sorted(vals)
+    return round(s[min(len(s) - 1, int(p / 100.0 * len(s)))] * 1000, 2)
+
+
+class FleetChargePoint(SimChargePoint):
+    """SimChargePoint dengan pencatatan latency per action dan perintah remote ke array fleet."""
+
+    fleet = None
+    index = 0
+
+    async def call(self, payload, *args, **kwargs):
+        action = type(payload).__name__.replace("Payload", "")
+        t0 = time.perf_counter()
+        try:
+            return await super().call(payload, *args, **kwargs)
+        except Exception:
+            self.fleet.errors[action] = self.fleet.errors.get(action, 0) + 1
+            raise
+        finally:
+            self.fleet.record(action, time.perf_counter() - t0)
+
+    def on_remote_command(self, cmd):
+        if cmd["action"] == "START":
+            self.fleet.remote_start[self.index] = True
+        else:
+            self.fleet.remote_stop[self.index] = True
+
+
+class Fleet:
+    def __init__(self, url, n, scenario, seed=42, prefix="SIM", tick=1.0, speed=1.0,
+                 meter_interval=10, connect_rate=200, reconnect=True, compression="deflate"):
+        self.url = url.rstrip('/')
+        self.n = n
+        self.sc = scenario
+        self.prefix = prefix
+        self.tick = tick
+        self.speed = speed
+        self.meter_every = max(1, int(round(meter_interval / tick)))
+        self.connect_rate = connect_rate
+        self.reconnect = reconnect
+        self.compression = compression
+        self.rng = np.random.default_rng(seed)
+        self.jitter = random.Random(seed)
+
+        # --- vectorized state ---
+        self.connected = np.zeros(n, dtype=bool)
+        self.charging = np.zeros(n, dtype=bool)
+        self.busy = np.zeros(n, dtype=bool)          # ada sesi start/stop yang sedang berjalan
+        self.remote_start = np.zeros(n, dtype=bool)
+        self.remote_stop = np.zeros(n, dtype=bool)
+        self.soc = np.zeros(n)
+        self.target = np.zeros(n)
+        self.capacity = np.ones(n)
+        self.vmax_kw = np.zeros(n)
+        self.taper_soc = np.full(n, 80.0)
+        self.power_kw = np.zeros(n)
+        self.meter_wh = np.zeros(n)                  # register energi kumulatif charger
+        self.charger_kw = np.array([c["kw"] for c in scenario["charger_kw"]])[_pick(self.rng, scenario["charger_kw"], n)]
+        lo, hi = scenario["first_arrival_s"]
+        self.next_arrival = self.rng.uniform(lo, hi, n)
+        self.phase = self.rng.integers(0, self.meter_every, n)   # sebar MeterValues antar charger
+        # Heartbeat per charger mengikuti interval dari BootNotification, dihitung sejak Accepted (wall clock)
+        self.hb_interval = np.full(n, 30.0)
+        self.next_hb = np.full(n, np.inf)
+        self.accepted_at = np.zeros(n)               # monotonic saat Boot terakhir di-Accept
+        self.tx_ids = [None] * n
+        self.cps = [None] * n
+
+        # --- stats ---
+        self.sim_time = 0.0
+        self.latency = {}
+        self.errors = {}
+        self.sent = {}
+        self.skipped = 0
+        self.boot_pending = 0
+        self.sessions_done = 0
+        self.energy_kwh = 0.0
+
+    def record(self, action, dt):
+        self.sent[action] = self.sent.get(action, 0) + 1
+        lat = self.latency.setdefault(action, [])
+        if len(lat) < 50000:
+            lat.append(dt)
+
+    # --- CONNECTIONS ---
+    async def _connection(self, i):
+        cid = f"{self.prefix}-{i:05d}"
+        backoff = 1.0
+        while True:
+            try:
+                async with websockets.connect(f"{self.url}/{cid}", subprotocols=['ocpp1.6'], open_timeout=30,
+                                              compression=self.compression) as ws:
+                    cp = FleetChargePoint(cid, ws)
+                    cp.fleet, cp.index = self, i
+                    listener = asyncio.create_task(cp.start())
+                    res = await cp.send_boot("Fleet-Sim", "UNIEV")
+                    # Pending/Rejected: boot ulang di koneksi yang sama setelah interval dari server
+                    while res.status != RegistrationStatus.accepted:
+                        self.boot_pending += 1
+                        await asyncio.sleep(res.interval or 10)
+                        res = await cp.send_boot("Fleet-Sim", "UNIEV")
+                    self.accepted_at[i] = time.monotonic()
+                    self.hb_interval[i] = res.interval or 30
+                    self.next_hb[i] = self.accepted_at[i] + self.hb_interval[i]
+                    await cp.send_status("Charging" if self.charging[i] else "Available")
+                    self.cps[i] = cp
+                    self.connected[i] = True
+                    backoff = 1.0
+                    await listener
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"{cid} disconnected: {e}")
+            finally:
+                self.connected[i] = False
+                self.cps[i] = None
+            if not self.reconnect:
+                return
+            await asyncio.sleep(backoff + self.jitter.random() * backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _send(self, i, coro_fn):
+        self.busy[i] = True
+        try:
+            await coro_fn()
+        except Exception:
+            pass
+        finally:
+            self.busy[i] = False
+
+    # --- SESSIONS ---
+    def _begin_sessions(self, idx):
+        k = len(idx)
+        veh = _pick(self.rng, self.sc["vehicles"], k)
+        vehicles = self.sc["vehicles"]
+        self.capacity[idx] = [vehicles[v]["capacity_kwh"] for v in veh]
+        self.vmax_kw[idx] = [vehicles[v]["max_kw"] for v in veh]
+        self.taper_soc[idx] = [vehicles[v]["taper_soc"] for v in veh]
+        self.soc[idx] = self.rng.uniform(*self.sc["soc_start"], k)
+        self.target[idx] = self.rng.uniform(*self.sc["soc_target"], k)
+        for i in idx:
+            asyncio.create_task(self._send(i, lambda i=i: self._start(i)))
+
+    async def _start(self, i):
+        cp = self.cps[i]
+        if cp is None: return
+        tx = await cp.start_txn(f"RFID-{i:05d}", self.meter_wh[i])
+        self.tx_ids[i] = tx
+        self.charging[i] = True
+        await cp.send_status("Charging")
+
+    async def _stop(self, i):
+        cp = self.cps[i]
+        self.charging[i] = False
+        self.sessions_done += 1
+        if cp is None: return
+        await cp.stop_txn(self.tx_ids[i], self.meter_wh[i])
+        self.tx_ids[i] = None
+        await cp.send_status("Available")
+
+    # --- TICK ---
+    def step_physics(self, dt_sim):
+        """Update SoC/daya/energi seluruh armada sekaligus."""
+        limit = np.minimum(self.vmax_kw, self.charger_kw)
+        span = np.maximum(100.0 - self.taper_soc, 1.0)
+        taper = np.where(self.soc > self.taper_soc, np.clip((100.0 - self.soc) / span, 0.05, 1.0), 1.0)
+        self.power_kw = np.where(self.charging, limit * taper, 0.0)
+        energy_kwh = self.power_kw * dt_sim / 3600.0
+        self.meter_wh += energy_kwh * 1000.0
+        self.soc = np.minimum(100.0, self.soc + energy_kwh / self.capacity * 100.0)
+        self.energy_kwh += float(energy_kwh.sum())
+
+    def step(self, tick_no):
+        dt_sim = self.tick * self.speed
+        self.sim_time += dt_sim
+        self.step_physics(dt_sim)
+
+        idle = self.connected & ~self.busy
+        # Kedatangan EV (jadwal skenario atau RemoteStart dari server)
+        arrive = idle & ~self.charging & ((self.next_arrival <= self.sim_time) | self.remote_start)
+        self.remote_start[arrive] = False
+        # Selesai (target SoC tercapai atau RemoteStop)
+        done = idle & self.charging & ((self.soc >= self.target) | self.remote_stop)
+        self.remote_stop[done] = False
+
+        rate = self.sc["arrivals_per_hour"] / 3600.0
+        done_idx = np.flatnonzero(done)
+        if len(done_idx):
+            self.next_arrival[done_idx] = self.sim_time + self.rng.exponential(1.0 / rate, len(done_idx))
+            for i in done_idx:
+                asyncio.create_task(self._send(i, lambda i=i: self._stop(i)))
+        arrive_idx = np.flatnonzero(arrive)
+        if len(arrive_idx):
+            self._begin_sessions(arrive_idx)
+
+        due = (tick_no + self.phase) % self.meter_every == 0
+        meter = self.charging & ~done & due
+        self.skipped += int((meter & self.busy).sum())
+        for i in np.flatnonzero(meter & idle):
+            v = 400.0 if self.charger_kw[i] > 22 else 230.0
+            p = float(self.power_kw[i])
+            args = (self.tx_ids[i], v, round(p * 1000 / v, 1), round(p, 3), float(self.soc[i]), float(self.meter_wh[i]) / 1000.0)
+            asyncio.create_task(self._send(i, lambda i=i, a=args: self.cps[i].send_meter(*a) if self.cps[i] else asyncio.sleep(0)))
+
+        now = time.monotonic()
+        hb_due = self.connected & (self.next_hb <= now)
+        self.next_hb[hb_due] = np.maximum(self.next_hb[hb_due] + self.hb_interval[hb_due], now)
+        hb = hb_due & idle & ~self.charging
+        for i in np.flatnonzero(hb):
+            asyncio.create_task(self._send(i, lambda i=i: self.cps[i].send_heartbeat() if self.cps[i] else asyncio.sleep(0)))
+
+    def summary(self):
+        return {
+            "connected": int(self.connected.sum()),
+            "charging": int(self.charging.sum()),
+            "sim_time_s": round(self.sim_time, 1),
+            "sessions_done": self.sessions_done,
+            "energy_kwh": round(self.energy_kwh, 2),
+            "fleet_power_kw": round(float(self.power_kw.sum()), 1),
+            "sent": dict(self.sent),
+            "errors": dict(self.errors),
+            "skipped_meter": self.skipped,
+            "boot_pending": self.boot_pending,
+            "latency_ms": {a: {"p50": _percentile(v, 50), "p99": _percentile(v, 99)} for a, v in self.latency.items()},
+        }
+
+    async def run(self, duration, report_every=10):
+        tasks = []
+        for i in range(self.n):
+            tasks.append(asyncio.create_task(self._connection(i)))
+            if (i + 1) % self.connect_rate == 0:
+                await asyncio.sleep(1)   # ramp-up: connect_rate koneksi per detik
+        start = time.monotonic()
+        tick_no = 0
+        next_report = start + report_every
+        while time.monotonic() - start < duration:
+            tick_started = time.monotonic()
+            self.step(tick_no)
+            tick_no += 1
+            if time.monotonic() >= next_report:
+                next_report += report_every
+                s = self.summary()
+                logger.info(f"t={s['sim_time_s']}s connected={s['connected']}/{self.n} charging={s['charging']} "
+                            f"done={s['sessions_done']} power={s['fleet_power_kw']}kW msgs={sum(s['sent'].values())} errors={sum(s['errors'].values())}")
+            await asyncio.sleep(max(0.0, self.tick - (time.monotonic() - tick_started)))
+        summary = self.summary()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return summary
+
+
+def load_scenario(name):
+    if name in SCENARIOS:
+        return SCENARIOS[name]
+    with open(name) as f:
+        return {**SCENARIOS["uniform"], **json.load(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UNIEV headless fleet simulator")
+    parser.add_argument("--url", default="ws://localhost:9000")
+    parser.add_argument("--chargers", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=300, help="Durasi run (detik wall clock)")
+    parser.add_argument("--scenario", default="uniform", help=f"Preset ({', '.join(SCENARIOS)}) atau path file JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="SIM")
+    parser.add_argument("--tick", type=float, default=1.0, help="Interval tick (detik)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Detik simulasi per detik wall clock")
+    parser.add_argument("--meter-interval", type=float, default=10, help="Interval MeterValues (detik wall clock)")
+    parser.add_argument("--connect-rate", type=int, default=200, help="Koneksi baru per detik saat ramp-up")
+    parser.add_argument("--no-reconnect", action="store_true")
+    parser.add_argument("--no-compression", action="store_true", help="Jangan tawarkan permessage-deflate")
+    parser.add_argument("--out", help="Simpan ringkasan akhir ke JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [SIMFLEET] %(message)s', stream=sys.stdout)
+    logging.getLogger("ocpp").setLevel(logging.WARNING)
+
+    fleet = Fleet(args.url, args.chargers, load_scenario(args.scenario), seed=args.seed, prefix=args.prefix,
+                  tick=args.tick, speed=args.speed, meter_interval=args.meter_interval,
+                  connect_rate=args.connect_rate, reconnect=not args.no_reconnect,
+                  compression=None if args.no_compression else "deflate")
+    try:
+        summary = asyncio.run(fleet.run(args.duration))
+    except KeyboardInterrupt:
+        summary = fleet.summary()
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,9 @@ st.markdown("""
 
 # --- 2. DATABASE CONNECTION ---
 try:
-    from backend.database import supabase
+    from backend.database import supabase, query_cache
+    from backend import cold_start
+    from backend.ocpp_bridge import merge_live_state  # status/meter live dari OCPP server
 except ImportError:
     st.error("⚠️ Backend connection failed.")
     st.stop()
@@ -95,13 +97,13 @@ def save_user_car_preference(car_index):
         print(f"ERROR saving preference: {e}")
 
 def get_chargers():
-    try: return supabase.table("chargers").select("*").order("charger_id").execute().data
+    try: return merge_live_state(query_cache.fetch("chargers", ("list",), lambda: supabase.table("chargers").select("*").order("charger_id").execute().data) or [])
     except Exception as e: 
         print(f"\n[DEBUG ERROR] Gagal fetch chargers: {e}")
         return []
 
 def get_cars():
-    try: return supabase.table("electric_vehicles").select("*").order("brand, model").execute().data
+    try: return query_cache.fetch("electric_vehicles", ("list",), lambda: supabase.table("electric_vehicles").select("*").order("brand, model").execute().data)
     except Exception as e:
         print(f"\n[CRITICAL ERROR] Gagal memuat data mobil dari DB. Penyebab: {e}")
         return []
@@ -471,6 +473,8 @@ with col_nav4:
     if st.button("👤 Akun", key="nav_acc", type="primary" if st.session_state.nav == "Account" else "secondary"):
         st.session_state.nav = "Account"; st.rerun()
 
+cold_start.mark("user_app", "first_render")
+
 # Auto Refresh
 sleep_time = 2 if active_session_charger else 5
 time.sleep(sleep_time)